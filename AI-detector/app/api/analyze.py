@@ -1,59 +1,275 @@
 """API endpoints for text analysis."""
-from fastapi import APIRouter, HTTPException
-from app.schemas.analyze import AnalyzeRequest, AnalyzeResponse
-from app.services.preprocessing import preprocess_text
-from app.services.scoring import calculate_final_score, calculate_sentence_scores
+import asyncio
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Union
+import numpy as np
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from app.schemas.analyze import (
+    AnalyzeRequest,
+    AnalyzeResponse,
+    IncrementalAnalyzeRequest,
+    LongAnalyzeRequest
+)
+from app.services.features import DocumentFeatures
+from app.services.document import sentence_spans
+from app.services.preprocessing import OriginalOffsets, PreprocessedText, clean_text, preprocess
+from app.services.scoring import (
+    calculate_final_score,
+    calculate_incremental_score,
+    calculate_long_document_score,
+    calculate_sentence_scores,
+    iter_final_score
+)
+from app.services.perplexity import gpt2_batcher, sentence_memo
+from app.services.classifier import detector_batcher
+from app.services.warmup import model_warmup
+from app.core.config import settings
+from app.core.executor import inference_executor, InferenceQueueFull
+from app.core.cache import ResultCache, cache_key
+from app.core.encoding import json_response
+from app.core.metrics import span
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
 router = APIRouter(prefix="/api", tags=["analysis"])
 
+# Finished analyses, keyed by cleaned text and scoring config
+result_cache = ResultCache(
+    loads=AnalyzeResponse.model_validate_json,
+    dumps=lambda response: response.model_dump_json()
+)
 
-@router.post("/analyze", response_model=AnalyzeResponse)
-async def analyze_text(request: AnalyzeRequest) -> AnalyzeResponse:
-    """Analyze text for AI detection.
+# Sentence perplexities and detector input of incremental analyses, by analysis_id
+analysis_states = ResultCache(loads=json.loads, dumps=json.dumps, table="analysis_states")
+
+# Keep proxies from buffering server-sent events
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _preprocess_or_400(text: str) -> PreprocessedText:
+    """Preprocess text, rejecting texts without usable sentences."""
+    with span('preprocess'):
+        preprocessed = preprocess(text)
+    
+    if not preprocessed.spans:
+        raise HTTPException(
+            status_code=400,
+            detail="No valid sentences found in text"
+        )
+    
+    return preprocessed
+
+
+def _build_response(result, sentences, analysis_id=None) -> AnalyzeResponse:
+    """Build the API response from a scoring result."""
+    sentence_scores = calculate_sentence_scores(
+        sentences, result['score'], result['sentence_perplexities']
+    )
+    
+    return AnalyzeResponse(
+        score=result['score'],
+        label=result['label'],
+        confidence=result['confidence'],
+        metrics=result['metrics'],
+        is_reliable=result['is_reliable'],
+        modality=result['modality'],
+        modality_warning=result['modality_warning'],
+        sentence_scores=sentence_scores,
+        analysis_id=analysis_id,
+        stages_run=result.get('stages_run'),
+        detector_windows=result.get('detector_windows')
+    )
+
+
+def compact_response(response: AnalyzeResponse, text: str) -> Dict[str, Any]:
+    """The ``format="compact"`` form of a response to ``text`` (see ``CompactAnalyzeResponse``).
+    
+    Sentences become ``[start, end, score]`` spans of the text as sent
+    rather than copies of it. Spans are located in the cleaned text and
+    mapped back, so a cached response fits any input that cleans the same.
     
     Args:
-        request: Analysis request with text
+        response: Verbose response
+        text: Raw text from the request
         
     Returns:
-        Analysis results with score, metrics, and sentence-level scores
+        JSON-compatible dict, ready to encode
     """
-    try:
-        logger.info(f"Analyzing text ({len(request.text)} chars)")
-        
-        # Preprocess text
-        cleaned_text, sentences = preprocess_text(request.text)
-        
-        if not sentences:
-            raise HTTPException(
-                status_code=400,
-                detail="No valid sentences found in text"
-            )
-        
-        # Calculate scores
-        result = calculate_final_score(cleaned_text, sentences)
-        sentence_scores = calculate_sentence_scores(sentences, result['score'])
-        
-        # Build response
-        response = AnalyzeResponse(
-            score=result['score'],
-            label=result['label'],
-            confidence=result['confidence'],
-            metrics=result['metrics'],
-            is_reliable=result['is_reliable'],
-            modality=result['modality'],
-            modality_warning=result['modality_warning'],
-            sentence_scores=sentence_scores
+    cleaned = clean_text(text)
+    offsets = OriginalOffsets(text)
+    sentences = response.sentence_scores
+    
+    bounds = np.array(
+        [located if located is not None else (-1, -1)
+         for located in sentence_spans(cleaned, [sentence.text for sentence in sentences])],
+        dtype=np.int64
+    ).reshape(-1, 2)
+    mapped = np.where(bounds >= 0, offsets.to_original(bounds), -1).tolist()
+    
+    content = response.model_dump(
+        exclude={'sentence_scores', 'detector_windows'}, exclude_none=True
+    )
+    content['sentence_spans'] = [
+        [start, end, sentence.score] for (start, end), sentence in zip(mapped, sentences)
+    ]
+    if response.detector_windows is not None:
+        windows = np.array(
+            [(window.start, window.end) for window in response.detector_windows], dtype=np.int64
+        ).reshape(-1, 2)
+        content['detector_windows'] = [
+            [start, end, window.probability]
+            for (start, end), window in zip(offsets.to_original(windows).tolist(),
+                                            response.detector_windows)
+        ]
+    return content
+
+
+def _respond(
+    response: AnalyzeResponse,
+    request: Union[AnalyzeRequest, IncrementalAnalyzeRequest, LongAnalyzeRequest],
+    http_request: Request
+) -> Union[AnalyzeResponse, Response]:
+    """Send a response in the format the request asked for.
+    
+    Verbose responses go through FastAPI's usual serialization; compact
+    ones are encoded here and compressed as the client's
+    ``Accept-Encoding`` allows.
+    """
+    if request.format != "compact":
+        return response
+    with span('serialize'):
+        return json_response(
+            compact_response(response, request.text), http_request.headers.get('accept-encoding')
         )
+
+
+def run_analysis(text: str, mode: str = "full") -> AnalyzeResponse:
+    """Run the full (blocking) analysis pipeline for one text.
+    
+    Args:
+        text: Raw text from the request
+        mode: "full", or "fast" to stop after the detector when it is decisive
         
-        logger.info(f"Analysis complete: {result['label']} ({result['score']:.2f})")
+    Returns:
+        Analysis results with score, metrics, and sentence-level scores
+    """
+    preprocessed = _preprocess_or_400(text)
+    cleaned_text, sentences = preprocessed.cleaned, preprocessed.sentences
+    
+    result = calculate_final_score(cleaned_text, sentences, mode, preprocessed.features)
+    response = _build_response(result, sentences)
+    
+    result_cache.put(cache_key(cleaned_text, mode=mode), response)
+    
+    return response
+
+
+def run_long_analysis(text: str) -> AnalyzeResponse:
+    """Run the (blocking) chunked pipeline for a long document.
+    
+    Args:
+        text: Raw text from the request
         
-        return response
+    Returns:
+        Analysis results with score, metrics, and sentence-level scores
+    """
+    preprocessed = _preprocess_or_400(text)
+    cleaned_text, sentences = preprocessed.cleaned, preprocessed.sentences
+    
+    result = calculate_long_document_score(cleaned_text, sentences, preprocessed.features)
+    response = _build_response(result, sentences)
+    
+    result_cache.put(cache_key(cleaned_text, mode="long"), response)
+    
+    return response
+
+
+def run_incremental_analysis(text: str, previous_analysis_id: Optional[str]) -> AnalyzeResponse:
+    """Run the (blocking) incremental pipeline, reusing an earlier analysis.
+    
+    Args:
+        text: Raw text from the request
+        previous_analysis_id: ``analysis_id`` of the earlier version, if any
         
+    Returns:
+        Analysis results, with an ``analysis_id`` for the next edit
+    """
+    preprocessed = _preprocess_or_400(text)
+    cleaned_text, sentences = preprocessed.cleaned, preprocessed.sentences
+    
+    previous = analysis_states.get(previous_analysis_id) if previous_analysis_id else None
+    if previous_analysis_id and previous is None:
+        logger.info("Previous analysis not found, scoring from the sentence memo")
+    
+    result = calculate_incremental_score(cleaned_text, sentences, previous, preprocessed.features)
+    
+    analysis_id = cache_key(cleaned_text, mode="incremental")
+    response = _build_response(result, sentences, analysis_id)
+    
+    analysis_states.put(analysis_id, result['state'])
+    result_cache.put(analysis_id, response)
+    
+    return response
+
+
+def run_streaming_analysis(
+    cleaned_text: str,
+    sentences,
+    emit: Callable[[str, Dict[str, Any]], None],
+    mode: str = "full",
+    features: Optional[DocumentFeatures] = None
+) -> AnalyzeResponse:
+    """Run the full (blocking) pipeline, passing each partial result to ``emit``.
+    
+    Args:
+        cleaned_text: Preprocessed text
+        sentences: Its sentences
+        emit: Called with ``("metrics", ...)`` and ``("sentence", ...)`` events
+        mode: Analysis mode, as for ``run_analysis``
+        features: Features of the text (computed if omitted)
+        
+    Returns:
+        The same response ``run_analysis`` gives for the text
+    """
+    for event, data in iter_final_score(cleaned_text, sentences, mode, features):
+        if event == 'result':
+            result = data
+        else:
+            emit(event, data)
+    
+    response = _build_response(result, sentences)
+    result_cache.put(cache_key(cleaned_text, mode=mode), response)
+    
+    return response
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _run_inference(fn, *args, timeout: Optional[float] = None) -> AnalyzeResponse:
+    """Run an analysis on the inference executor, mapping failures to HTTP errors."""
+    try:
+        return await inference_executor.run(fn, *args, timeout=timeout)
     except HTTPException:
         raise
+    except InferenceQueueFull:
+        logger.warning("Inference queue full, rejecting request")
+        raise HTTPException(
+            status_code=503,
+            detail="The detector is busy, please retry shortly",
+            headers={"Retry-After": str(settings.inference_retry_after)}
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Analysis timed out after {timeout or settings.inference_timeout}s")
+        raise HTTPException(
+            status_code=504,
+            detail="Analysis took too long, please try a shorter text"
+        )
     except Exception as e:
         logger.error(f"Error analyzing text: {e}", exc_info=True)
         raise HTTPException(
@@ -62,6 +278,214 @@ async def analyze_text(request: AnalyzeRequest) -> AnalyzeResponse:
         )
 
 
+@router.post("/analyze", response_model=AnalyzeResponse)
+async def analyze_text(
+    request: AnalyzeRequest, http_request: Request
+) -> Union[AnalyzeResponse, Response]:
+    """Analyze text for AI detection.
+    
+    Repeated texts are answered from the result cache. Otherwise the model
+    work runs on the inference executor so the event loop stays free for
+    health checks and static files while the detector is busy.
+    
+    With ``mode="fast"`` the detector runs first and GPT-2 is skipped when
+    it agrees with the text statistics; ``stages_run`` says what ran.
+    
+    With ``format="compact"`` sentences come back as spans of the text
+    instead of copies, encoded with orjson when installed and compressed
+    as the client's ``Accept-Encoding`` allows.
+    
+    Args:
+        request: Analysis request with text and mode
+        http_request: The HTTP request, for its ``Accept-Encoding`` header
+        
+    Returns:
+        Analysis results with score, metrics, and sentence-level scores, or the
+        ``CompactAnalyzeResponse`` form if ``request.format`` is "compact"
+    """
+    cached = await result_cache.aget(cache_key(clean_text(request.text), mode=request.mode))
+    if cached is not None:
+        logger.info(f"Cache hit: {cached.label} ({cached.score:.2f})")
+        return _respond(cached, request, http_request)
+    
+    logger.info(f"Analyzing text ({len(request.text)} chars)")
+    
+    response = await _run_inference(run_analysis, request.text, request.mode)
+    
+    logger.info(f"Analysis complete: {response.label} ({response.score:.2f})")
+    
+    return _respond(response, request, http_request)
+
+
+@router.post("/analyze/long", response_model=AnalyzeResponse)
+async def analyze_long_text(
+    request: LongAnalyzeRequest, http_request: Request
+) -> Union[AnalyzeResponse, Response]:
+    """Analyze a long document (up to ``long_document_max_length`` characters).
+    
+    The text is scored in model-sized chunks whose results are pooled, so
+    both models see all of it rather than its first window, and memory use
+    doesn't grow with the length.
+    
+    Args:
+        request: Long-document analysis request
+        http_request: The HTTP request, for its ``Accept-Encoding`` header
+        
+    Returns:
+        Analysis results with score, metrics, and sentence-level scores, or the
+        ``CompactAnalyzeResponse`` form if ``request.format`` is "compact"
+    """
+    cached = await result_cache.aget(cache_key(clean_text(request.text), mode="long"))
+    if cached is not None:
+        logger.info(f"Cache hit: {cached.label} ({cached.score:.2f})")
+        return _respond(cached, request, http_request)
+    
+    logger.info(f"Analyzing long text ({len(request.text)} chars)")
+    
+    response = await _run_inference(
+        run_long_analysis, request.text, timeout=settings.long_document_timeout
+    )
+    
+    logger.info(
+        f"Long analysis complete: {response.label} ({response.score:.2f}, "
+        f"{response.metrics.chunks} chunks)"
+    )
+    
+    return _respond(response, request, http_request)
+
+
+@router.post("/analyze/stream")
+async def analyze_text_stream(request: AnalyzeRequest) -> StreamingResponse:
+    """Analyze text, streaming partial results as server-sent events.
+    
+    Events, in order:
+    
+    - ``metrics``: burstiness, repetition, modality and reliability, which
+      need no model and arrive right away
+    - ``sentence``: one per sentence (``index``, ``text``, ``perplexity`` and
+      its local ``score``), in document order as the GPT-2 windows finish
+    - ``result``: the same response as ``/api/analyze``, whose sentence
+      scores are blended with the document score
+    
+    A failure after the stream has started is sent as an ``error`` event with
+    ``status_code`` and ``detail``. Cached texts get the ``result`` at once.
+    
+    Args:
+        request: Analysis request with text
+        
+    Returns:
+        ``text/event-stream`` of analysis events
+    """
+    cached = await result_cache.aget(cache_key(clean_text(request.text), mode=request.mode))
+    if cached is not None:
+        logger.info(f"Cache hit: {cached.label} ({cached.score:.2f})")
+        return StreamingResponse(
+            iter([_sse('result', cached.model_dump())]),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    
+    logger.info(f"Analyzing text as a stream ({len(request.text)} chars)")
+    
+    # Sentence splitting (and the first Punkt load) would block the event loop
+    preprocessed = await _run_inference(_preprocess_or_400, request.text)
+    
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def emit(event: str, data: Dict[str, Any]) -> None:
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+    
+    job = asyncio.create_task(
+        _run_inference(
+            run_streaming_analysis, preprocessed.cleaned, preprocessed.sentences, emit,
+            request.mode, preprocessed.features
+        )
+    )
+    # Events emitted by the job are queued before its completion is
+    job.add_done_callback(lambda _: events.put_nowait(None))
+    
+    # A full queue is rejected on the job's first step; answer it with a 503
+    await asyncio.sleep(0)
+    if job.done():
+        job.result()
+    
+    async def stream() -> AsyncIterator[str]:
+        try:
+            while True:
+                item = await events.get()
+                if item is None:
+                    break
+                yield _sse(*item)
+            
+            try:
+                response = job.result()
+            except HTTPException as e:
+                yield _sse('error', {'status_code': e.status_code, 'detail': e.detail})
+                return
+            
+            logger.info(f"Analysis complete: {response.label} ({response.score:.2f})")
+            yield _sse('result', response.model_dump())
+        finally:
+            job.cancel()
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.post("/analyze/incremental", response_model=AnalyzeResponse)
+async def analyze_text_incremental(
+    request: IncrementalAnalyzeRequest, http_request: Request
+) -> Union[AnalyzeResponse, Response]:
+    """Re-analyze an edited text, running the models only on what changed.
+    
+    Sentences are scored on their own, so sentences from the previous
+    analysis (or anything in the sentence memo) are reused, and the detector
+    is skipped when its input is unchanged. Scores can differ slightly from
+    ``/api/analyze``, which scores sentences in document context.
+    
+    Args:
+        request: Text plus the ``analysis_id`` of the previous version
+        http_request: The HTTP request, for its ``Accept-Encoding`` header
+        
+    Returns:
+        Analysis results, with an ``analysis_id`` for the next edit, or the
+        ``CompactAnalyzeResponse`` form if ``request.format`` is "compact"
+    """
+    cached = await result_cache.aget(cache_key(clean_text(request.text), mode="incremental"))
+    if cached is not None:
+        logger.info(f"Cache hit: {cached.label} ({cached.score:.2f})")
+        return _respond(cached, request, http_request)
+    
+    logger.info(f"Re-analyzing text ({len(request.text)} chars)")
+    
+    response = await _run_inference(
+        run_incremental_analysis, request.text, request.previous_analysis_id
+    )
+    
+    logger.info(f"Incremental analysis complete: {response.label} ({response.score:.2f})")
+    
+    return _respond(response, request, http_request)
+
+
+@router.get("/stats")
+async def inference_stats():
+    """Load, batching and cache statistics for tuning the inference settings.
+    
+    Returns:
+        Model warmup, executor, micro-batcher and result cache statistics
+    """
+    return {
+        "models": model_warmup.stats(),
+        "executor": inference_executor.stats(),
+        "cache": result_cache.stats(),
+        "sentence_memo": sentence_memo.stats(),
+        "batchers": {
+            gpt2_batcher.name: gpt2_batcher.stats(),
+            detector_batcher.name: detector_batcher.stats()
+        }
+    }
+
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint.
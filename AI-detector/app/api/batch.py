@@ -0,0 +1,219 @@
+"""Batch analysis endpoint streaming NDJSON results."""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Union
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from app.api.analyze import result_cache, run_analysis
+from app.schemas.analyze import BatchDocument
+from app.services.preprocessing import clean_text
+from app.core.config import settings
+from app.core.executor import inference_executor, InferenceQueueFull
+from app.core.cache import cache_key
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/api", tags=["analysis"])
+
+NDJSON = "application/x-ndjson"
+
+# Seconds a batch document waits before retrying when the executor is full
+QUEUE_RETRY_DELAY = 0.1
+
+
+class _InvalidLine:
+    """Placeholder for an NDJSON line that isn't valid JSON."""
+    
+    def __init__(self, number: int, error: str):
+        self.number = number
+        self.error = error
+
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[Any]:
+    """Parse an NDJSON body line by line as it arrives."""
+    buffer = b""
+    number = 0
+    
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield _parse_line(line, number)
+    
+    if buffer.strip():
+        yield _parse_line(buffer, number + 1)
+
+
+def _parse_line(line: bytes, number: int) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return _InvalidLine(number, str(e))
+
+
+async def _iter_list(documents: List[Any]) -> AsyncIterator[Any]:
+    for document in documents:
+        yield document
+
+
+async def _analyze_document(document: BatchDocument) -> Dict[str, Any]:
+    """Analyze one batch document, returning its NDJSON line."""
+    try:
+        if len(document.text) > settings.batch_max_text_length:
+            raise ValueError(
+                f"Text is longer than {settings.batch_max_text_length} characters"
+            )
+        
+        key = cache_key(clean_text(document.text), mode=document.mode)
+        response = await result_cache.aget(key)
+        while response is None:
+            try:
+                response = await inference_executor.run(run_analysis, document.text, document.mode)
+            except InferenceQueueFull:
+                # Interactive traffic holds the free slots; wait for one
+                await asyncio.sleep(QUEUE_RETRY_DELAY)
+        
+        return {'id': document.id, 'result': response.model_dump()}
+    
+    except HTTPException as e:
+        return {'id': document.id, 'error': e.detail}
+    except asyncio.TimeoutError:
+        return {'id': document.id, 'error': "Analysis took too long"}
+    except Exception as e:
+        logger.error(f"Error analyzing batch document {document.id!r}: {e}", exc_info=True)
+        return {'id': document.id, 'error': f"Error analyzing text: {str(e)}"}
+
+
+class _BatchRun:
+    """Analyzes batch documents concurrently, collecting NDJSON lines as they finish.
+    
+    Documents start as soon as they are read, up to ``batch_concurrency`` at a
+    time, so their model calls land in the same micro-batches. By default that
+    is half the executor's workers, leaving the rest to interactive requests.
+    """
+    
+    def __init__(self, items: AsyncIterator[Any]):
+        self._items = items
+        self._semaphore = asyncio.Semaphore(
+            settings.batch_concurrency or max(1, inference_executor.workers // 2)
+        )
+        self._lines: asyncio.Queue = asyncio.Queue()
+        self._tasks = set()
+        self.reader = asyncio.create_task(self._read())
+        self._feeder = asyncio.create_task(self._feed())
+    
+    async def _run(self, document: BatchDocument) -> None:
+        async with self._semaphore:
+            await self._lines.put(await _analyze_document(document))
+    
+    async def _feed(self) -> None:
+        try:
+            await asyncio.gather(self.reader, return_exceptions=True)
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            await self._lines.put(None)
+    
+    async def _read(self) -> None:
+        count = 0
+        async for item in self._items:
+            if isinstance(item, _InvalidLine):
+                await self._lines.put({'id': None, 'error': f"Line {item.number}: {item.error}"})
+                continue
+            
+            count += 1
+            if count > settings.batch_max_documents:
+                await self._lines.put({
+                    'id': None,
+                    'error': f"Batch is limited to {settings.batch_max_documents} documents"
+                })
+                break
+            
+            try:
+                document = BatchDocument.model_validate(item)
+            except ValidationError as e:
+                doc_id = item.get('id') if isinstance(item, dict) else None
+                await self._lines.put({'id': doc_id, 'error': _validation_message(e)})
+                continue
+            
+            self._tasks.add(asyncio.create_task(self._run(document)))
+    
+    def cancel(self) -> None:
+        """Stop reading and drop unfinished documents."""
+        self.reader.cancel()
+        self._feeder.cancel()
+        for task in self._tasks:
+            task.cancel()
+    
+    async def stream(self) -> AsyncIterator[str]:
+        """Yield NDJSON lines in completion order."""
+        try:
+            while True:
+                line = await self._lines.get()
+                if line is None:
+                    break
+                yield json.dumps(line) + "\n"
+        finally:
+            # Also runs if the client went away mid-stream
+            self.cancel()
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+@router.post("/analyze/batch")
+async def analyze_batch(request: Request) -> StreamingResponse:
+    """Analyze many documents, streaming one NDJSON line per document.
+    
+    The body is either a JSON array of ``{"id": ..., "text": ...}`` objects or,
+    with ``Content-Type: application/x-ndjson``, one such object per line;
+    NDJSON documents start as soon as their line arrives, while the rest of
+    the body is still uploading. Lines come back in
+    completion order as ``{"id": ..., "result": {...}}`` or
+    ``{"id": ..., "error": "..."}``.
+    
+    Args:
+        request: Raw request (parsed here so NDJSON can be streamed)
+    
+    Returns:
+        NDJSON stream of results
+    """
+    content_type = request.headers.get("content-type", "")
+    
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items: AsyncIterator[Any] = _iter_ndjson(request)
+    else:
+        try:
+            body: Union[List[Any], Dict[str, Any]] = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be JSON or NDJSON")
+        if isinstance(body, dict):
+            body = body.get("documents")
+        if not isinstance(body, list):
+            raise HTTPException(
+                status_code=400,
+                detail="Body must be an array of {\"id\", \"text\"} documents"
+            )
+        items = _iter_list(body)
+    
+    logger.info("Starting batch analysis")
+    
+    run = _BatchRun(items)
+    try:
+        # Finish reading the body before streaming: the response listens for
+        # client disconnects on the same receive channel the body arrives on
+        await run.reader
+    except BaseException:
+        run.cancel()
+        raise
+    
+    return StreamingResponse(run.stream(), media_type=NDJSON)
@@ -0,0 +1,280 @@
+"""Content-addressed cache of analysis results, shared across workers."""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Bump when scoring code changes in a way that invalidates stored results
+CACHE_VERSION = 1
+
+# Settings that change the result for a given text
+_KEY_SETTINGS = (
+    'model_name',
+    'classifier_model_name',
+    'inference_backend',
+    'max_token_length',
+    'perplexity_stride',
+    'detector_stride',
+    'detector_pooling',
+    'long_document_chunk_chars',
+    'cascade_uncertain_low',
+    'cascade_uncertain_high',
+    'ai_threshold',
+    'human_threshold',
+    'perplexity_weight',
+    'burstiness_weight',
+    'repetition_weight',
+    'variance_weight'
+)
+
+# Expired rows are purged from disk once every this many writes
+_PURGE_EVERY = 100
+
+
+def scoring_config() -> Dict[str, Any]:
+    """Everything in ``settings`` that affects a result, plus the cache version."""
+    return {
+        'version': CACHE_VERSION,
+        'config': {name: getattr(settings, name) for name in _KEY_SETTINGS}
+    }
+
+
+def cache_key(cleaned_text: str, mode: str = "full") -> str:
+    """Hash of the cleaned text plus everything in ``settings`` that affects its result.
+    
+    Args:
+        cleaned_text: Output of ``clean_text``
+        mode: Analysis mode ("full", "fast", "incremental" or "long"), which score differently
+    
+    Returns:
+        Hex digest identifying the analysis
+    """
+    payload = dict(scoring_config(), mode=mode, text=cleaned_text)
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResultCache:
+    """In-process LRU with TTL in front of an optional SQLite file.
+    
+    Memory hits return the stored object itself. When ``settings.result_cache_path``
+    is set, entries are also written there as JSON so every worker process on
+    the machine shares them; disk hits are promoted into memory. Disk errors
+    are logged and treated as misses so the cache never fails a request.
+    Async handlers look up with ``aget``, which keeps disk reads off the
+    event loop.
+    """
+    
+    def __init__(
+        self,
+        loads: Callable[[str], Any],
+        dumps: Callable[[Any], str],
+        table: str = "results"
+    ):
+        """Create a cache for one kind of value.
+        
+        Args:
+            loads: Rebuilds a value from its JSON form
+            dumps: Serializes a value to JSON
+            table: SQLite table holding this kind of value
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table!r}")
+        self._loads = loads
+        self._dumps = dumps
+        self._table = table
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One SQLite connection per process, shared by threads under its own lock
+        self._disk_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_owner: Optional[Tuple[int, str]] = None
+        self._writes = 0
+        
+        # Stats
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether caching is switched on (``result_cache_size`` > 0)."""
+        return settings.result_cache_size > 0
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for ``key``, or None if absent or expired.
+        
+        May read the SQLite file, so call it from worker threads; the event
+        loop uses ``aget``.
+        """
+        if not self.enabled:
+            return None
+        
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is None:
+            value = self._disk_lookup(key, now)
+        return value
+    
+    async def aget(self, key: str) -> Optional[Any]:
+        """``get`` for the event loop: memory is checked in place, the disk on a thread."""
+        if not self.enabled:
+            return None
+        
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        if not settings.result_cache_path:
+            return self._disk_lookup(key, now)
+        return await asyncio.to_thread(self._disk_lookup, key, now)
+    
+    def put(self, key: str, value: Any) -> None:
+        """Store ``value`` under ``key`` in memory and, if configured, on disk."""
+        if not self.enabled:
+            return
+        
+        now = time.time()
+        self._memory_put(key, value, now)
+        self._disk_put(key, value, now)
+    
+    def _memory_get(self, key: str, now: float) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires > now:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return value
+            del self._memory[key]
+            return None
+    
+    def _disk_lookup(self, key: str, now: float) -> Optional[Any]:
+        """Read ``key`` from disk after a memory miss, promoting a hit into memory."""
+        value = self._disk_get(key, now)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+        
+        self._memory_put(key, value, now)
+        return value
+    
+    def _memory_put(self, key: str, value: Any, now: float) -> None:
+        with self._lock:
+            self._memory[key] = (now + settings.result_cache_ttl, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > settings.result_cache_size:
+                self._memory.popitem(last=False)
+    
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """This process's connection to the cache file (None when disk caching is off).
+        
+        Opened, and its table created, on first use; callers hold ``_disk_lock``.
+        """
+        path = settings.result_cache_path
+        if not path:
+            return None
+        
+        # A forked worker must not share its parent's connection
+        owner = (os.getpid(), path)
+        if self._conn is None or self._conn_owner != owner:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+            # WAL lets readers in other workers proceed while one writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self._table}_created ON {self._table} (created)"
+            )
+            conn.commit()
+            self._conn, self._conn_owner = conn, owner
+        return self._conn
+    
+    def _disk_get(self, key: str, now: float) -> Optional[Any]:
+        try:
+            with self._disk_lock:
+                conn = self._connection()
+                if conn is None:
+                    return None
+                row = conn.execute(
+                    f"SELECT value FROM {self._table} WHERE key = ? AND created > ?",
+                    (key, now - settings.result_cache_ttl)
+                ).fetchone()
+            return self._loads(row[0]) if row else None
+        except Exception as e:
+            logger.warning(f"Result cache read failed: {e}")
+            return None
+    
+    def _disk_put(self, key: str, value: Any, now: float) -> None:
+        try:
+            if not settings.result_cache_path:
+                return
+            encoded = self._dumps(value)
+            with self._disk_lock:
+                conn = self._connection()
+                with conn:
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {self._table} (key, value, created) "
+                        "VALUES (?, ?, ?)",
+                        (key, encoded, now)
+                    )
+                
+                self._writes += 1
+                if self._writes % _PURGE_EVERY == 0:
+                    with conn:
+                        conn.execute(
+                            f"DELETE FROM {self._table} WHERE created <= ?",
+                            (now - settings.result_cache_ttl,)
+                        )
+        except Exception as e:
+            logger.warning(f"Result cache write failed: {e}")
+    
+    def clear(self) -> None:
+        """Drop every entry, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+        try:
+            with self._disk_lock:
+                conn = self._connection()
+                if conn is not None:
+                    with conn:
+                        conn.execute(f"DELETE FROM {self._table}")
+        except Exception as e:
+            logger.warning(f"Result cache clear failed: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit and miss counters for monitoring."""
+        with self._lock:
+            memory_hits, disk_hits, misses = self._memory_hits, self._disk_hits, self._misses
+            size = len(self._memory)
+        lookups = memory_hits + disk_hits + misses
+        return {
+            'enabled': self.enabled,
+            'disk': bool(settings.result_cache_path),
+            'size': size,
+            'hits': memory_hits + disk_hits,
+            'memory_hits': memory_hits,
+            'disk_hits': disk_hits,
+            'misses': misses,
+            'hit_rate': (memory_hits + disk_hits) / lookups if lookups else 0.0
+        }
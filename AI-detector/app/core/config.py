@@ -13,8 +13,41 @@ class Settings(BaseSettings):
     # Model settings
     model_name: str = "distilgpt2"
     classifier_model_name: str = "roberta-base-openai-detector"
-    max_token_length: int = 1024
+    max_token_length: int = 1024  # GPT-2 window size
+    perplexity_stride: int = 512  # Tokens advanced per window; 0 truncates at one window
     device: str = "cpu"  # Use "cuda" if GPU available
+    inference_backend: str = "torch"  # "torch" (fp32), "quantized" (dynamic INT8) or "onnx"
+    onnx_model_dir: str = "models/onnx"  # Exported ONNX graphs, created on first load
+    preload_models: bool = True  # Load and warm up models in the background at startup
+    nltk_data_dir: str = "models/nltk_data"  # Bundled nltk data (the punkt_tab sentence model)
+    detector_stride: int = 256  # Tokens between 512-token detector windows; 0 classifies the first only
+    detector_pooling: str = "length_weighted"  # Window probabilities -> document: "mean", "max" or "length_weighted"
+    
+    # Standalone sentence scoring (used when document slicing isn't available)
+    sentence_batch_size: int = 16
+    sentence_length_buckets: list = [16, 32, 64, 128, 256, 512]
+    sentence_memo_size: int = 20000  # Sentence perplexities remembered; 0 disables
+    
+    # Inference executor
+    inference_workers: int = 0  # 0 = per CPU core (4 per core with micro-batching)
+    inference_queue_size: int = 8  # Requests allowed to wait for a worker
+    inference_timeout: float = 60.0  # Seconds before a request gives up
+    inference_retry_after: int = 5  # Retry-After seconds sent when the queue is full
+    torch_threads: int = 0  # Intra-op threads per process; 0 = torch default
+    
+    # Micro-batching of model calls across concurrent requests
+    batching_enabled: bool = True
+    batch_max_wait_ms: float = 5.0  # How long the first item waits for company
+    batch_max_tokens: int = 2048  # Padded tokens per forward pass
+    
+    # Cascade ("fast" mode): skip GPT-2 when the detector and text statistics agree
+    cascade_uncertain_low: float = 35.0  # Detector probability at or below this can exit as human
+    cascade_uncertain_high: float = 65.0  # Detector probability at or above this can exit as AI
+    
+    # Analysis result cache
+    result_cache_size: int = 256  # In-process entries; 0 disables caching
+    result_cache_ttl: float = 3600.0  # Seconds before a result is recomputed
+    result_cache_path: str = ""  # SQLite file shared by workers; empty = memory only
     
     # Scoring thresholds
     ai_threshold: float = 70.0
@@ -29,6 +62,20 @@ class Settings(BaseSettings):
     # API settings
     cors_origins: list = ["*"]
     max_text_length: int = 10000
+    compression_min_bytes: int = 1024  # Compact responses smaller than this aren't compressed
+    gzip_level: int = 6  # 1 (fastest) to 9 (smallest)
+    brotli_quality: int = 5  # 0 (fastest) to 11 (smallest); needs the brotli package
+    
+    # Batch analysis
+    batch_max_documents: int = 1000  # Documents per batch request
+    batch_max_text_length: int = 100000  # Characters per batch document
+    batch_concurrency: int = 0  # Documents in flight per batch; 0 = half the executor workers
+    
+    # Long-document mode
+    long_document_max_length: int = 500000  # Characters accepted by /api/analyze/long
+    long_document_chunk_chars: int = 2000  # Chunk size; ~2000 characters fit the detector's 512 tokens
+    long_document_chunk_batch: int = 4  # Chunks in memory (and in one model batch) at a time
+    long_document_timeout: float = 600.0  # Seconds before a long analysis gives up
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,97 @@
+"""Fast JSON encoding and per-request compression of API responses."""
+import gzip
+import json
+from typing import Any, Dict, Optional
+
+from fastapi.responses import Response
+from app.core.config import settings
+
+# Optional speedups (pip install ".[speedups]"); the stdlib is used without them
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def dumps(content: Any) -> bytes:
+    """Encode JSON-compatible content as compact UTF-8 JSON, with orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def supported_encodings() -> Dict[str, int]:
+    """Content codings this server can produce, with their preference (higher first)."""
+    encodings = {'gzip': 1}
+    if brotli is not None:
+        encodings['br'] = 2
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the content coding for a response from the ``Accept-Encoding`` header.
+    
+    The coding with the highest q-value wins, brotli before gzip on a tie;
+    ``q=0`` refuses a coding and ``*`` stands for the unlisted ones.
+    
+    Args:
+        accept_encoding: Request header value, if any
+    
+    Returns:
+        "br", "gzip", or None to send the body as is
+    """
+    if not accept_encoding:
+        return None
+    
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            weights[name.strip().lower()] = quality
+    
+    wildcard = weights.get('*', 0.0)
+    best, best_rank = None, (0.0, 0)
+    for encoding, preference in supported_encodings().items():
+        rank = (weights.get(encoding, wildcard), preference)
+        if rank[0] > 0 and rank > best_rank:
+            best, best_rank = encoding, rank
+    return best
+
+
+def json_response(content: Any, accept_encoding: Optional[str] = None) -> Response:
+    """A JSON response, compressed as the client accepts when it is worth it.
+    
+    Bodies under ``settings.compression_min_bytes`` are sent as is, since
+    compressing them costs more time than it saves on the wire.
+    
+    Args:
+        content: JSON-compatible content (dicts, lists, strings, numbers)
+        accept_encoding: The request's ``Accept-Encoding`` header
+    
+    Returns:
+        ``application/json`` response, with ``Content-Encoding`` if compressed
+    """
+    body = dumps(content)
+    headers = {'Vary': 'Accept-Encoding'}
+    
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is not None and len(body) >= settings.compression_min_bytes:
+        if encoding == 'br':
+            body = brotli.compress(body, quality=settings.brotli_quality)
+        else:
+            body = gzip.compress(body, compresslevel=settings.gzip_level, mtime=0)
+        headers['Content-Encoding'] = encoding
+    
+    return Response(body, media_type='application/json', headers=headers)
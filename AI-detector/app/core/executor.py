@@ -0,0 +1,131 @@
+"""Bounded thread pool for running model inference off the event loop."""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue has no free slot for a new request."""
+
+
+class InferenceExecutor:
+    """Runs blocking inference jobs on a fixed-size thread pool.
+    
+    At most ``workers + queue_size`` jobs are admitted at once; anything beyond
+    that is rejected immediately with ``InferenceQueueFull`` so callers can shed
+    load instead of piling requests onto a saturated CPU.
+    """
+    
+    def __init__(self):
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._workers = 0
+        self._capacity = 0
+    
+    def _ensure_pool(self) -> ThreadPoolExecutor:
+        """Create the pool on first use (after any worker fork)."""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._workers = settings.inference_workers or _default_workers()
+                    self._capacity = self._workers + settings.inference_queue_size
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self._workers,
+                        thread_name_prefix="inference",
+                        initializer=_configure_torch_threads
+                    )
+                    logger.info(
+                        f"Inference executor started: {self._workers} workers, "
+                        f"{settings.inference_queue_size} queued"
+                    )
+        return self._pool
+    
+    @property
+    def workers(self) -> int:
+        """Number of worker threads (starts the pool if needed)."""
+        self._ensure_pool()
+        return self._workers
+    
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+    
+    async def run(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None) -> Any:
+        """Run ``fn(*args)`` on the pool and await its result.
+        
+        Args:
+            fn: Blocking callable
+            *args: Arguments for ``fn``
+            timeout: Seconds to wait (``settings.inference_timeout`` if omitted)
+        
+        Returns:
+            The return value of ``fn``
+        
+        Raises:
+            InferenceQueueFull: If every worker and queue slot is taken
+            asyncio.TimeoutError: If the job doesn't finish in time
+        """
+        pool = self._ensure_pool()
+        
+        with self._lock:
+            if self._pending >= self._capacity:
+                raise InferenceQueueFull()
+            self._pending += 1
+        
+        # The slot is released when the job really finishes, even after a timeout
+        try:
+            future = pool.submit(fn, *args)
+        except RuntimeError:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        
+        timeout = settings.inference_timeout if timeout is None else timeout
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+    
+    def stats(self) -> Dict[str, int]:
+        """Current load of the executor."""
+        with self._lock:
+            pending = self._pending
+        return {
+            'workers': self._workers,
+            'capacity': self._capacity,
+            'pending': pending,
+            'queued': max(pending - self._workers, 0)
+        }
+    
+    def shutdown(self) -> None:
+        """Stop accepting jobs and release the worker threads."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _default_workers() -> int:
+    """One worker per core, or several when micro-batching does the model work.
+    
+    With batching on, workers mostly wait for the batcher thread, and more of
+    them in flight is what lets concurrent requests share a forward pass.
+    """
+    cores = os.cpu_count() or 1
+    return cores * 4 if settings.batching_enabled else cores
+
+
+def _configure_torch_threads() -> None:
+    """Apply the configured intra-op thread count (process-wide in torch)."""
+    if settings.torch_threads > 0:
+        import torch
+        torch.set_num_threads(settings.torch_threads)
+
+
+# Global instance
+inference_executor = InferenceExecutor()
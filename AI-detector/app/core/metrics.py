@@ -0,0 +1,240 @@
+"""Prometheus counters, histograms and stage timing spans."""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-millisecond text statistics up to long-document runs
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+# (labels, value) pairs making up one metric family
+Samples = List[Tuple[Dict[str, str], float]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        """Add ``amount`` to the series with these label values (in ``labelnames`` order)."""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labelvalues, value in values:
+            labels = dict(zip(self.labelnames, labelvalues))
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Histogram of observed values with fixed buckets and optional labels."""
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: [count per bucket (the last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, *labelvalues: str) -> None:
+        """Record one value in the series with these label values."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted(
+                (labelvalues, list(counts), total)
+                for labelvalues, (counts, total) in self._series.items()
+            )
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labelvalues, counts, total in series:
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = dict(labels, le=_format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics of this process, rendered in the Prometheus text format.
+    
+    Besides counters and histograms updated as requests run, collectors are
+    called at scrape time for values that already live elsewhere (cache
+    counters, queue depth, load times), so they cost nothing per request.
+    """
+    
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create and register a counter."""
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Create and register a histogram."""
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+    
+    def add_collector(self, collect: Callable[[], Iterable[Tuple[str, str, str, Samples]]]) -> None:
+        """Register a function yielding ``(name, type, help, samples)`` families at scrape time."""
+        self._collectors.append(collect)
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, documentation, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class _Span:
+    """Times a ``with`` block into the stage histogram."""
+    
+    __slots__ = ('stage', 'started')
+    
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.started = 0.0
+    
+    def __enter__(self) -> '_Span':
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        stage_seconds.observe(time.perf_counter() - self.started, self.stage)
+
+
+def span(stage: str) -> _Span:
+    """Time a pipeline stage: ``with span("detector"): ...``.
+    
+    Args:
+        stage: Stage name (the ``stage`` label of ``detector_stage_seconds``)
+    
+    Returns:
+        Context manager recording the block's duration
+    """
+    return _Span(stage)
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting HTTP requests and timing them, by route template.
+    
+    Labelled by the matched route (``/api/analyze``, not the raw path), so
+    the number of series stays fixed; unmatched paths and static files are
+    ``other``. Streaming responses are timed until their last chunk.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", None) or "other"
+            http_requests.inc(route, scope["method"], str(status))
+            http_request_seconds.observe(time.perf_counter() - started, route)
+
+
+# Global registry and the metrics shared across modules
+metrics = MetricsRegistry()
+
+stage_seconds = metrics.histogram(
+    "detector_stage_seconds", "Time spent in each analysis stage", ["stage"]
+)
+http_requests = metrics.counter(
+    "detector_http_requests_total", "HTTP requests by route, method and status",
+    ["route", "method", "status"]
+)
+http_request_seconds = metrics.histogram(
+    "detector_http_request_seconds", "HTTP request latency by route", ["route"]
+)
+model_tokens = metrics.counter(
+    "detector_model_tokens_total", "Tokens run through each model", ["model"]
+)
+model_batch_seconds = metrics.histogram(
+    "detector_model_batch_seconds", "Duration of one model forward pass", ["model"]
+)
+cascade_decisions = metrics.counter(
+    "detector_cascade_total", "Fast-mode analyses that stopped after the detector or escalated",
+    ["outcome"]
+)
@@ -2,12 +2,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 import os
 
 from app.core.config import settings
 from app.core.logging import setup_logging, get_logger
-from app.api.analyze import router as analyze_router
+from app.core.executor import inference_executor
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, metrics
+from app.api.analyze import router as analyze_router, result_cache
+from app.api.batch import router as batch_router
+from app.models.gpt2_loader import gpt2_loader
+from app.models.detector_loader import detector_loader
+from app.services.perplexity import gpt2_batcher, sentence_memo
+from app.services.classifier import detector_batcher
+from app.services.warmup import model_warmup
 
 # Setup logging
 setup_logging("INFO" if not settings.debug else "DEBUG")
@@ -38,14 +46,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts and latency for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(analyze_router)
+app.include_router(batch_router)
 
 @app.get("/health")
 async def root_health():
     """System health check."""
     return {"status": "ok", "app": settings.app_name}
 
+@app.get("/ready")
+async def readiness():
+    """Readiness check: 200 once the models are loaded and warmed up, 503 before."""
+    if not settings.preload_models:
+        return {"status": "ready", "preload": False}
+    stats = model_warmup.stats()
+    return JSONResponse(stats, status_code=200 if model_warmup.ready else 503)
+
+def _runtime_metrics():
+    """Metrics read from existing state at scrape time: load, queues and caches."""
+    load_seconds = [
+        ({'model': 'gpt2'}, gpt2_loader.load_seconds),
+        ({'model': 'detector'}, detector_loader.load_seconds)
+    ]
+    yield ('detector_model_load_seconds', 'gauge', 'Seconds the last model load took',
+           [(labels, value) for labels, value in load_seconds if value is not None])
+    if 'warmup_seconds' in model_warmup.timings:
+        yield ('detector_model_warmup_seconds', 'gauge', 'Seconds the warmup passes took',
+               [({}, model_warmup.timings['warmup_seconds'])])
+    yield ('detector_ready', 'gauge', 'Whether the models are loaded and warmed up',
+           [({}, 1 if model_warmup.ready or not settings.preload_models else 0)])
+    
+    executor = inference_executor.stats()
+    yield ('detector_executor_workers', 'gauge', 'Inference worker threads',
+           [({}, executor['workers'])])
+    yield ('detector_executor_pending', 'gauge', 'Analyses running or waiting for a worker',
+           [({}, executor['pending'])])
+    yield ('detector_executor_queued', 'gauge', 'Analyses waiting for a worker',
+           [({}, executor['queued'])])
+    
+    batchers = {batcher.name: batcher.stats() for batcher in (gpt2_batcher, detector_batcher)}
+    yield ('detector_batcher_queue_depth', 'gauge', 'Items waiting for a micro-batch',
+           [({'model': name}, stats['queue_depth']) for name, stats in batchers.items()])
+    yield ('detector_batcher_batches_total', 'counter', 'Micro-batches run',
+           [({'model': name}, stats['batches']) for name, stats in batchers.items()])
+    yield ('detector_batcher_items_total', 'counter', 'Items run in micro-batches',
+           [({'model': name}, stats['items']) for name, stats in batchers.items()])
+    
+    cache = result_cache.stats()
+    yield ('detector_result_cache_hits_total', 'counter', 'Result cache hits by tier',
+           [({'tier': 'memory'}, cache['memory_hits']), ({'tier': 'disk'}, cache['disk_hits'])])
+    yield ('detector_result_cache_misses_total', 'counter', 'Result cache misses',
+           [({}, cache['misses'])])
+    yield ('detector_result_cache_hit_ratio', 'gauge', 'Result cache hits per lookup',
+           [({}, cache['hit_rate'])])
+    yield ('detector_result_cache_size', 'gauge', 'Results held in memory',
+           [({}, cache['size'])])
+    
+    memo = sentence_memo.stats()
+    yield ('detector_sentence_memo_hits_total', 'counter', 'Sentence memo hits',
+           [({}, memo['hits'])])
+    yield ('detector_sentence_memo_misses_total', 'counter', 'Sentence memo misses',
+           [({}, memo['misses'])])
+
+
+metrics.add_collector(_runtime_metrics)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics: stage timings, requests, tokens, model load, queues and caches."""
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
 # Serve frontend static files
 frontend_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend")
 if os.path.exists(frontend_path):
@@ -57,17 +131,19 @@ async def startup_event():
     logger.info(f"Environment: {settings.environment}")
     logger.info(f"Model: {settings.model_name}")
     
-    # Preload model (commented out to avoid blocking server startup)
-    # from app.models.gpt2_loader import gpt2_loader
-    # gpt2_loader.load()
-    # logger.info("Model preloaded successfully")
-    logger.info("Model will be loaded on the first request")
+    # Preload on a background thread so startup isn't blocked; /ready reports progress
+    if settings.preload_models:
+        model_warmup.start()
+        logger.info("Preloading models in the background")
+    else:
+        logger.info("Model will be loaded on the first request")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run on application shutdown."""
     logger.info("Shutting down application")
+    inference_executor.shutdown()
 
 
 if __name__ == "__main__":
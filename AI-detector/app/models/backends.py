@@ -0,0 +1,182 @@
+"""Inference backends for the model loaders: fp32 torch, dynamic INT8 torch, ONNX Runtime."""
+import inspect
+import os
+from types import SimpleNamespace
+from typing import Optional, Type
+import torch
+from torch import nn
+from transformers import PreTrainedModel
+from transformers.pytorch_utils import Conv1D
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+BACKENDS = ("torch", "quantized", "onnx")
+
+
+def load_model(model_cls: Type[PreTrainedModel], model_name: str):
+    """Load a model with the configured ``settings.inference_backend``.
+    
+    Args:
+        model_cls: Transformers class of the model
+        model_name: Hugging Face model name
+    
+    Returns:
+        A callable model whose output has ``.logits``
+    """
+    backend = settings.inference_backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}, expected one of {BACKENDS}")
+    if backend != "torch" and settings.device != "cpu":
+        raise ValueError(f"The {backend} backend only runs on CPU")
+    
+    if backend == "onnx":
+        path = onnx_model_path(model_name)
+        # Export once; later starts (and other workers) only load the session
+        if not os.path.exists(path):
+            export_onnx(_load_torch(model_cls, model_name), path)
+        return OnnxModel(path)
+    
+    model = _load_torch(model_cls, model_name)
+    if backend == "quantized":
+        model = quantize_model(model)
+    return model
+
+
+def _load_torch(model_cls: Type[PreTrainedModel], model_name: str) -> PreTrainedModel:
+    """Load the fp32 torch model, ready for inference."""
+    model = model_cls.from_pretrained(
+        model_name,
+        low_cpu_mem_usage=True,  # Reduces RAM spike during loading
+        torch_dtype=torch.float32 # Ensure standard precision for stability
+    )
+    
+    # Set to evaluation mode
+    model.eval()
+    
+    # Move to device
+    model.to(torch.device(settings.device))
+    
+    return model
+
+
+def quantize_model(model: PreTrainedModel) -> PreTrainedModel:
+    """Apply dynamic INT8 quantization to the model's linear layers.
+    
+    GPT-2 stores its projections as ``Conv1D``, so those are converted to
+    ``nn.Linear`` first. An output head tied to the input embeddings is left in
+    fp32: quantizing it would add an INT8 copy next to the shared fp32 matrix.
+    """
+    _conv1d_to_linear(model)
+    
+    tied_head = model.get_output_embeddings()
+    qconfig = torch.ao.quantization.default_dynamic_qconfig
+    spec = {
+        name: qconfig
+        for name, module in model.named_modules()
+        if isinstance(module, nn.Linear) and module is not tied_head
+    }
+    
+    return torch.ao.quantization.quantize_dynamic(model, spec, dtype=torch.qint8, inplace=True)
+
+
+def _conv1d_to_linear(model: nn.Module) -> None:
+    """Replace every transformers ``Conv1D`` with the equivalent ``nn.Linear``."""
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if not isinstance(child, Conv1D):
+                continue
+            # Conv1D computes x @ W + b with W shaped (in, out); Linear wants (out, in)
+            linear = nn.Linear(child.weight.shape[0], child.weight.shape[1])
+            linear.weight = nn.Parameter(child.weight.detach().t().contiguous())
+            linear.bias = child.bias
+            setattr(parent, name, linear)
+
+
+def onnx_model_path(model_name: str) -> str:
+    """Where the exported ONNX graph for a model is kept."""
+    return os.path.join(settings.onnx_model_dir, model_name.replace("/", "--") + ".onnx")
+
+
+class _LogitsOnly(nn.Module):
+    """Wraps a model so the exported graph takes ids and mask and returns logits."""
+    
+    def __init__(self, model: PreTrainedModel):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def export_onnx(model: PreTrainedModel, path: str) -> None:
+    """Export a model to ONNX with dynamic batch and sequence axes.
+    
+    Args:
+        model: fp32 torch model in eval mode
+        path: Destination file (written atomically, so concurrent workers are safe)
+    """
+    logger.info(f"Exporting {type(model).__name__} to ONNX at {path}")
+    
+    if hasattr(model.config, 'use_cache'):
+        model.config.use_cache = False
+    
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    
+    # A padded row keeps the masking path in the traced graph
+    dummy_ids = torch.full((2, 8), 2, dtype=torch.long)
+    dummy_mask = torch.ones((2, 8), dtype=torch.long)
+    dummy_mask[1, 5:] = 0
+    dynamic = {0: 'batch', 1: 'sequence'}
+    # Newer torch defaults to the dynamo exporter; the pinned 2.1 only has TorchScript
+    options = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        options['dynamo'] = False
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model).cpu(),
+            (dummy_ids, dummy_mask),
+            tmp_path,
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['logits'],
+            dynamic_axes={'input_ids': dynamic, 'attention_mask': dynamic, 'logits': dynamic},
+            opset_version=17,
+            **options
+        )
+    os.replace(tmp_path, path)
+
+
+class OnnxModel:
+    """ONNX Runtime session that can be called like the torch model."""
+    
+    def __init__(self, path: str):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError(
+                "The onnx backend needs onnxruntime: pip install onnxruntime onnx"
+            ) from e
+        
+        options = ort.SessionOptions()
+        if settings.torch_threads > 0:
+            options.intra_op_num_threads = settings.torch_threads
+        self._session = ort.InferenceSession(
+            path, options, providers=['CPUExecutionProvider']
+        )
+        self.path = path
+    
+    def __call__(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: Optional[torch.Tensor] = None
+    ) -> SimpleNamespace:
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        (logits,) = self._session.run(['logits'], {
+            'input_ids': input_ids.cpu().numpy(),
+            'attention_mask': attention_mask.cpu().numpy()
+        })
+        return SimpleNamespace(logits=torch.from_numpy(logits))
@@ -1,11 +1,14 @@
 """RoBERTa classifier loader with singleton pattern."""
-from typing import Optional, Tuple
-import torch
-from transformers import RobertaForSequenceClassification, RobertaTokenizer
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, Tuple
 
 from app.core.config import settings
 from app.core.logging import get_logger
 
+if TYPE_CHECKING:
+    from transformers import RobertaForSequenceClassification, RobertaTokenizerFast
+
 logger = get_logger(__name__)
 
 
@@ -13,53 +16,70 @@ class DetectorLoader:
     """Singleton class for loading and caching the specialized RoBERTa detector."""
     
     _instance: Optional['DetectorLoader'] = None
-    _model: Optional[RobertaForSequenceClassification] = None
-    _tokenizer: Optional[RobertaTokenizer] = None
+    _model: Optional['RobertaForSequenceClassification'] = None
+    _tokenizer: Optional['RobertaTokenizerFast'] = None
+    _lock = threading.Lock()
+    load_seconds: Optional[float] = None  # Duration of the last load
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def load(self) -> Tuple[RobertaForSequenceClassification, RobertaTokenizer]:
+    def load(self) -> Tuple['RobertaForSequenceClassification', 'RobertaTokenizerFast']:
         """Load RoBERTa model and tokenizer.
         
         Returns:
             Tuple of (model, tokenizer)
         """
         if self._model is None or self._tokenizer is None:
-            logger.info(f"Loading classifier: {settings.classifier_model_name}")
-            
-            self._tokenizer = RobertaTokenizer.from_pretrained(settings.classifier_model_name)
-            self._model = RobertaForSequenceClassification.from_pretrained(
-                settings.classifier_model_name,
-                low_cpu_mem_usage=True,
-                torch_dtype=torch.float32
-            )
-            
-            # Set to evaluation mode
-            self._model.eval()
-            
-            # Move to device
-            device = torch.device(settings.device)
-            self._model.to(device)
-            
-            # Optional: Disable gradients globally to save memory
-            torch.set_grad_enabled(False)
-            
-            logger.info(f"Classifier loaded successfully on {settings.device}")
+            # Inference threads may race here on the first requests
+            with self._lock:
+                if self._model is None or self._tokenizer is None:
+                    self._load()
         
         return self._model, self._tokenizer
     
+    def _load(self) -> None:
+        """Load model and tokenizer (caller holds the lock)."""
+        logger.info(f"Loading classifier: {settings.classifier_model_name}")
+        started = time.perf_counter()
+        
+        # Imported here, not at module level, so the server starts without them
+        import torch
+        from transformers import RobertaForSequenceClassification, RobertaTokenizerFast
+        from app.models.backends import load_model
+        
+        # Fast (Rust) tokenizer: documents are tokenized once, with character offsets
+        tokenizer = RobertaTokenizerFast.from_pretrained(settings.classifier_model_name)
+        model = load_model(RobertaForSequenceClassification, settings.classifier_model_name)
+        
+        # Optional: Disable gradients globally to save memory
+        torch.set_grad_enabled(False)
+        
+        # Publish only fully prepared objects to threads outside the lock
+        self._model, self._tokenizer = model, tokenizer
+        self.load_seconds = time.perf_counter() - started
+        
+        logger.info(
+            f"Classifier loaded successfully on {settings.device} "
+            f"({settings.inference_backend} backend)"
+        )
+    
+    def unload(self) -> None:
+        """Drop the loaded model so the next ``load()`` picks up current settings."""
+        with self._lock:
+            self._model, self._tokenizer = None, None
+    
     @property
-    def model(self) -> RobertaForSequenceClassification:
+    def model(self) -> 'RobertaForSequenceClassification':
         """Get the model instance."""
         if self._model is None:
             self.load()
         return self._model
     
     @property
-    def tokenizer(self) -> RobertaTokenizer:
+    def tokenizer(self) -> 'RobertaTokenizerFast':
         """Get the tokenizer instance."""
         if self._tokenizer is None:
             self.load()
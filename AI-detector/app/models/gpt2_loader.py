@@ -1,11 +1,14 @@
 """GPT-2 model loader with singleton pattern."""
-from typing import Optional, Tuple
-import torch
-from transformers import GPT2LMHeadModel, GPT2Tokenizer
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, Tuple
 
 from app.core.config import settings
 from app.core.logging import get_logger
 
+if TYPE_CHECKING:
+    from transformers import GPT2LMHeadModel, GPT2TokenizerFast
+
 logger = get_logger(__name__)
 
 
@@ -13,53 +16,70 @@ class GPT2Loader:
     """Singleton class for loading and caching GPT-2 model."""
     
     _instance: Optional['GPT2Loader'] = None
-    _model: Optional[GPT2LMHeadModel] = None
-    _tokenizer: Optional[GPT2Tokenizer] = None
+    _model: Optional['GPT2LMHeadModel'] = None
+    _tokenizer: Optional['GPT2TokenizerFast'] = None
+    _lock = threading.Lock()
+    load_seconds: Optional[float] = None  # Duration of the last load
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def load(self) -> Tuple[GPT2LMHeadModel, GPT2Tokenizer]:
+    def load(self) -> Tuple['GPT2LMHeadModel', 'GPT2TokenizerFast']:
         """Load GPT-2 model and tokenizer.
         
         Returns:
             Tuple of (model, tokenizer)
         """
         if self._model is None or self._tokenizer is None:
-            logger.info(f"Loading model: {settings.model_name}")
-            
-            self._tokenizer = GPT2Tokenizer.from_pretrained(settings.model_name)
-            self._model = GPT2LMHeadModel.from_pretrained(
-                settings.model_name,
-                low_cpu_mem_usage=True,  # Reduces RAM spike during loading
-                torch_dtype=torch.float32 # Ensure standard precision for stability
-            )
-            
-            # Set to evaluation mode
-            self._model.eval()
-            
-            # Move to device
-            device = torch.device(settings.device)
-            self._model.to(device)
-            
-            # Optional: Disable gradients globally to save memory
-            torch.set_grad_enabled(False)
-            
-            logger.info(f"Model loaded successfully on {settings.device}")
+            # Inference threads may race here on the first requests
+            with self._lock:
+                if self._model is None or self._tokenizer is None:
+                    self._load()
         
         return self._model, self._tokenizer
     
+    def _load(self) -> None:
+        """Load model and tokenizer (caller holds the lock)."""
+        logger.info(f"Loading model: {settings.model_name}")
+        started = time.perf_counter()
+        
+        # Imported here, not at module level, so the server starts without them
+        import torch
+        from transformers import GPT2LMHeadModel, GPT2TokenizerFast
+        from app.models.backends import load_model
+        
+        # Fast (Rust) tokenizer: needed for character offsets of each token
+        tokenizer = GPT2TokenizerFast.from_pretrained(settings.model_name)
+        model = load_model(GPT2LMHeadModel, settings.model_name)
+        
+        # Optional: Disable gradients globally to save memory
+        torch.set_grad_enabled(False)
+        
+        # Publish only fully prepared objects to threads outside the lock
+        self._model, self._tokenizer = model, tokenizer
+        self.load_seconds = time.perf_counter() - started
+        
+        logger.info(
+            f"Model loaded successfully on {settings.device} "
+            f"({settings.inference_backend} backend)"
+        )
+    
+    def unload(self) -> None:
+        """Drop the loaded model so the next ``load()`` picks up current settings."""
+        with self._lock:
+            self._model, self._tokenizer = None, None
+    
     @property
-    def model(self) -> GPT2LMHeadModel:
+    def model(self) -> 'GPT2LMHeadModel':
         """Get the model instance."""
         if self._model is None:
             self.load()
         return self._model
     
     @property
-    def tokenizer(self) -> GPT2Tokenizer:
+    def tokenizer(self) -> 'GPT2TokenizerFast':
         """Get the tokenizer instance."""
         if self._tokenizer is None:
             self.load()
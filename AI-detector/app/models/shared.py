@@ -0,0 +1,46 @@
+"""Share model weights between forked workers (preload-and-fork deployment)."""
+import gc
+import os
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.gpt2_loader import gpt2_loader
+from app.models.detector_loader import detector_loader
+
+logger = get_logger(__name__)
+
+
+def preload_shared_models() -> None:
+    """Load both models in the master process, before workers are forked.
+    
+    Forked workers then read the same physical weight pages (copy-on-write;
+    inference never writes to them). The master loads single-threaded so no
+    OpenMP pool exists at fork time, and ``gc.freeze()`` keeps the collector
+    from touching the preloaded objects, which would copy their pages.
+    """
+    if settings.inference_backend == "onnx":
+        # ONNX Runtime sessions own thread pools and aren't fork-safe
+        logger.warning("onnx backend: models are loaded per worker, not shared")
+        return
+    
+    import torch
+    torch.set_num_threads(1)
+    
+    gpt2_loader.load()
+    detector_loader.load()
+    
+    gc.collect()
+    gc.freeze()
+    logger.info("Models preloaded in the master process for sharing with workers")
+
+
+def configure_worker(workers: int) -> None:
+    """Per-worker setup after fork: split the cores between workers.
+    
+    Args:
+        workers: Number of worker processes sharing the machine
+    """
+    import torch
+    threads = settings.torch_threads or max(1, (os.cpu_count() or 1) // max(workers, 1))
+    torch.set_num_threads(threads)
+    logger.info(f"Worker {os.getpid()} started with {threads} torch threads")
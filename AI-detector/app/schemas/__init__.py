@@ -1,4 +1,24 @@
 """Schemas package initialization."""
-from app.schemas.analyze import AnalyzeRequest, AnalyzeResponse, SentenceScore, Metrics
+from app.schemas.analyze import (
+    AnalyzeRequest,
+    AnalyzeResponse,
+    BatchDocument,
+    CompactAnalyzeResponse,
+    DetectorWindow,
+    IncrementalAnalyzeRequest,
+    LongAnalyzeRequest,
+    SentenceScore,
+    Metrics
+)
 
-__all__ = ["AnalyzeRequest", "AnalyzeResponse", "SentenceScore", "Metrics"]
+__all__ = [
+    "AnalyzeRequest",
+    "AnalyzeResponse",
+    "BatchDocument",
+    "CompactAnalyzeResponse",
+    "DetectorWindow",
+    "IncrementalAnalyzeRequest",
+    "LongAnalyzeRequest",
+    "SentenceScore",
+    "Metrics"
+]
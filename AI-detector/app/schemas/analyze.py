@@ -1,12 +1,74 @@
 """Pydantic schemas for API requests and responses."""
-from typing import List, Dict, Optional
+from typing import List, Dict, Literal, Optional, Tuple, Union
 from pydantic import BaseModel, Field, validator
 
+from app.core.config import settings
+
 
 class AnalyzeRequest(BaseModel):
     """Request schema for text analysis."""
     
     text: str = Field(..., min_length=10, max_length=10000, description="Text to analyze")
+    mode: Literal["full", "fast"] = Field(
+        "full", description="fast skips GPT-2 when the detector and text statistics clearly agree"
+    )
+    format: Literal["verbose", "compact"] = Field(
+        "verbose", description="compact returns sentences as [start, end, score] spans of the text"
+    )
+    
+    @validator('text')
+    def validate_text(cls, v):
+        """Validate text is not empty or just whitespace."""
+        if not v.strip():
+            raise ValueError("Text cannot be empty or just whitespace")
+        return v
+
+
+class IncrementalAnalyzeRequest(BaseModel):
+    """Request schema for re-analysing an edited text."""
+    
+    text: str = Field(..., min_length=10, max_length=10000, description="Text to analyze")
+    previous_analysis_id: Optional[str] = Field(
+        None, description="analysis_id of the earlier version of this text"
+    )
+    format: Literal["verbose", "compact"] = Field(
+        "verbose", description="compact returns sentences as [start, end, score] spans of the text"
+    )
+    
+    @validator('text')
+    def validate_text(cls, v):
+        """Validate text is not empty or just whitespace."""
+        if not v.strip():
+            raise ValueError("Text cannot be empty or just whitespace")
+        return v
+
+
+class LongAnalyzeRequest(BaseModel):
+    """Request schema for long-document analysis."""
+    
+    text: str = Field(..., min_length=10, description="Text to analyze")
+    format: Literal["verbose", "compact"] = Field(
+        "verbose", description="compact returns sentences as [start, end, score] spans of the text"
+    )
+    
+    @validator('text')
+    def validate_text(cls, v):
+        """Validate text is not empty, whitespace or over the long-document limit."""
+        if not v.strip():
+            raise ValueError("Text cannot be empty or just whitespace")
+        if len(v) > settings.long_document_max_length:
+            raise ValueError(
+                f"Text cannot be longer than {settings.long_document_max_length} characters"
+            )
+        return v
+
+
+class BatchDocument(BaseModel):
+    """One document of a batch analysis request."""
+    
+    id: Union[str, int] = Field(..., description="Caller's id, echoed back with the result")
+    text: str = Field(..., min_length=10, description="Text to analyze")
+    mode: Literal["full", "fast"] = Field("full", description="Analysis mode, as for /api/analyze")
     
     @validator('text')
     def validate_text(cls, v):
@@ -21,21 +83,35 @@ class SentenceScore(BaseModel):
     
     text: str
     score: float = Field(..., ge=0, le=100)
+    detector_probability: Optional[float] = Field(
+        None, description="Mean AI probability of the detector windows covering the sentence"
+    )
+
+
+class DetectorWindow(BaseModel):
+    """Detector AI probability of one window of the document."""
+    
+    start: int = Field(..., description="Character offset where the window starts")
+    end: int = Field(..., description="Character offset where the window ends")
+    tokens: int
+    probability: float = Field(..., ge=0, le=100)
 
 
 class Metrics(BaseModel):
-    """Individual metric values."""
+    """Individual metric values (GPT-2 ones are absent when a fast analysis skipped it)."""
     
-    perplexity: float
-    perplexity_score: float
+    perplexity: Optional[float] = None
+    perplexity_score: Optional[float] = None
     burstiness: float
     burstiness_score: float
     repetition: float
     repetition_score: float
-    perplexity_variance: float
-    perplexity_variance_score: float
-    cv_score: float
-    skew_score: float
+    perplexity_variance: Optional[float] = None
+    perplexity_variance_score: Optional[float] = None
+    cv_score: Optional[float] = None
+    skew_score: Optional[float] = None
+    tokens_scored: Optional[int] = Field(None, description="GPT-2 tokens that contributed to perplexity")
+    chunks: Optional[int] = Field(None, description="Chunks scored in long-document mode")
 
 
 class AnalyzeResponse(BaseModel):
@@ -49,6 +125,15 @@ class AnalyzeResponse(BaseModel):
     modality: str = Field(..., description="Detected text modality (PROSE/TECHNICAL)")
     modality_warning: Optional[str] = Field(None, description="Warning message for specific modalities")
     sentence_scores: List[SentenceScore]
+    analysis_id: Optional[str] = Field(
+        None, description="Pass as previous_analysis_id to re-analyse an edited version"
+    )
+    stages_run: Optional[List[str]] = Field(
+        None, description="Analysis stages that ran, in order (fast mode may skip GPT-2)"
+    )
+    detector_windows: Optional[List[DetectorWindow]] = Field(
+        None, description="Per-window detector probabilities, pooled into the classifier score"
+    )
     
     class Config:
         json_schema_extra = {
@@ -70,3 +155,28 @@ class AnalyzeResponse(BaseModel):
                 ]
             }
         }
+
+
+class CompactAnalyzeResponse(BaseModel):
+    """Response schema for ``format="compact"``: sentences as spans of the request text.
+    
+    Offsets are character positions in the text as sent (before cleaning),
+    so ``text[start:end]`` is the sentence as the client wrote it. Null
+    fields and metrics are left out.
+    """
+    
+    score: float = Field(..., ge=0, le=100, description="Overall AI detection score (0-100)")
+    label: str = Field(..., description="Classification label")
+    confidence: str = Field(..., description="Confidence level")
+    metrics: Metrics
+    is_reliable: bool
+    modality: str = Field(..., description="Detected text modality (PROSE/TECHNICAL)")
+    modality_warning: Optional[str] = None
+    sentence_spans: List[Tuple[int, int, float]] = Field(
+        ..., description="[start, end, score] of each sentence; [-1, -1, score] if not located"
+    )
+    analysis_id: Optional[str] = None
+    stages_run: Optional[List[str]] = None
+    detector_windows: Optional[List[Tuple[int, int, float]]] = Field(
+        None, description="[start, end, probability] of each detector window"
+    )
@@ -0,0 +1,223 @@
+"""Dynamic micro-batching of model calls from concurrent requests."""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import model_batch_seconds, model_tokens
+
+logger = get_logger(__name__)
+
+
+class _Pending:
+    """One submitted item waiting for its result."""
+    
+    __slots__ = ('item', 'cost', 'future', 'enqueued')
+    
+    def __init__(self, item: Any, cost: int):
+        self.item = item
+        self.cost = cost
+        self.future: Future = Future()
+        self.enqueued = time.monotonic()
+
+
+class MicroBatcher:
+    """Gathers items submitted by concurrent callers and runs them together.
+    
+    A single scheduler thread takes the first waiting item, then keeps
+    collecting for up to ``settings.batch_max_wait_ms`` or until
+    ``settings.batch_max_tokens`` tokens are gathered. The batch is split into
+    padded chunks of at most ``batch_max_tokens`` (longest item x item count),
+    each chunk goes through ``run_batch`` in one call, and every caller gets
+    back the results for its own items.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        run_batch: Callable[[List[Any]], List[Any]],
+        cost: Callable[[Any], int] = len
+    ):
+        """Create a batcher around a batch function.
+        
+        Args:
+            name: Name used in logs and stats
+            run_batch: Runs a list of items, returning one result per item
+            cost: Size of an item in tokens
+        """
+        self.name = name
+        self._run_batch = run_batch
+        self._cost = cost
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._carry: Optional[_Pending] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        
+        # Stats
+        self._batches = 0
+        self._items = 0
+        self._total_wait = 0.0
+        self._last_batch_size = 0
+    
+    def submit_many(self, items: Sequence[Any]) -> List[Any]:
+        """Submit items and block until all of their results are ready.
+        
+        Args:
+            items: Items to run
+        
+        Returns:
+            One result per item, in order
+        
+        Raises:
+            TimeoutError: If the results take longer than ``settings.inference_timeout``
+        """
+        if not items:
+            return []
+        if not settings.batching_enabled:
+            return list(self._run(list(items)))
+        
+        self._ensure_thread()
+        pending = [_Pending(item, self._cost(item)) for item in items]
+        for p in pending:
+            self._queue.put(p)
+        
+        # Never wait forever, so a stuck scheduler can't hold inference workers
+        deadline = time.monotonic() + settings.inference_timeout
+        return [p.future.result(timeout=max(deadline - time.monotonic(), 0.0)) for p in pending]
+    
+    def submit(self, item: Any) -> Any:
+        """Submit one item and block until its result is ready."""
+        return self.submit_many([item])[0]
+    
+    def _run(self, items: List[Any]) -> List[Any]:
+        """One ``run_batch`` call, timed and counted for the metrics endpoint."""
+        started = time.perf_counter()
+        results = list(self._run_batch(items))
+        if len(results) != len(items):
+            raise RuntimeError(
+                f"{self.name} batch returned {len(results)} results for {len(items)} items"
+            )
+        model_batch_seconds.observe(time.perf_counter() - started, self.name)
+        model_tokens.inc(self.name, amount=sum(self._cost(item) for item in items))
+        return results
+    
+    def _ensure_thread(self) -> None:
+        """Start the scheduler thread on first use (after any worker fork)."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._loop, name=f"batcher-{self.name}", daemon=True
+                    )
+                    self._thread.start()
+    
+    def _next(self, timeout: Optional[float]) -> Optional[_Pending]:
+        """Next waiting item (the carried-over one first), or None on timeout."""
+        if self._carry is not None:
+            item, self._carry = self._carry, None
+            return item
+        try:
+            if timeout is None:
+                return self._queue.get()
+            if timeout <= 0:
+                return self._queue.get_nowait()
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def _gather(self, batch: List[_Pending]) -> None:
+        """Block for one item, then collect more until the wait or token budget runs out.
+        
+        Items are appended to ``batch`` as they arrive, so the caller can
+        still fail them if anything goes wrong.
+        """
+        first = self._next(None)
+        batch.append(first)
+        tokens = first.cost
+        deadline = first.enqueued + settings.batch_max_wait_ms / 1000.0
+        
+        while tokens < settings.batch_max_tokens:
+            item = self._next(deadline - time.monotonic())
+            if item is None:
+                break
+            if tokens + item.cost > settings.batch_max_tokens:
+                self._carry = item
+                break
+            batch.append(item)
+            tokens += item.cost
+    
+    def _loop(self) -> None:
+        while True:
+            batch: List[_Pending] = []
+            try:
+                self._gather(batch)
+                self._run_chunks(batch)
+            except Exception as e:
+                # Keep the scheduler alive; nothing in the batch may be left waiting
+                logger.error(f"Scheduler error in {self.name} batcher: {e}", exc_info=True)
+                _fail(batch, e)
+    
+    def _run_chunks(self, batch: List[_Pending]) -> None:
+        """Run a gathered batch in padded chunks and resolve every item's future."""
+        started = time.monotonic()
+        
+        for chunk in _padded_chunks(batch, settings.batch_max_tokens):
+            try:
+                results = self._run([p.item for p in chunk])
+            except Exception as e:
+                logger.warning(f"Batch failed in {self.name} batcher: {e}")
+                _fail(chunk, e)
+                continue
+            for p, result in zip(chunk, results):
+                p.future.set_result(result)
+        
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._total_wait += sum(started - p.enqueued for p in batch)
+            self._last_batch_size = len(batch)
+    
+    def stats(self) -> Dict[str, float]:
+        """Queue depth, batch size and wait time, for tuning."""
+        with self._lock:
+            batches, items, total_wait = self._batches, self._items, self._total_wait
+            last_batch_size = self._last_batch_size
+        return {
+            'queue_depth': self._queue.qsize() + (1 if self._carry is not None else 0),
+            'batches': batches,
+            'items': items,
+            'mean_batch_size': items / batches if batches else 0.0,
+            'last_batch_size': last_batch_size,
+            'mean_wait_ms': 1000.0 * total_wait / items if items else 0.0
+        }
+
+
+def _fail(pending: List[_Pending], error: Exception) -> None:
+    """Fail the futures of ``pending`` that haven't been resolved yet."""
+    for p in pending:
+        if not p.future.done():
+            p.future.set_exception(error)
+
+
+def _padded_chunks(batch: List[_Pending], max_tokens: int) -> List[List[_Pending]]:
+    """Split a batch into chunks whose padded size stays within ``max_tokens``.
+    
+    Items are sorted by cost so each chunk pads to a similar length. An item
+    larger than the budget still runs, alone.
+    """
+    chunks: List[List[_Pending]] = []
+    current: List[_Pending] = []
+    
+    for p in sorted(batch, key=lambda p: p.cost, reverse=True):
+        # The first (longest) item of a chunk sets its padded width
+        if current and current[0].cost * (len(current) + 1) > max_tokens:
+            chunks.append(current)
+            current = []
+        current.append(p)
+    
+    if current:
+        chunks.append(current)
+    return chunks
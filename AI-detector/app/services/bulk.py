@@ -0,0 +1,391 @@
+"""Offline bulk scoring of a corpus on a pool of worker processes."""
+import csv
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.cache import scoring_config
+from app.core.logging import get_logger
+from app.models.gpt2_loader import gpt2_loader
+from app.models.detector_loader import detector_loader
+from app.services.features import DocumentFeatures
+from app.services.preprocessing import preprocess
+from app.services.scoring import (
+    calculate_final_score,
+    calculate_long_document_score,
+    calculate_sentence_scores
+)
+
+logger = get_logger(__name__)
+
+CHECKPOINT_FILE = "checkpoint.json"
+FORMATS = ("jsonl", "parquet")
+
+# Files read from a corpus directory
+TEXT_SUFFIXES = (".txt", ".md")
+
+# Why this worker process failed to start, if it did
+_worker_error: Optional[str] = None
+
+
+def iter_corpus(path: str, text_field: str = "text", id_field: str = "id") -> Iterator[Tuple[str, str]]:
+    """Read ``(id, text)`` pairs from a directory, JSONL or CSV corpus, in a stable order.
+    
+    Args:
+        path: Directory of .txt/.md files (the id is the relative path), or a
+            .jsonl/.ndjson/.csv file (the id is ``id_field``, else the row number)
+        text_field: Field holding the text in JSONL and CSV rows
+        id_field: Field holding the document id in JSONL and CSV rows
+    
+    Yields:
+        (document id, text)
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(TEXT_SUFFIXES):
+                    file_path = os.path.join(root, name)
+                    with open(file_path, encoding="utf-8", errors="replace") as f:
+                        yield os.path.relpath(file_path, path), f.read()
+        return
+    
+    if path.endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    record = json.loads(line)
+                    yield str(record.get(id_field, number)), record[text_field]
+        return
+    
+    if path.endswith(".csv"):
+        # Documents can be far longer than the default 128 KB field limit
+        csv.field_size_limit(sys.maxsize)
+        with open(path, encoding="utf-8", newline="") as f:
+            for number, row in enumerate(csv.DictReader(f), 1):
+                yield str(row.get(id_field) or number), row[text_field]
+        return
+    
+    raise ValueError(f"Unsupported corpus {path!r}: expected a directory, .jsonl or .csv")
+
+
+def init_worker(threads: int) -> None:
+    """Per-process setup: thread count, no cross-request batching, models loaded once.
+    
+    A failure is remembered and raised by the first document instead of
+    propagating here, where ``multiprocessing.Pool`` would just restart the
+    worker forever.
+    
+    Args:
+        threads: Torch intra-op threads for this process
+    """
+    global _worker_error
+    try:
+        import torch
+        
+        # Each process scores one document at a time; there is nothing to batch with
+        settings.batching_enabled = False
+        settings.torch_threads = threads
+        torch.set_num_threads(threads)
+        
+        gpt2_loader.load()
+        detector_loader.load()
+    except Exception as e:
+        _worker_error = f"{type(e).__name__}: {e}"
+
+
+def _score_in_worker(
+    document: Tuple[str, str],
+    include_sentences: bool = False,
+    features_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """``score_document`` in a pool worker, failing the run if the worker couldn't start."""
+    if _worker_error is not None:
+        raise RuntimeError(f"Worker setup failed: {_worker_error}")
+    return score_document(document, include_sentences, features_dir)
+
+
+def load_features(text: str, features_dir: Optional[str] = None) -> DocumentFeatures:
+    """Preprocess a text, or load its features saved by an earlier run.
+    
+    Features are saved in ``features_dir`` under the SHA-1 of the raw text,
+    so re-scoring a corpus (e.g. after changing the models or weights)
+    skips cleaning and sentence splitting. Clear the directory if the
+    preprocessing itself changes.
+    
+    Args:
+        text: Raw document text
+        features_dir: Directory of saved features; None to always preprocess
+    
+    Returns:
+        The document's features
+    """
+    if features_dir is None:
+        return preprocess(text).features
+    
+    path = os.path.join(features_dir, hashlib.sha1(text.encode("utf-8")).hexdigest() + ".npz")
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                return DocumentFeatures.from_bytes(f.read())
+        except ValueError as e:
+            logger.warning(f"Ignoring saved features {path}: {e}")
+    
+    features = preprocess(text).features
+    os.makedirs(features_dir, exist_ok=True)
+    _write_atomic(path, lambda f: f.write(features.to_bytes()))
+    return features
+
+
+def score_document(
+    document: Tuple[str, str],
+    include_sentences: bool = False,
+    features_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """Score one document, returning its output record.
+    
+    Texts longer than ``settings.max_text_length`` use the long-document mode,
+    as they would have to through the API.
+    
+    Args:
+        document: (document id, text)
+        include_sentences: Whether to include sentence-level scores
+        features_dir: Directory of saved features (see ``load_features``)
+    
+    Returns:
+        Record with the id and either the result fields or an ``error``
+    """
+    doc_id, text = document
+    try:
+        features = load_features(text, features_dir)
+        cleaned_text, sentences = features.text, features.sentences
+        if not sentences:
+            raise ValueError("No valid sentences found in text")
+        
+        if len(cleaned_text) > settings.max_text_length:
+            result = calculate_long_document_score(cleaned_text, sentences, features)
+        else:
+            result = calculate_final_score(cleaned_text, sentences, features=features)
+    except Exception as e:
+        return {'id': doc_id, 'error': str(e)}
+    
+    record = {
+        'id': doc_id,
+        'score': result['score'],
+        'label': result['label'],
+        'confidence': result['confidence'],
+        'is_reliable': result['is_reliable'],
+        'modality': result['modality'],
+        'modality_warning': result['modality_warning'],
+        'metrics': result['metrics']
+    }
+    if include_sentences:
+        record['sentence_scores'] = calculate_sentence_scores(
+            sentences, result['score'], result['sentence_perplexities']
+        )
+    return record
+
+
+def run_bulk(
+    input_path: str,
+    output_dir: str,
+    workers: int = 0,
+    threads: int = 0,
+    output_format: str = "jsonl",
+    chunk_size: int = 1000,
+    text_field: str = "text",
+    id_field: str = "id",
+    include_sentences: bool = False,
+    features_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """Score a corpus into append-only part files, resuming from any checkpoint.
+    
+    Documents are fanned out to ``workers`` processes and come back in input
+    order. Every ``chunk_size`` results are written to a new part file
+    (written to a temporary name, then renamed) and only then recorded in the
+    checkpoint, so a killed run loses at most one chunk and never leaves a
+    half-written part behind. Rerunning with the same arguments continues
+    after the last checkpointed document.
+    
+    Args:
+        input_path: Corpus (see ``iter_corpus``)
+        output_dir: Directory for part files and the checkpoint
+        workers: Worker processes; 0 = one per core, 1 = score in this process
+        threads: Torch threads per worker; 0 = cores divided by workers
+        output_format: "jsonl" or "parquet" (needs pyarrow)
+        chunk_size: Documents per part file
+        text_field: Text field of JSONL/CSV rows
+        id_field: Id field of JSONL/CSV rows
+        include_sentences: Whether to include sentence-level scores
+        features_dir: Save preprocessed features here and reuse them on
+            later runs (see ``load_features``)
+    
+    Returns:
+        The final checkpoint state
+    
+    Raises:
+        ValueError: If the output directory was started with different settings
+        RuntimeError: If a worker couldn't load the models
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}, expected one of {FORMATS}")
+    
+    cores = os.cpu_count() or 1
+    workers = workers or cores
+    threads = threads or max(1, cores // workers)
+    
+    os.makedirs(output_dir, exist_ok=True)
+    fingerprint = dict(
+        scoring_config(),
+        input=os.path.abspath(input_path),
+        format=output_format,
+        sentences=include_sentences
+    )
+    state = _load_checkpoint(output_dir, fingerprint)
+    if state['position']:
+        logger.info(f"Resuming after {state['position']} documents ({state['parts']} parts)")
+    
+    documents = itertools.islice(
+        iter_corpus(input_path, text_field, id_field), state['position'], None
+    )
+    score = partial(
+        _score_in_worker, include_sentences=include_sentences, features_dir=features_dir
+    )
+    started = time.perf_counter()
+    scored = 0
+    
+    def flush(records: List[Dict[str, Any]]) -> None:
+        nonlocal scored
+        _write_part(output_dir, state['parts'], records, output_format)
+        state['parts'] += 1
+        state['position'] += len(records)
+        state['errors'] += sum(1 for record in records if 'error' in record)
+        _save_checkpoint(output_dir, state)
+        
+        scored += len(records)
+        rate = scored / (time.perf_counter() - started)
+        logger.info(f"{state['position']} documents scored ({rate:.1f} docs/s)")
+    
+    if workers == 1:
+        init_worker(threads)
+        _score_in_chunks(map(score, documents), chunk_size, flush)
+    else:
+        logger.info(f"Scoring with {workers} processes x {threads} threads")
+        # Spawned (not forked) so no parent torch thread pool is inherited
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(workers, initializer=init_worker, initargs=(threads,)) as pool:
+            _score_in_chunks(pool.imap(score, documents, chunksize=4), chunk_size, flush)
+    
+    return state
+
+
+def _score_in_chunks(results: Iterator[Dict[str, Any]], chunk_size: int, flush) -> None:
+    """Pass results to ``flush`` in chunks of ``chunk_size``."""
+    records: List[Dict[str, Any]] = []
+    for record in results:
+        records.append(record)
+        if len(records) >= chunk_size:
+            flush(records)
+            records = []
+    if records:
+        flush(records)
+
+
+def _load_checkpoint(output_dir: str, fingerprint: Dict[str, Any]) -> Dict[str, Any]:
+    """Checkpoint state of ``output_dir``, or a fresh one."""
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return {'position': 0, 'parts': 0, 'errors': 0, 'fingerprint': fingerprint}
+    
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    # Round-trip through JSON so tuples and lists compare equal
+    if state['fingerprint'] != json.loads(json.dumps(fingerprint)):
+        raise ValueError(
+            f"{output_dir} was scored with different settings or input; "
+            "use a new output directory"
+        )
+    return state
+
+
+def _save_checkpoint(output_dir: str, state: Dict[str, Any]) -> None:
+    _write_atomic(
+        os.path.join(output_dir, CHECKPOINT_FILE),
+        lambda f: f.write(json.dumps(state, indent=2).encode("utf-8"))
+    )
+
+
+def _write_part(output_dir: str, index: int, records: List[Dict[str, Any]], output_format: str) -> str:
+    """Write one part file of results."""
+    path = os.path.join(output_dir, f"part-{index:05d}.{output_format}")
+    
+    if output_format == "parquet":
+        _write_atomic(path, partial(_write_parquet, records))
+    else:
+        _write_atomic(path, lambda f: f.writelines(
+            (json.dumps(record) + "\n").encode("utf-8") for record in records
+        ))
+    return path
+
+
+def _write_parquet(records: List[Dict[str, Any]], f) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet output needs pyarrow: pip install pyarrow") from e
+    
+    # Fixed columns so error rows and success rows share a schema; nested
+    # fields are stored as JSON
+    schema = pa.schema([
+        ('id', pa.string()),
+        ('score', pa.float64()),
+        ('label', pa.string()),
+        ('confidence', pa.string()),
+        ('is_reliable', pa.bool_()),
+        ('modality', pa.string()),
+        ('modality_warning', pa.string()),
+        ('metrics', pa.string()),
+        ('sentence_scores', pa.string()),
+        ('error', pa.string())
+    ])
+    rows = [
+        {
+            name: json.dumps(record[name]) if name in ('metrics', 'sentence_scores') and name in record
+            else record.get(name)
+            for name in schema.names
+        }
+        for record in records
+    ]
+    pq.write_table(pa.Table.from_pylist(rows, schema=schema), f)
+
+
+def _write_atomic(path: str, write) -> None:
+    """Write a file under a temporary name, sync it, then move it into place.
+    
+    The temporary name is unique to the writer, so processes filling the same
+    cache entry never write into each other's file; whichever replace lands
+    last wins, and a writer that loses its file to another's counts as done
+    once the target exists.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except FileNotFoundError:
+        if not os.path.exists(path):
+            raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
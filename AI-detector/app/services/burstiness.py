@@ -1,13 +1,14 @@
 """Burstiness metrics for sentence length variation."""
-from typing import List
+from typing import List, Optional
 import numpy as np
 
 from app.core.logging import get_logger
+from app.services.features import DocumentFeatures
 
 logger = get_logger(__name__)
 
 
-def calculate_burstiness(sentences: List[str]) -> float:
+def calculate_burstiness(sentences: List[str], features: Optional[DocumentFeatures] = None) -> float:
     """Calculate burstiness score based on sentence length variation.
     
     Human writing tends to have more varied sentence lengths (higher burstiness).
@@ -15,6 +16,7 @@ def calculate_burstiness(sentences: List[str]) -> float:
     
     Args:
         sentences: List of sentences
+        features: Features of the text, whose sentence lengths are used if given
         
     Returns:
         Burstiness score (0-1, higher = more human-like)
@@ -23,7 +25,10 @@ def calculate_burstiness(sentences: List[str]) -> float:
         return 0.5  # Neutral score for very short texts
     
     # Calculate sentence lengths (in words)
-    lengths = [len(sentence.split()) for sentence in sentences]
+    if features is not None:
+        lengths = features.sentence_lengths
+    else:
+        lengths = [len(sentence.split()) for sentence in sentences]
     
     # Calculate standard deviation
     std_dev = np.std(lengths)
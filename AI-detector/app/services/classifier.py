@@ -0,0 +1,239 @@
+"""AI-probability from the specialized RoBERTa detector."""
+import functools
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from app.models.detector_loader import detector_loader
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.batching import MicroBatcher
+from app.services.document import Tokens, tokenize
+
+logger = get_logger(__name__)
+
+
+def _run_detector_batch(sequences: List[List[int]]) -> List[float]:
+    """Run one padded RoBERTa pass over a batch of token id sequences.
+    
+    Args:
+        sequences: Token id sequences (padded on the right to the longest one)
+    
+    Returns:
+        AI probability (0-100) for each sequence
+    """
+    import torch
+    
+    model, tokenizer = detector_loader.load()
+    device = torch.device(settings.device)
+    
+    longest = max(len(seq) for seq in sequences)
+    
+    input_ids = torch.full((len(sequences), longest), tokenizer.pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(sequences), longest), dtype=torch.long)
+    for i, seq in enumerate(sequences):
+        input_ids[i, :len(seq)] = torch.tensor(seq, dtype=torch.long)
+        attention_mask[i, :len(seq)] = 1
+    
+    input_ids = input_ids.to(device)
+    attention_mask = attention_mask.to(device)
+    
+    with torch.no_grad():
+        outputs = model(input_ids=input_ids, attention_mask=attention_mask)
+        probs = torch.softmax(outputs.logits, dim=-1)
+    
+    # roberta-base-openai-detector labels: [Fake, Real]
+    # We want the 'Fake' (AI) probability
+    return (probs[:, 0] * 100).tolist()
+
+
+# Batches RoBERTa passes across concurrent requests
+detector_batcher = MicroBatcher("detector", _run_detector_batch)
+
+
+# Tokens the detector sees, special tokens included
+DETECTOR_MAX_TOKENS = 512
+
+# Ways of combining per-window probabilities into the document's
+POOLING_RULES = ("mean", "max", "length_weighted")
+
+
+@functools.lru_cache(maxsize=2)
+def _special_tokens(tokenizer) -> Tuple[List[int], List[int]]:
+    """Special token ids the tokenizer puts before and after a single text."""
+    bare = tokenizer(".", add_special_tokens=False)['input_ids']
+    framed = tokenizer(".", add_special_tokens=True)['input_ids']
+    for start in range(len(framed) - len(bare) + 1):
+        if framed[start:start + len(bare)] == bare:
+            return framed[:start], framed[start + len(bare):]
+    return [], []
+
+
+def classifier_input_ids(text: str, tokens: Optional[Tokens] = None) -> List[int]:
+    """Token ids the detector sees for a text (its first 512 tokens).
+    
+    The same ids as ``tokenizer(text, truncation=True, max_length=512)``, but
+    cut from the text's tokens, so a text tokenized once (``Document``) isn't
+    tokenized again and the shared tokenizer's settings are never changed.
+    
+    Args:
+        text: Input text
+        tokens: Detector tokens of ``text`` (e.g. ``Document.detector_tokens``);
+            tokenized here if omitted
+    
+    Returns:
+        Token ids, special tokens included
+    """
+    _, tokenizer = detector_loader.load()
+    if tokens is None:
+        tokens = tokenize(tokenizer, text)
+    
+    prefix, suffix = _special_tokens(tokenizer)
+    limit = DETECTOR_MAX_TOKENS - len(prefix) - len(suffix)
+    return prefix + tokens.ids[:limit].tolist() + suffix
+
+
+def plan_detector_windows(num_tokens: int, window: int, stride: int) -> List[Tuple[int, int]]:
+    """Plan overlapping detector windows that together cover every token.
+    
+    Windows are ``window`` tokens long and start ``stride`` tokens apart; the
+    last one is moved back to end at the last token, so it is full length too.
+    
+    Args:
+        num_tokens: Number of tokens in the document
+        window: Tokens per window (special tokens not included)
+        stride: Tokens advanced between windows (<= 0 keeps the first window only)
+    
+    Returns:
+        (begin, end) token ranges, in document order
+    """
+    if num_tokens <= window or stride <= 0:
+        return [(0, min(num_tokens, window))]
+    
+    stride = min(stride, window)
+    windows = [(begin, begin + window) for begin in range(0, num_tokens - window, stride)]
+    windows.append((num_tokens - window, num_tokens))
+    return windows
+
+
+def classifier_windows(text: str, tokens: Optional[Tokens] = None) -> List[Dict[str, any]]:
+    """Detector inputs covering the whole text in overlapping 512-token windows.
+    
+    Args:
+        text: Input text
+        tokens: Detector tokens of ``text`` (e.g. ``Document.detector_tokens``);
+            tokenized here if omitted
+    
+    Returns:
+        One dict per window: character span (``start``, ``end``), ``tokens`` in
+        the window, ``new_tokens`` no earlier window covered, and ``input_ids``
+        with special tokens
+    """
+    _, tokenizer = detector_loader.load()
+    if tokens is None:
+        tokens = tokenize(tokenizer, text)
+    
+    prefix, suffix = _special_tokens(tokenizer)
+    window = DETECTOR_MAX_TOKENS - len(prefix) - len(suffix)
+    
+    windows = []
+    covered = 0
+    for begin, end in plan_detector_windows(len(tokens), window, settings.detector_stride):
+        windows.append({
+            'start': int(tokens.offsets[begin, 0]) if end > begin else 0,
+            'end': int(tokens.offsets[end - 1, 1]) if end > begin else 0,
+            'tokens': end - begin,
+            'new_tokens': end - max(begin, covered),
+            'input_ids': prefix + tokens.ids[begin:end].tolist() + suffix
+        })
+        covered = end
+    return windows
+
+
+def calculate_window_probabilities(
+    text: str,
+    tokens: Optional[Tokens] = None,
+    windows: Optional[List[Dict[str, any]]] = None
+) -> List[Dict[str, any]]:
+    """Run the detector over every window of a text in one batched submission.
+    
+    The windows go to the micro-batcher together, so they share padded
+    forward passes (up to ``batch_max_tokens`` each) instead of one per window.
+    
+    Args:
+        text: Input text
+        tokens: Detector tokens of ``text``, if already computed
+        windows: Output of ``classifier_windows``, if already computed
+    
+    Returns:
+        The windows without their ``input_ids``, each with its AI ``probability`` (0-100)
+    """
+    if windows is None:
+        windows = classifier_windows(text, tokens)
+    probabilities = detector_batcher.submit_many([window['input_ids'] for window in windows])
+    
+    return [
+        dict({name: value for name, value in window.items() if name != 'input_ids'}, probability=probability)
+        for window, probability in zip(windows, probabilities)
+    ]
+
+
+def pool_window_probabilities(windows: List[Dict[str, any]], pooling: Optional[str] = None) -> float:
+    """Combine per-window AI probabilities into the document's.
+    
+    Args:
+        windows: Output of ``calculate_window_probabilities``
+        pooling: "mean", "max" or "length_weighted" (weighted by the tokens
+            each window adds, so overlaps count once); ``settings.detector_pooling``
+            if omitted
+    
+    Returns:
+        AI probability (0-100)
+    """
+    pooling = pooling or settings.detector_pooling
+    probabilities = np.array([window['probability'] for window in windows], dtype=np.float64)
+    
+    if pooling == "mean":
+        return float(probabilities.mean())
+    if pooling == "max":
+        return float(probabilities.max())
+    if pooling == "length_weighted":
+        weights = np.array([window['new_tokens'] for window in windows], dtype=np.float64)
+        if weights.sum() == 0:
+            return float(probabilities.mean())
+        return float(np.average(probabilities, weights=weights))
+    raise ValueError(f"Unknown detector pooling {pooling!r}, expected one of {POOLING_RULES}")
+
+
+def window_probability(windows: List[Dict[str, any]], start: int, end: int) -> Optional[float]:
+    """Mean AI probability of the windows overlapping the character span [start, end).
+    
+    Args:
+        windows: Output of ``calculate_window_probabilities``
+        start: Span start offset in the text
+        end: Span end offset in the text
+    
+    Returns:
+        AI probability (0-100), or None if no window overlaps the span
+    """
+    overlapping = [
+        window['probability'] for window in windows
+        if window['start'] < end and start < window['end']
+    ]
+    return float(np.mean(overlapping)) if overlapping else None
+
+
+def calculate_classifier_probability(text: str, tokens: Optional[Tokens] = None) -> float:
+    """Calculate the detector's AI probability for a whole text.
+    
+    Args:
+        text: Input text, classified in overlapping windows
+        tokens: Detector tokens of ``text``, if already computed
+    
+    Returns:
+        AI probability (0-100), pooled over the windows
+    """
+    classifier_ai_prob = pool_window_probabilities(calculate_window_probabilities(text, tokens))
+    
+    logger.debug(f"Classifier AI Probability: {classifier_ai_prob:.2f}%")
+    
+    return classifier_ai_prob
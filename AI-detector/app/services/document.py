@@ -0,0 +1,134 @@
+"""Tokenize-once representation of a document, shared by the pipeline stages."""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+
+from app.models.gpt2_loader import gpt2_loader
+from app.models.detector_loader import detector_loader
+from app.core.metrics import span
+
+
+@dataclass
+class Tokens:
+    """Token ids and character offsets of a text in one model's vocabulary.
+    
+    Special tokens are not included; the stages that need them add them
+    around the slice they feed to the model.
+    
+    Attributes:
+        ids: (n_tokens,) token ids
+        offsets: (n_tokens, 2) character span of each token in the text
+    """
+    
+    ids: np.ndarray
+    offsets: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __getitem__(self, index: slice) -> 'Tokens':
+        """Tokens ``index`` as views into the same arrays."""
+        return Tokens(ids=self.ids[index], offsets=self.offsets[index])
+    
+    def token_range(self, start: int, end: int) -> Tuple[int, int]:
+        """Index range of the tokens that start inside the character span [start, end)."""
+        token_starts = self.offsets[:, 0]
+        first = int(np.searchsorted(token_starts, start, side='left'))
+        last = int(np.searchsorted(token_starts, end, side='left'))
+        return first, last
+
+
+def tokenize(tokenizer, text: str) -> Tokens:
+    """Tokenize a text once with a fast tokenizer, keeping character offsets.
+    
+    Nothing is truncated here: callers slice the arrays instead, because
+    changing truncation settings per call is not safe while other inference
+    threads share the (Rust) tokenizer.
+    
+    Args:
+        tokenizer: A ``PreTrainedTokenizerFast``
+        text: Input text
+    
+    Returns:
+        Tokens of the whole text
+    """
+    encoding = tokenizer(
+        text,
+        add_special_tokens=False,
+        return_offsets_mapping=True,
+        return_attention_mask=False
+    )
+    return Tokens(
+        ids=np.asarray(encoding['input_ids'], dtype=np.int64),
+        offsets=np.asarray(encoding['offset_mapping'], dtype=np.int64).reshape(-1, 2)
+    )
+
+
+def sentence_spans(text: str, sentences: List[str]) -> List[Optional[Tuple[int, int]]]:
+    """Character span of each sentence in ``text``, searched for in order (None if absent)."""
+    spans: List[Optional[Tuple[int, int]]] = []
+    cursor = 0
+    
+    for sentence in sentences:
+        start = text.find(sentence, cursor)
+        if start < 0:
+            spans.append(None)
+            continue
+        cursor = start + len(sentence)
+        spans.append((start, cursor))
+    
+    return spans
+
+
+class Document:
+    """A preprocessed text and its sentences, tokenized at most once per model.
+    
+    GPT-2 and detector tokens are computed on first use (a fast analysis that
+    stops after the detector never needs GPT-2's) and every stage works on
+    views into them: the GPT-2 windows, the detector input and the sentence
+    slices used for highlighting.
+    """
+    
+    def __init__(
+        self,
+        text: str,
+        sentences: List[str],
+        spans: Optional[List[Optional[Tuple[int, int]]]] = None
+    ):
+        """Wrap a text and its sentences.
+        
+        Args:
+            text: The text
+            sentences: Its sentences
+            spans: Their character spans, if already known (searched for otherwise)
+        """
+        self.text = text
+        self.sentences = sentences
+        self._spans = spans
+        self._gpt2_tokens: Optional[Tokens] = None
+        self._detector_tokens: Optional[Tokens] = None
+    
+    @property
+    def spans(self) -> List[Optional[Tuple[int, int]]]:
+        """Character span of each sentence in the text (None if it can't be located)."""
+        if self._spans is None:
+            self._spans = sentence_spans(self.text, self.sentences)
+        return self._spans
+    
+    @property
+    def gpt2_tokens(self) -> Tokens:
+        """The text in GPT-2's vocabulary."""
+        if self._gpt2_tokens is None:
+            _, tokenizer = gpt2_loader.load()
+            with span('tokenize'):
+                self._gpt2_tokens = tokenize(tokenizer, self.text)
+        return self._gpt2_tokens
+    
+    @property
+    def detector_tokens(self) -> Tokens:
+        """The text in the detector's vocabulary."""
+        if self._detector_tokens is None:
+            _, tokenizer = detector_loader.load()
+            with span('tokenize'):
+                self._detector_tokens = tokenize(tokenizer, self.text)
+        return self._detector_tokens
@@ -0,0 +1,148 @@
+"""Per-document text features, computed once and shared by the metrics."""
+import io
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from app.services.document import sentence_spans
+
+# Bumped whenever the stored arrays change meaning
+FEATURES_VERSION = 1
+
+
+class DocumentFeatures:
+    """Word, sentence and line statistics of a cleaned text, as compact arrays.
+    
+    Built once per document (see ``PreprocessedText.features``) so burstiness,
+    repetition, modality, stylometry and perplexity calibration don't each
+    split the text again. It can be saved with ``to_bytes`` and restored
+    with ``from_bytes`` to re-score a corpus without preprocessing it again.
+    
+    Attributes:
+        text: The cleaned text
+        word_ids: (n_words,) uint64 id of each lowercased word; equal words get
+            equal ids, numbered in order of first appearance
+        vocabulary: The lowercased word of each id
+        sentence_bounds: (n_sentences, 2) character span of each sentence in
+            ``text``; (-1, -1) for sentences that couldn't be located
+        sentence_lengths: (n_sentences,) words per sentence
+        line_count: Number of lines of ``text``
+        indented_lines: Lines starting with four spaces or a tab
+    """
+    
+    __slots__ = (
+        'text', 'word_ids', 'vocabulary', 'sentence_bounds', 'sentence_lengths',
+        'line_count', 'indented_lines'
+    )
+    
+    def __init__(
+        self,
+        text: str,
+        word_ids: np.ndarray,
+        vocabulary: List[str],
+        sentence_bounds: np.ndarray,
+        sentence_lengths: np.ndarray,
+        line_count: int,
+        indented_lines: int
+    ):
+        self.text = text
+        self.word_ids = word_ids
+        self.vocabulary = vocabulary
+        self.sentence_bounds = sentence_bounds
+        self.sentence_lengths = sentence_lengths
+        self.line_count = line_count
+        self.indented_lines = indented_lines
+    
+    @classmethod
+    def from_spans(cls, text: str, spans: Sequence[Tuple[int, int]]) -> 'DocumentFeatures':
+        """Features of a cleaned text whose sentences are ``text[start:end]`` for each span.
+        
+        Words of a cleaned text are separated by single spaces, so sentence
+        lengths are counted from the space positions without slicing.
+        """
+        bounds = np.array(spans, dtype=np.int64).reshape(-1, 2)
+        spaces = np.flatnonzero(np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32) == ord(' '))
+        lengths = (
+            np.searchsorted(spaces, bounds[:, 1]) - np.searchsorted(spaces, bounds[:, 0]) + 1
+        )
+        return cls._build(text, bounds, lengths.astype(np.int64))
+    
+    @classmethod
+    def from_sentences(cls, text: str, sentences: List[str]) -> 'DocumentFeatures':
+        """Features of any text and its sentences, as strings."""
+        bounds = np.array(
+            [span if span is not None else (-1, -1) for span in sentence_spans(text, sentences)],
+            dtype=np.int64
+        ).reshape(-1, 2)
+        lengths = np.array([len(sentence.split()) for sentence in sentences], dtype=np.int64)
+        return cls._build(text, bounds, lengths)
+    
+    @classmethod
+    def _build(cls, text: str, bounds: np.ndarray, lengths: np.ndarray) -> 'DocumentFeatures':
+        vocabulary: Dict[str, int] = {}
+        ids = [vocabulary.setdefault(word, len(vocabulary)) for word in text.lower().split()]
+        return cls(
+            text=text,
+            word_ids=np.array(ids, dtype=np.uint64),
+            vocabulary=list(vocabulary),
+            sentence_bounds=bounds,
+            sentence_lengths=lengths,
+            line_count=text.count('\n') + 1,
+            indented_lines=(
+                text.startswith(('    ', '\t')) + text.count('\n    ') + text.count('\n\t')
+            )
+        )
+    
+    @property
+    def word_count(self) -> int:
+        """Number of (whitespace-separated) words."""
+        return len(self.word_ids)
+    
+    @property
+    def sentences(self) -> List[str]:
+        """The sentences that could be located, sliced from the text."""
+        return [self.text[start:end] for start, end in self.sentence_bounds.tolist() if start >= 0]
+    
+    @property
+    def spans(self) -> List[Optional[Tuple[int, int]]]:
+        """Character span of each sentence (None if it couldn't be located)."""
+        return [
+            (start, end) if start >= 0 else None for start, end in self.sentence_bounds.tolist()
+        ]
+    
+    def to_bytes(self) -> bytes:
+        """The features as an ``.npz`` archive (no pickled objects)."""
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            version=np.array(FEATURES_VERSION),
+            text=np.array(self.text),
+            word_ids=self.word_ids,
+            vocabulary=np.array(self.vocabulary, dtype=str),
+            sentence_bounds=self.sentence_bounds,
+            sentence_lengths=self.sentence_lengths,
+            lines=np.array([self.line_count, self.indented_lines], dtype=np.int64)
+        )
+        return buffer.getvalue()
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'DocumentFeatures':
+        """Features saved by ``to_bytes``.
+        
+        Raises:
+            ValueError: If they were saved by an incompatible version
+        """
+        with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+            if int(archive['version']) != FEATURES_VERSION:
+                raise ValueError(
+                    f"Features version {int(archive['version'])}, expected {FEATURES_VERSION}"
+                )
+            line_count, indented_lines = archive['lines'].tolist()
+            return cls(
+                text=str(archive['text']),
+                word_ids=archive['word_ids'],
+                vocabulary=archive['vocabulary'].tolist(),
+                sentence_bounds=archive['sentence_bounds'],
+                sentence_lengths=archive['sentence_lengths'],
+                line_count=line_count,
+                indented_lines=indented_lines
+            )
@@ -0,0 +1,123 @@
+"""Chunked, memory-bounded model passes for long documents."""
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.perplexity import compute_token_log_probs_batch, slice_sentence_perplexities
+from app.services.document import sentence_spans
+from app.services.classifier import classifier_windows, detector_batcher
+
+logger = get_logger(__name__)
+
+
+def iter_chunks(
+    text: str,
+    sentences: List[str],
+    max_chars: int
+) -> Iterator[Tuple[str, List[str]]]:
+    """Group consecutive sentences into chunks of at most ``max_chars`` characters.
+    
+    Chunks are cut between sentences; a sentence longer than ``max_chars`` is
+    a chunk of its own (``score_chunks`` splits it into detector windows).
+    
+    Args:
+        text: Full text
+        sentences: Its sentences, in document order
+        max_chars: Chunk size limit
+    
+    Yields:
+        (chunk_text, chunk_sentences) in document order
+    """
+    chunk: List[str] = []
+    chunk_start = chunk_end = 0
+    
+    for sentence, span in zip(sentences, sentence_spans(text, sentences)):
+        # Sentences that can't be located go with their neighbours (and get
+        # scored on their own later)
+        start, end = span if span is not None else (chunk_end, chunk_end + len(sentence))
+        
+        if chunk and end - chunk_start > max_chars:
+            yield text[chunk_start:chunk_end], chunk
+            chunk = []
+        
+        if not chunk:
+            chunk_start = start
+        chunk.append(sentence)
+        chunk_end = max(chunk_end, end)
+    
+    if chunk:
+        yield text[chunk_start:chunk_end], chunk
+
+
+def score_chunks(text: str, sentences: List[str]) -> Dict[str, any]:
+    """Run both models over a long document, a few chunks at a time.
+    
+    At most ``settings.long_document_chunk_batch`` chunks are in memory and in
+    the models at once, so peak memory doesn't grow with the document. Per
+    chunk results are pooled as the document-level statistic would be:
+    token log-likelihoods are summed over every scored token, sentence
+    perplexities are collected into one distribution, and detector
+    probabilities are averaged weighted by the tokens each window contributed.
+    A chunk longer than the detector's 512 tokens (one long sentence) is
+    classified in overlapping windows, so none of it goes unread.
+    
+    Args:
+        text: Full text
+        sentences: Its sentences, in document order
+    
+    Returns:
+        Dictionary with raw (uncalibrated) document perplexity, sentence
+        perplexities, detector AI probability, tokens scored and chunk count
+    """
+    nll_sum = 0.0
+    tokens_scored = 0
+    sentence_scores: List[Dict[str, any]] = []
+    detector_sum = 0.0
+    detector_tokens = 0
+    num_chunks = 0
+    
+    for group in _groups(iter_chunks(text, sentences, settings.long_document_chunk_chars),
+                         settings.long_document_chunk_batch):
+        chunk_texts = [chunk_text for chunk_text, _ in group]
+        
+        # Pooled token log-likelihood and sentence perplexities
+        for (_, chunk_sentences), token_log_probs in zip(group, compute_token_log_probs_batch(chunk_texts)):
+            scored = token_log_probs.log_probs[~np.isnan(token_log_probs.log_probs)]
+            nll_sum -= float(scored.sum())
+            tokens_scored += len(scored)
+            sentence_scores.extend(slice_sentence_perplexities(token_log_probs, chunk_sentences))
+        
+        # Detector probability weighted by the tokens each window adds
+        windows = [window for chunk_text in chunk_texts for window in classifier_windows(chunk_text)]
+        probabilities = detector_batcher.submit_many([window['input_ids'] for window in windows])
+        for window, probability in zip(windows, probabilities):
+            detector_sum += probability * window['new_tokens']
+            detector_tokens += window['new_tokens']
+        
+        num_chunks += len(group)
+    
+    if tokens_scored == 0:
+        raise ValueError("Text is too short to calculate perplexity")
+    
+    logger.debug(f"Scored {tokens_scored} tokens in {num_chunks} chunks")
+    
+    return {
+        'perplexity': float(np.exp(nll_sum / tokens_scored)),
+        'sentence_perplexities': sentence_scores,
+        'classifier_ai_prob': detector_sum / detector_tokens,
+        'tokens_scored': tokens_scored,
+        'chunks': num_chunks
+    }
+
+
+def _groups(chunks: Iterator[Tuple[str, List[str]]], size: int) -> Iterator[List[Tuple[str, List[str]]]]:
+    """Consecutive groups of ``size`` chunks."""
+    group = []
+    for chunk in chunks:
+        group.append(chunk)
+        if len(group) >= size:
+            yield group
+            group = []
+    if group:
+        yield group
@@ -1,71 +1,155 @@
 """Service for detecting text modality (Prose vs Technical/Code)."""
 import re
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, Optional
 
-def detect_modality(text: str) -> Dict[str, any]:
-    """Detect if the text is standard prose or technical/code.
+from app.services.features import DocumentFeatures
+
+# Common code markers, each with the (lowercase) strings it can't match without;
+# a text counts each marker at most once
+CODE_PATTERNS = [
+    (r'\bimport\b.*\bfrom\b', ('import', 'from')),
+    (r'\bdef\b\s+\w+\s*\(', ('def', '(')),
+    (r'\bclass\b\s+\w+[:\(]', ('class',)),
+    (r'const\s+\w+\s*=', ('const', '=')),
+    (r'let\s+\w+\s*=', ('let', '=')),
+    (r'var\s+\w+\s*=', ('var', '=')),
+    (r'\bpublic\s+class\b', ('public', 'class')),
+    (r'Console\.WriteLine', ('console.writeline',)),
+    (r'System\.out\.println', ('system.out.println',)),
+    # A leading \s* can match empty, so dropping it finds the same texts
+    # without rescanning whitespace runs from every position
+    (r'=\s*\[.*\]', ('=', '[', ']')),
+    (r'=\s*\{.*\}', ('=', '{', '}')),
+    (r'\bif\b\s*\(.*\)\s*\{', ('if', '(', ')', '{')),
+    (r'\bfunction\b\s*\w*\s*\(', ('function', '(')),
+    (r'#include\s+<.*>', ('#include', '>')),
+    (r'<\?php', ('<?php',)),
+    (r'pip\s+install', ('pip', 'install')),
+    (r'npm\s+install', ('npm', 'install')),
+    (r'docker-compose', ('docker-compose',)),
+    (r'\.py$', ('.py',)),
+    (r'\.js$', ('.js',)),
+    (r'--\w+', ('--',)),
+]
+
+# The only non-ASCII letters that match ASCII ones when ignoring case, lowercased
+# ("K" (Kelvin) lowercases to "k" already)
+_FOLD_TO_ASCII = [('i\u0307', 'i'), ('\u0131', 'i'), ('\u017f', 's')]
+
+# Characters counted as code symbols
+_SYMBOLS = '{}()[]=<>:;'
+
+
+@lru_cache(maxsize=1024)
+def _scanner(remaining: int) -> re.Pattern:
+    """One alternation of the code patterns whose bit is set in ``remaining``."""
+    return re.compile(
+        '|'.join(f'(?P<p{i}>{pattern})' for i, (pattern, _) in enumerate(CODE_PATTERNS)
+                 if remaining >> i & 1),
+        re.IGNORECASE | re.MULTILINE
+    )
+
+
+def _candidates(text: str) -> int:
+    """Bit set of the code patterns that could match ``text``.
     
-    Returns:
-        Dict with modality type and metadata
+    A marker can only match if all its strings occur in the lowercased
+    text, once the few non-ASCII letters that ``re.IGNORECASE`` equates
+    with ASCII ones (e.g. "ı" with "i") are folded too.
     """
-    # Common code markers
-    code_patterns = [
-        r'\bimport\b.*\bfrom\b',
-        r'\bdef\b\s+\w+\s*\(',
-        r'\bclass\b\s+\w+[:\(]',
-        r'const\s+\w+\s*=',
-        r'let\s+\w+\s*=',
-        r'var\s+\w+\s*=',
-        r'\bpublic\s+class\b',
-        r'Console\.WriteLine',
-        r'System\.out\.println',
-        r'\s*=\s*\[.*\]',
-        r'\s*=\s*\{.*\}',
-        r'\bif\b\s*\(.*\)\s*\{',
-        r'\bfunction\b\s*\w*\s*\(',
-        r'#include\s+<.*>',
-        r'<\?php',
-        r'pip\s+install',
-        r'npm\s+install',
-        r'docker-compose',
-        r'\.py$',
-        r'\.js$',
-        r'--\w+',
-    ]
-    
-    # Structural markers
-    lines = text.split('\n')
-    total_lines = len(lines)
-    if total_lines == 0:
-        return {"type": "PROSE", "confidence": 0.0}
-
-    indent_count = sum(1 for line in lines if line.startswith('    ') or line.startswith('\t'))
-    symbol_count = len(re.findall(r'[{}()\[\]=<>:;]', text))
-    word_count = len(text.split())
-    
-    # Calculate ratios
-    code_ratio = 0
-    pattern_matches = 0
-    for pattern in code_patterns:
-        if re.search(pattern, text, re.IGNORECASE | re.MULTILINE):
-            pattern_matches += 1
-            
-    # Heuristic score
+    lowered = text.lower()
+    if not text.isascii():
+        for letter, ascii_letter in _FOLD_TO_ASCII:
+            lowered = lowered.replace(letter, ascii_letter)
+    remaining = 0
+    for i, (_, keywords) in enumerate(CODE_PATTERNS):
+        if all(keyword in lowered for keyword in keywords):
+            remaining |= 1 << i
+    return remaining
+
+
+def _is_technical(pattern_matches: int, symbol_density: float, indent_density: float) -> bool:
     # High symbol-to-word ratio is a strong indicator of code
-    symbol_density = symbol_count / word_count if word_count > 0 else 0
-    indent_density = indent_count / total_lines if total_lines > 0 else 0
-    
-    is_technical = (
-        pattern_matches >= 2 or 
+    return (
+        pattern_matches >= 2 or
         (pattern_matches >= 1 and symbol_density > 0.3) or
         symbol_density > 0.5 or
         (indent_density > 0.4 and symbol_density > 0.2)
     )
+
+
+def _confidence(pattern_matches: int, symbol_density: float) -> float:
+    return min(0.5 + (pattern_matches * 0.1) + (symbol_density * 0.2), 1.0)
+
+
+def count_code_patterns(text: str, symbol_density: float = 0.0, indent_density: float = 0.0) -> int:
+    """Count the code patterns found in a text, scanning it left to right once.
+    
+    Markers whose strings are missing are skipped. The others are searched
+    for as one alternation; each match retires its marker and the search
+    resumes where it started, so other markers matching at the same
+    position are still found. The scan
+    stops once the text is TECHNICAL with full confidence, since more
+    matches can't change the result.
+    
+    Args:
+        text: Input text
+        symbol_density: Symbols per word, for the early stop
+        indent_density: Fraction of indented lines, for the early stop
+    
+    Returns:
+        Number of distinct patterns found (up to the early stop)
+    """
+    remaining = _candidates(text)
+    pattern_matches = 0
+    position = 0
+    
+    while remaining:
+        match = _scanner(remaining).search(text, position)
+        if match is None:
+            break
+        pattern_matches += 1
+        if (_is_technical(pattern_matches, symbol_density, indent_density) and
+                _confidence(pattern_matches, symbol_density) >= 1.0):
+            break
+        remaining &= ~(1 << int(match.lastgroup[1:]))
+        position = match.start()
+    
+    return pattern_matches
+
+
+def detect_modality(text: str, features: Optional[DocumentFeatures] = None) -> Dict[str, any]:
+    """Detect if the text is standard prose or technical/code.
+    
+    Args:
+        text: Input text
+        features: Features of the text, whose word and line counts are used if given
+    
+    Returns:
+        Dict with modality type and metadata
+    """
+    # Structural markers, counted without splitting into lines
+    if features is not None:
+        total_lines = features.line_count
+        indent_count = features.indented_lines
+        word_count = features.word_count
+    else:
+        total_lines = text.count('\n') + 1
+        indent_count = (
+            text.startswith(('    ', '\t')) + text.count('\n    ') + text.count('\n\t')
+        )
+        word_count = len(text.split())
+    symbol_count = sum(text.count(symbol) for symbol in _SYMBOLS)
+    
+    symbol_density = symbol_count / word_count if word_count > 0 else 0
+    indent_density = indent_count / total_lines
+    pattern_matches = count_code_patterns(text, symbol_density, indent_density)
     
-    if is_technical:
+    if _is_technical(pattern_matches, symbol_density, indent_density):
         return {
             "type": "TECHNICAL",
-            "confidence": min(0.5 + (pattern_matches * 0.1) + (symbol_density * 0.2), 1.0),
+            "confidence": _confidence(pattern_matches, symbol_density),
             "reason": "Code-like structures or syntax detected"
         }
     
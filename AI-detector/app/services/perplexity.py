@@ -1,46 +1,214 @@
 """Perplexity calculation using GPT-2."""
-from typing import List, Dict
-import torch
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Container, Iterator, List, Dict, Optional, Tuple
 import numpy as np
-from scipy.stats import skew
 
 from app.models.gpt2_loader import gpt2_loader
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.services.batching import MicroBatcher
+from app.services.document import Tokens, sentence_spans, tokenize
+from app.services.features import DocumentFeatures
 
 logger = get_logger(__name__)
 
+# Standalone sentences are truncated to this many tokens, whatever the buckets
+SENTENCE_MAX_TOKENS = 512
 
-def calculate_perplexity(text: str) -> float:
-    """Calculate perplexity for entire text.
+
+@dataclass
+class TokenLogProbs:
+    """Per-token log-probabilities from a single GPT-2 pass over a document.
+    
+    Attributes:
+        text: The text that was scored
+        offsets: (n_tokens, 2) character span of each token in ``text``
+        log_probs: (n_tokens,) log p(token | preceding tokens), NaN where not scored
+    """
+    
+    text: str
+    offsets: np.ndarray
+    log_probs: np.ndarray
+    
+    @property
+    def num_scored(self) -> int:
+        """Number of tokens that received a log-probability."""
+        return int(np.count_nonzero(~np.isnan(self.log_probs)))
+    
+    def perplexity(self) -> float:
+        """Raw (uncalibrated) perplexity over all scored tokens."""
+        if self.num_scored == 0:
+            raise ValueError("Text is too short to calculate perplexity")
+        return float(np.exp(-np.nanmean(self.log_probs)))
+    
+    def token_range(self, start: int, end: int) -> Tuple[int, int]:
+        """Index range of the tokens that start inside the character span [start, end)."""
+        token_starts = self.offsets[:, 0]
+        first = int(np.searchsorted(token_starts, start, side='left'))
+        last = int(np.searchsorted(token_starts, end, side='left'))
+        return first, last
+    
+    def span_perplexity(self, start: int, end: int) -> Optional[float]:
+        """Perplexity of the tokens starting inside the character span [start, end).
+        
+        Args:
+            start: Span start offset in ``text``
+            end: Span end offset in ``text``
+            
+        Returns:
+            Perplexity, or None if part of the span was not scored
+        """
+        first, last = self.token_range(start, end)
+        # The document's first token never has a prediction; skip it
+        span_log_probs = self.log_probs[max(first, 1):last]
+        if len(span_log_probs) == 0 or np.isnan(span_log_probs).any():
+            return None
+        
+        return float(np.exp(-span_log_probs.mean()))
+
+
+def _strided_windows(num_tokens: int, window: int, stride: int) -> Iterator[Tuple[int, int, int]]:
+    """Plan overlapping windows that together score every token once.
+    
+    Args:
+        num_tokens: Number of tokens in the document
+        window: Tokens per window
+        stride: Tokens advanced between windows (<= 0 stops after the first window)
+        
+    Yields:
+        (begin, end, score_from): the window covers tokens [begin, end) and only
+        tokens [score_from, end) are scored, the rest is context
+    """
+    begin = 0
+    scored_until = 1  # The first token has no context and is never scored
+    
+    while True:
+        end = min(begin + window, num_tokens)
+        yield begin, end, max(scored_until, begin + 1)
+        
+        if end == num_tokens or stride <= 0:
+            break
+        scored_until = end
+        begin += min(stride, window - 1)
+
+
+def compute_token_log_probs(text: str, tokens: Optional[Tokens] = None) -> TokenLogProbs:
+    """Run GPT-2 over the text and keep the log-probability of every token.
+    
+    Documents longer than ``settings.max_token_length`` tokens are covered with
+    overlapping windows advanced by ``settings.perplexity_stride``; each token is
+    scored once, in the window that gives it the most context. Document
+    perplexity and sentence perplexities are both derived from the result, so
+    callers should compute it once and share it.
     
     Args:
         text: Input text
+        tokens: GPT-2 tokens of ``text``, if already computed
         
     Returns:
-        Perplexity score (lower = more AI-like)
+        TokenLogProbs for the text
     """
-    model, tokenizer = gpt2_loader.load()
+    for token_log_probs, _ in iter_token_log_probs(text, tokens):
+        pass
+    return token_log_probs
+
+
+def iter_token_log_probs(
+    text: str,
+    tokens: Optional[Tokens] = None
+) -> Iterator[Tuple[TokenLogProbs, int]]:
+    """Run GPT-2 over the text window by window, as ``compute_token_log_probs``.
     
-    # Tokenize
-    encodings = tokenizer(text, return_tensors='pt', truncation=True, max_length=settings.max_token_length)
+    Args:
+        text: Input text
+        tokens: GPT-2 tokens of ``text`` (e.g. ``Document.gpt2_tokens``);
+            tokenized here if omitted
+        
+    Yields:
+        (token_log_probs, scored_tokens) after each window: the same, growing
+        TokenLogProbs, and how many leading tokens are final so far
+    """
+    window = settings.max_token_length
+    stride = settings.perplexity_stride
     
-    # Move to device
-    device = torch.device(settings.device)
-    input_ids = encodings.input_ids.to(device)
+    # Character offsets map sentences onto tokens; windows are views of the ids
+    if tokens is None:
+        tokens = tokenize(gpt2_loader.load()[1], text)
+    if stride <= 0:
+        tokens = tokens[:window]
+    input_ids = tokens.ids
+    token_log_probs = TokenLogProbs(
+        text=text,
+        offsets=tokens.offsets,
+        log_probs=np.full(len(input_ids), np.nan, dtype=np.float64)
+    )
     
-    # Calculate loss
-    with torch.no_grad():
-        outputs = model(input_ids, labels=input_ids)
-        loss = outputs.loss
+    if len(input_ids) < 2:
+        yield token_log_probs, len(input_ids)
+        return
     
-    # Perplexity = exp(loss)
-    perplexity = torch.exp(loss).item()
+    for begin, end, score_from in _strided_windows(len(input_ids), window, stride):
+        # nll[j] is the loss of token begin + j + 1 given the tokens before it
+        nll = _token_nll([input_ids[begin:end]])[0]
+        token_log_probs.log_probs[score_from:end] = -nll[score_from - begin - 1:end - begin - 1]
+        yield token_log_probs, end
+
+
+def compute_token_log_probs_batch(texts: List[str]) -> List[TokenLogProbs]:
+    """``compute_token_log_probs`` for several texts, sharing forward passes.
+    
+    Texts that fit in one GPT-2 window are submitted together, so the
+    micro-batcher packs them into padded batches; longer ones are scored
+    window by window on their own.
     
+    Args:
+        texts: Input texts
+        
+    Returns:
+        TokenLogProbs for each text, in order
+    """
+    _, tokenizer = gpt2_loader.load()
+    window = settings.max_token_length
+    
+    encodings = tokenizer(texts, return_offsets_mapping=True)
+    results: List[TokenLogProbs] = []
+    batch: List[int] = []
+    
+    for index, text in enumerate(texts):
+        input_ids = encodings['input_ids'][index]
+        if len(input_ids) > window:
+            results.append(compute_token_log_probs(text))
+            continue
+        
+        offsets = np.array(encodings['offset_mapping'][index], dtype=np.int64).reshape(-1, 2)
+        log_probs = np.full(len(input_ids), np.nan, dtype=np.float64)
+        results.append(TokenLogProbs(text=text, offsets=offsets, log_probs=log_probs))
+        if len(input_ids) >= 2:
+            batch.append(index)
+    
+    token_nll = _token_nll([encodings['input_ids'][index] for index in batch]) if batch else []
+    for index, nll in zip(batch, token_nll):
+        results[index].log_probs[1:] = -nll
+    
+    return results
+
+
+def calibrate_perplexity(perplexity: float, word_count: int) -> float:
+    """Apply length protection to a raw document perplexity.
+    
+    Args:
+        perplexity: Raw perplexity
+        word_count: Number of words in the document
+        
+    Returns:
+        Calibrated perplexity
+    """
     # NEW: Length Protection Logic
     # For very short texts (under 150 words), predictability is NOT a bug, it's a feature of simple English.
     # We apply a "Benefit of the Doubt" multiplier that RAISES perplexity for short samples.
-    word_count = len(text.split())
     if word_count < 150:
         # Scale up: a 10-word text gets a ~2x boost to perplexity to avoid false positives
         protection_factor = 2.0 - min(word_count / 150.0, 1.0)
@@ -50,52 +218,326 @@ def calculate_perplexity(text: str) -> float:
         length_penalty = np.log10(word_count) / 2.5
         perplexity = perplexity * length_penalty
     
+    return perplexity
+
+
+def calculate_perplexity(
+    text: str,
+    token_log_probs: Optional[TokenLogProbs] = None,
+    features: Optional[DocumentFeatures] = None
+) -> float:
+    """Calculate perplexity for entire text.
+    
+    Args:
+        text: Input text
+        token_log_probs: Precomputed log-probs for ``text`` (computed if omitted)
+        features: Features of ``text``, whose word count is used if given
+        
+    Returns:
+        Perplexity score (lower = more AI-like)
+    """
+    if token_log_probs is None:
+        token_log_probs = compute_token_log_probs(text)
+    
+    # Perplexity = exp(mean negative log-likelihood)
+    word_count = features.word_count if features is not None else len(text.split())
+    perplexity = calibrate_perplexity(token_log_probs.perplexity(), word_count)
+    
     logger.debug(f"Document perplexity (calibrated): {perplexity:.2f}")
     
     return perplexity
 
 
-def calculate_sentence_perplexities(sentences: List[str]) -> List[Dict[str, any]]:
-    """Calculate perplexity for each sentence.
+def slice_sentence_perplexities(
+    token_log_probs: TokenLogProbs,
+    sentences: List[str]
+) -> List[Dict[str, any]]:
+    """Calculate per-sentence perplexities by slicing the document log-probs.
+    
+    Each sentence is located in the document text and its perplexity is taken
+    from the tokens inside its character span, so no extra model call is needed.
+    Sentences that cannot be located or fall past the scored region are scored
+    on their own with ``calculate_sentence_perplexities``.
     
     Args:
-        sentences: List of sentences
+        token_log_probs: Log-probs of the document the sentences come from
+        sentences: List of sentences, in document order
         
     Returns:
         List of dicts with sentence text and perplexity score
     """
+    sliced = dict(slice_scored_sentences(token_log_probs, sentences))
+    sliced.update(score_unsliced_sentences(sentences, sliced))
+    
+    return [sliced[index] for index in range(len(sentences)) if sliced[index] is not None]
+
+
+def slice_scored_sentences(
+    token_log_probs: TokenLogProbs,
+    sentences: List[str],
+    scored_tokens: Optional[int] = None,
+    skip: Container[int] = (),
+    spans: Optional[List[Optional[Tuple[int, int]]]] = None
+) -> Iterator[Tuple[int, Optional[Dict[str, any]]]]:
+    """Slice the perplexity of every sentence whose tokens are all scored.
+    
+    Args:
+        token_log_probs: Log-probs of the document the sentences come from
+        sentences: List of sentences, in document order
+        scored_tokens: Leading tokens scored so far (all of them if omitted)
+        skip: Indices of sentences to leave out, e.g. ones already sliced
+        spans: ``sentence_spans`` of the sentences, if already computed
+        
+    Yields:
+        (index, result) in document order; result is a dict with sentence text
+        and perplexity, or None for sentences too short to score. Sentences that
+        can't be sliced (yet) are not yielded.
+    """
+    offsets = token_log_probs.offsets
+    if scored_tokens is None:
+        scored_tokens = len(offsets)
+    
+    if spans is None:
+        spans = sentence_spans(token_log_probs.text, sentences)
+    
+    for index, span in enumerate(spans):
+        if index in skip or span is None:
+            continue
+        start, end = span
+        
+        # The document pass was truncated before the end of this sentence
+        if len(offsets) == 0 or end > offsets[-1, 1]:
+            continue
+        
+        first, last = token_log_probs.token_range(start, end)
+        if last > scored_tokens:
+            continue
+        
+        # Skip very short sentences, as the standalone path does
+        if last - first < 3:
+            yield index, None
+            continue
+        
+        perplexity = token_log_probs.span_perplexity(start, end)
+        if perplexity is not None:
+            yield index, {'text': sentences[index], 'perplexity': perplexity}
+
+
+def score_unsliced_sentences(
+    sentences: List[str],
+    sliced: Dict[int, Optional[Dict[str, any]]]
+) -> Dict[int, Optional[Dict[str, any]]]:
+    """Score the sentences the document pass didn't cover on their own.
+    
+    Args:
+        sentences: List of sentences, in document order
+        sliced: Results of ``slice_scored_sentences`` by sentence index
+        
+    Returns:
+        Result (or None if too short) by index for every sentence not in ``sliced``
+    """
+    missing = [index for index in range(len(sentences)) if index not in sliced]
+    if not missing:
+        return {}
+    
+    scored = calculate_sentence_perplexities([sentences[index] for index in missing])
+    by_text = {item['text']: item for item in scored}
+    return {index: by_text.get(sentences[index]) for index in missing}
+
+
+def _run_gpt2_batch(sequences: List[List[int]]) -> List[np.ndarray]:
+    """Run one padded GPT-2 forward pass over a batch of token id sequences.
+    
+    Args:
+        sequences: Token id sequences (padded on the right to the longest one)
+        
+    Returns:
+        For each sequence, the negative log-likelihood of every token after the first
+    """
+    import torch
+    
     model, tokenizer = gpt2_loader.load()
     device = torch.device(settings.device)
     
-    results = []
+    longest = max(len(seq) for seq in sequences)
+    pad_id = tokenizer.eos_token_id if tokenizer.eos_token_id is not None else 0
+    
+    input_ids = torch.full((len(sequences), longest), pad_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(sequences), longest), dtype=torch.long)
+    for i, seq in enumerate(sequences):
+        input_ids[i, :len(seq)] = torch.tensor(seq, dtype=torch.long)
+        attention_mask[i, :len(seq)] = 1
+    
+    input_ids = input_ids.to(device)
+    attention_mask = attention_mask.to(device)
     
+    with torch.no_grad():
+        logits = model(input_ids, attention_mask=attention_mask).logits[:, :-1]
+        nll = torch.nn.functional.cross_entropy(
+            logits.transpose(1, 2), input_ids[:, 1:], reduction='none'
+        )
+    
+    # Drop the padded positions of each row
+    nll = nll.double().cpu().numpy()
+    return [nll[i, :len(seq) - 1] for i, seq in enumerate(sequences)]
+
+
+# Batches GPT-2 passes across concurrent requests
+gpt2_batcher = MicroBatcher("gpt2", _run_gpt2_batch)
+
+
+def _token_nll(sequences: List[List[int]]) -> List[np.ndarray]:
+    """Per-token negative log-likelihoods for each sequence, via the micro-batcher."""
+    return gpt2_batcher.submit_many(sequences)
+
+
+def _length_bucket(length: int, buckets: List[int]) -> int:
+    """Smallest bucket boundary that fits ``length`` (``SENTENCE_MAX_TOKENS`` if none does)."""
+    for boundary in buckets:
+        if length <= boundary:
+            return boundary
+    return SENTENCE_MAX_TOKENS
+
+
+class SentenceMemo:
+    """LRU of standalone sentence perplexities, keyed by sentence hash and model.
+    
+    A sentence scored on its own always gets the same perplexity, so edited
+    documents only pay for the sentences that changed.
+    """
+    
+    def __init__(self):
+        self._entries: "OrderedDict[str, Dict[str, any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    @staticmethod
+    def key(sentence: str) -> str:
+        """Memo key for a sentence under the current model and backend."""
+        payload = f"{settings.model_name}\0{settings.inference_backend}\0{sentence}"
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, sentence: str) -> Optional[Dict[str, any]]:
+        """Memoized result for a sentence, or None."""
+        key = self.key(sentence)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return item
+    
+    def put(self, item: Dict[str, any]) -> None:
+        """Remember a sentence result (a dict with 'text', 'perplexity' and 'tokens')."""
+        if settings.sentence_memo_size <= 0:
+            return
+        key = self.key(item['text'])
+        with self._lock:
+            self._entries[key] = item
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.sentence_memo_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """Size and hit counters of the memo."""
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self._hits, 'misses': self._misses}
+
+
+# Standalone sentence perplexities shared by all requests
+sentence_memo = SentenceMemo()
+
+
+def calculate_sentence_perplexities(
+    sentences: List[str],
+    batch_size: Optional[int] = None,
+    known: Optional[Dict[str, Dict[str, any]]] = None
+) -> List[Dict[str, any]]:
+    """Calculate perplexity for each sentence on its own.
+    
+    Sentences already in ``known`` or the sentence memo are not re-run, and
+    duplicates are scored once. The rest are grouped by token length, padded
+    and run through GPT-2 in batches; each sentence's loss is the mean over
+    its own (unpadded) tokens.
+    
+    Args:
+        sentences: List of sentences
+        batch_size: Sentences per forward pass (``settings.sentence_batch_size`` if omitted)
+        known: Earlier results by sentence text, e.g. from a previous analysis
+        
+    Returns:
+        List of dicts with sentence text, perplexity score and number of scored
+        tokens, in input order
+    """
+    return _sentence_perplexities(sentences, batch_size, known)[0]
+
+
+def _sentence_perplexities(
+    sentences: List[str],
+    batch_size: Optional[int],
+    known: Optional[Dict[str, Dict[str, any]]]
+) -> Tuple[List[Dict[str, any]], int]:
+    """``calculate_sentence_perplexities``, plus how many sentences went through GPT-2."""
+    batch_size = batch_size or settings.sentence_batch_size
+    buckets = sorted(settings.sentence_length_buckets)
+    known = known or {}
+    
+    if not sentences:
+        return [], 0
+    
+    # Reuse earlier results; each remaining distinct sentence is scored once
+    results: Dict[str, Optional[Dict[str, any]]] = {}
     for sentence in sentences:
-        try:
-            # Tokenize
-            encodings = tokenizer(sentence, return_tensors='pt', truncation=True, max_length=512)
-            input_ids = encodings.input_ids.to(device)
-            
-            # Skip very short sentences
-            if input_ids.shape[1] < 3:
+        if sentence not in results:
+            results[sentence] = known.get(sentence) or sentence_memo.get(sentence)
+    pending = [sentence for sentence, item in results.items() if item is None]
+    run = 0
+    
+    if pending:
+        _, tokenizer = gpt2_loader.load()
+        
+        # Tokenize everything at once, truncating to the model's sentence limit
+        all_ids = [ids[:SENTENCE_MAX_TOKENS] for ids in tokenizer(pending)['input_ids']]
+        
+        # Group by length bucket, skipping very short sentences; longer ones
+        # than the largest bucket share a batch padded to their own longest
+        groups: Dict[int, List[int]] = {}
+        for index, ids in enumerate(all_ids):
+            if len(ids) < 3:
                 continue
+            groups.setdefault(_length_bucket(len(ids), buckets), []).append(index)
+            run += 1
+        
+        for bucket in sorted(groups):
+            indices = sorted(groups[bucket], key=lambda i: len(all_ids[i]))
             
-            # Calculate loss
-            with torch.no_grad():
-                outputs = model(input_ids, labels=input_ids)
-                loss = outputs.loss
-            
-            perplexity = torch.exp(loss).item()
-            
-            results.append({
-                'text': sentence,
-                'perplexity': perplexity
-            })
-            
-        except Exception as e:
-            logger.warning(f"Error calculating perplexity for sentence: {e}")
-            continue
+            for start in range(0, len(indices), batch_size):
+                batch = indices[start:start + batch_size]
+                try:
+                    token_nll = _token_nll([all_ids[i] for i in batch])
+                except Exception as e:
+                    logger.warning(f"Error calculating perplexity for sentence batch: {e}")
+                    continue
+                
+                # Mean over each sentence's own (unpadded) tokens
+                for i, nll in zip(batch, token_nll):
+                    item = {
+                        'text': pending[i],
+                        'perplexity': float(np.exp(nll.mean())),
+                        'tokens': len(nll)
+                    }
+                    results[pending[i]] = item
+                    sentence_memo.put(item)
     
-    return results
+    scored = [results[sentence] for sentence in sentences if results[sentence] is not None]
+    return scored, run
 
 
 def normalize_perplexity(perplexity: float, min_ppl: float = 10.0, max_ppl: float = 300.0) -> float:
@@ -156,10 +598,21 @@ def calculate_perplexity_distribution(sentence_scores: List[Dict[str, any]]) ->
     
     # Skewness: AI writing is usually very symmetric (predictable), 
     # human writing has long tails of high perplexing words.
-    text_skew = skew(ppls) if len(ppls) > 2 else 0.0
+    text_skew = _skewness(ppls) if len(ppls) > 2 else 0.0
     
     return {
         'std': float(std),
         'cv': float(cv),
         'skew': float(text_skew)
     }
+
+
+def _skewness(values: List[float]) -> float:
+    """Sample skewness (the biased estimator, as ``scipy.stats.skew``); 0 for constant values."""
+    values = np.asarray(values, dtype=np.float64)
+    deviations = values - values.mean()
+    m2 = np.mean(deviations ** 2)
+    # Same "no spread" guard as scipy, which returns nan there
+    if m2 <= (np.finfo(np.float64).resolution * values.mean()) ** 2:
+        return 0.0
+    return float(np.mean(deviations ** 3) / m2 ** 1.5)
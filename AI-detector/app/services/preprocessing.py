@@ -1,31 +1,88 @@
 """Text preprocessing utilities."""
-import re
-from typing import List, Dict, Tuple
-import nltk
+import os
+import threading
+from typing import List, Dict, Optional, Tuple
 import numpy as np
 
+from app.core.config import settings
 from app.core.logging import get_logger
+from app.services.features import DocumentFeatures
 
 logger = get_logger(__name__)
 
-# Download NLTK data if not already present
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    logger.info("Downloading NLTK punkt tokenizer...")
-    nltk.download('punkt', quiet=True)
+# Punkt sentence tokenizer, once loaded (see load_sentence_tokenizer)
+_punkt = None
+_punkt_lock = threading.Lock()
+
+# Typographic quotes become plain ones; one character each, so offsets don't move
+_NORMALIZE = str.maketrans({
+    '\u201c': '"', '\u201d': '"', '\u201e': '"', '\u201f': '"',
+    '\u2018': "'", '\u2019': "'", '\u201a': "'", '\u201b': "'"
+})
+
+# Whether each code point up to U+3000 (the last whitespace one) is whitespace;
+# the final entry stands for everything above
+_IS_SPACE = np.array([chr(code).isspace() for code in range(0x3002)])
+
+# Sentences with fewer words are dropped as noise
+MIN_SENTENCE_WORDS = 3
+
+
+def load_sentence_tokenizer():
+    """Load the bundled Punkt sentence model, once.
+    
+    The ``punkt_tab`` model is looked up in ``settings.nltk_data_dir`` (put
+    there when the image is built) before the usual nltk data path. It is
+    never downloaded at runtime. Deferred to the first use (or the
+    background preload) so importing nltk doesn't delay startup.
+    
+    Returns:
+        The ``PunktSentenceTokenizer``
+        
+    Raises:
+        LookupError: If the model is not installed
+    """
+    global _punkt
+    if _punkt is None:
+        with _punkt_lock:
+            if _punkt is None:
+                import nltk.data
+                from nltk.tokenize.punkt import PunktSentenceTokenizer, load_punkt_params
+                
+                data_dir = os.path.abspath(settings.nltk_data_dir)
+                if data_dir not in nltk.data.path:
+                    nltk.data.path.insert(0, data_dir)
+                try:
+                    model_dir = nltk.data.find('tokenizers/punkt_tab/english/')
+                except LookupError:
+                    raise LookupError(
+                        f"Punkt sentence model not found in {data_dir!r} or the nltk data path; "
+                        f"run: python -m nltk.downloader -d {settings.nltk_data_dir} punkt_tab"
+                    ) from None
+                _punkt = PunktSentenceTokenizer(load_punkt_params(model_dir))
+    return _punkt
 
 
 def clean_text(text: str) -> str:
     """Clean and normalize text for scientific analysis."""
-    # Standardize whitespace and remove control characters
-    text = re.sub(r'[\r\n\t]+', ' ', text)
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Standardize quotes and unicode artifacts
-    text = text.replace('"', '"').replace('"', '"').replace("'", "'").replace("'", "'")
+    # Standardize quotes, then collapse whitespace (control characters included)
+    return ' '.join(text.translate(_NORMALIZE).split())
+
+
+def sentence_spans(cleaned: str) -> List[Tuple[int, int]]:
+    """Character spans of the sentences of a cleaned text.
     
-    return text.strip()
+    Args:
+        cleaned: Output of ``clean_text``
+        
+    Returns:
+        (start, end) of each sentence with at least ``MIN_SENTENCE_WORDS`` words
+    """
+    return [
+        (start, end) for start, end in load_sentence_tokenizer().span_tokenize(cleaned)
+        # Words are separated by exactly one space in cleaned text
+        if cleaned.count(' ', start, end) + 1 >= MIN_SENTENCE_WORDS
+    ]
 
 
 def tokenize_sentences(text: str) -> List[str]:
@@ -37,25 +94,100 @@ def tokenize_sentences(text: str) -> List[str]:
     Returns:
         List of sentences
     """
-    sentences = nltk.sent_tokenize(text)
+    cleaned = clean_text(text)
+    return [cleaned[start:end] for start, end in sentence_spans(cleaned)]
+
+
+class OriginalOffsets:
+    """Maps character offsets of ``clean_text(original)`` back to ``original``.
+    
+    Cleaning only collapses whitespace, so every word keeps its length and
+    an offset moves by the whitespace removed before its word. Needs no
+    sentence splitting, so a cached result can be mapped onto a new input.
+    """
+    
+    def __init__(self, original: str):
+        # Whitespace as str.split() sees it, classified per code point in numpy
+        codes = np.frombuffer(original.encode('utf-32-le'), dtype=np.uint32)
+        is_space = _IS_SPACE[np.minimum(codes, len(_IS_SPACE) - 1)]
+        edges = np.flatnonzero(np.diff(is_space, prepend=True, append=True))
+        starts, ends = edges[0::2], edges[1::2]
+        self._original_starts = starts.astype(np.int64)
+        self._word_starts = np.concatenate(
+            ([0], np.cumsum(ends[:-1] - starts[:-1] + 1))
+        ).astype(np.int64)
+    
+    def span(self, start: int, end: int) -> Tuple[int, int]:
+        """Span of the original covering the span [start, end) of the cleaned text."""
+        original_start, original_end = self.to_original(np.array([start, end])).tolist()
+        return original_start, original_end
+    
+    def to_original(self, offsets: np.ndarray) -> np.ndarray:
+        """Offsets of the original for an array of offsets of the cleaned text."""
+        if len(self._original_starts) == 0:
+            return np.zeros_like(offsets)
+        words = np.searchsorted(self._word_starts, offsets, side='right') - 1
+        clipped = np.maximum(words, 0)
+        return np.where(
+            words < 0, 0, self._original_starts[clipped] + offsets - self._word_starts[clipped]
+        )
+
+
+class PreprocessedText:
+    """A cleaned input text, its sentence spans and the way back to the input.
+    
+    Sentences are kept as spans of ``cleaned``; ``original_span`` maps any
+    span back to the raw input, e.g. to highlight what the user pasted.
+    """
+    
+    def __init__(self, original: str):
+        self.original = original
+        self.cleaned = clean_text(original)
+        self.spans = sentence_spans(self.cleaned)
+        self._offsets: Optional[OriginalOffsets] = None
+        self._features: Optional[DocumentFeatures] = None
     
-    # Filter out very short sentences (likely noise)
-    sentences = [s for s in sentences if len(s.split()) >= 3]
+    @property
+    def sentences(self) -> List[str]:
+        """The sentences as strings."""
+        return [self.cleaned[start:end] for start, end in self.spans]
     
-    return sentences
+    @property
+    def features(self) -> DocumentFeatures:
+        """Word, sentence and line features of the cleaned text, computed once."""
+        if self._features is None:
+            self._features = DocumentFeatures.from_spans(self.cleaned, self.spans)
+        return self._features
+    
+    def original_span(self, start: int, end: int) -> Tuple[int, int]:
+        """Span of the original input covering the span [start, end) of ``cleaned``."""
+        if self._offsets is None:
+            self._offsets = OriginalOffsets(self.original)
+        return self._offsets.span(start, end)
+
+
+def preprocess(text: str) -> PreprocessedText:
+    """Clean a text and find its sentences, keeping spans instead of copies."""
+    return PreprocessedText(text)
 
 
 def preprocess_text(text: str) -> Tuple[str, List[str]]:
     """Preprocess text for analysis."""
-    cleaned = clean_text(text)
-    sentences = tokenize_sentences(cleaned)
-    return cleaned, sentences
+    preprocessed = preprocess(text)
+    return preprocessed.cleaned, preprocessed.sentences
 
 
-def extract_stylometric_features(text: str, sentences: List[str]) -> Dict[str, float]:
+def extract_stylometric_features(
+    text: str,
+    sentences: List[str],
+    features: Optional[DocumentFeatures] = None
+) -> Dict[str, float]:
     """Extract statistical markers of human vs AI writing style."""
-    words = text.split()
-    word_count = len(words)
+    if features is not None:
+        word_count = features.word_count
+    else:
+        words = text.split()
+        word_count = len(words)
     
     if word_count == 0 or not sentences:
         return {
@@ -64,19 +196,27 @@ def extract_stylometric_features(text: str, sentences: List[str]) -> Dict[str, f
             'lexical_diversity': 0.0,
             'stopword_ratio': 0.0
         }
-
+    
     # Sentence lengths
-    sent_lengths = [len(s.split()) for s in sentences]
+    if features is not None:
+        sent_lengths = features.sentence_lengths
+    else:
+        sent_lengths = [len(s.split()) for s in sentences]
     avg_sent_len = np.mean(sent_lengths)
     sent_len_var = np.var(sent_lengths)
     
-    # Lexical Diversity (Type-Token Ratio)
-    unique_words = set(w.lower() for w in words)
-    ttr = len(unique_words) / word_count if word_count > 0 else 0
-    
     # Simple Stopword Ratio (common functional words)
     stopwords = {'the', 'a', 'an', 'in', 'on', 'at', 'for', 'with', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 'to', 'of'}
-    stop_count = sum(1 for w in words if w.lower() in stopwords)
+    
+    # Lexical Diversity (Type-Token Ratio)
+    if features is not None:
+        unique_count = len(features.vocabulary)
+        stop_ids = [i for i, word in enumerate(features.vocabulary) if word in stopwords]
+        stop_count = int(np.isin(features.word_ids, np.array(stop_ids, dtype=np.uint64)).sum())
+    else:
+        unique_count = len(set(w.lower() for w in words))
+        stop_count = sum(1 for w in words if w.lower() in stopwords)
+    ttr = unique_count / word_count if word_count > 0 else 0
     stop_ratio = stop_count / word_count
     
     return {
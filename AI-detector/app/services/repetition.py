@@ -1,13 +1,100 @@
 """Repetition detection metrics."""
-from typing import List
-from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
 import numpy as np
 
 from app.core.logging import get_logger
+from app.services.features import DocumentFeatures
 
 logger = get_logger(__name__)
 
 
+# Highest n-gram order counted by ``ngram_stats``
+MAX_NGRAM_ORDER = 5
+
+# Multiplier of the rolling n-gram hash (odd, so it is invertible mod 2**64)
+_HASH_BASE = np.uint64(0x9E3779B97F4A7C15)
+
+
+@dataclass
+class NgramStats:
+    """Word and n-gram repetition statistics of a text.
+    
+    Attributes:
+        total_words: Number of words (whitespace-separated, lowercased)
+        unique_words: Number of distinct words
+        repetition: (total - unique) / total n-grams, by n-gram order
+    """
+    
+    total_words: int
+    unique_words: int
+    repetition: Dict[int, float]
+    
+    @property
+    def diversity(self) -> float:
+        """Type/token ratio (1.0 for an empty text)."""
+        return self.unique_words / self.total_words if self.total_words else 1.0
+
+
+def word_ids(text: str) -> Tuple[np.ndarray, int]:
+    """Lowercased words of a text as integer ids, in one pass.
+    
+    Args:
+        text: Input text
+    
+    Returns:
+        (ids, vocabulary size); equal words get equal ids
+    """
+    vocabulary: Dict[str, int] = {}
+    ids = [vocabulary.setdefault(word, len(vocabulary)) for word in text.lower().split()]
+    return np.array(ids, dtype=np.uint64), len(vocabulary)
+
+
+def ngram_stats(
+    text: str,
+    max_order: int = MAX_NGRAM_ORDER,
+    features: Optional[DocumentFeatures] = None
+) -> NgramStats:
+    """Repetition of every n-gram order up to ``max_order``, from one pass over the words.
+    
+    Words are mapped to ids once; each order's n-grams are then hashed from
+    the previous order's with one vectorized multiply-add (a polynomial
+    rolling hash, wrapping mod 2**64) and counted after one sort.
+    
+    Args:
+        text: Input text
+        max_order: Highest n-gram order
+        features: Features of ``text``, whose word ids are used if given
+    
+    Returns:
+        NgramStats with repetition ratios for orders 1 to ``max_order``
+    """
+    if features is not None:
+        ids, vocabulary_size = features.word_ids, len(features.vocabulary)
+    else:
+        ids, vocabulary_size = word_ids(text)
+    # Shift ids so no word hashes to 0
+    hashes = ids + np.uint64(1)
+    repetition: Dict[int, float] = {}
+    
+    for order in range(1, max_order + 1):
+        if order > 1:
+            hashes = hashes[:-1] * _HASH_BASE + ids[order - 1:] + np.uint64(1)
+        total = len(hashes)
+        unique = vocabulary_size if order == 1 else _count_distinct(hashes)
+        repetition[order] = (total - unique) / total if total > 0 else 0.0
+    
+    return NgramStats(total_words=len(ids), unique_words=vocabulary_size, repetition=repetition)
+
+
+def _count_distinct(values: np.ndarray) -> int:
+    """Number of distinct values (a plain sort is much faster than ``np.unique`` here)."""
+    if len(values) == 0:
+        return 0
+    ordered = np.sort(values)
+    return 1 + int(np.count_nonzero(ordered[1:] != ordered[:-1]))
+
+
 def calculate_ngram_repetition(text: str, n: int = 3) -> float:
     """Calculate n-gram repetition ratio.
     
@@ -18,27 +105,7 @@ def calculate_ngram_repetition(text: str, n: int = 3) -> float:
     Returns:
         Repetition ratio (0-1, higher = more repetitive)
     """
-    words = text.lower().split()
-    
-    if len(words) < n:
-        return 0.0
-    
-    # Generate n-grams
-    ngrams = [tuple(words[i:i+n]) for i in range(len(words) - n + 1)]
-    
-    if not ngrams:
-        return 0.0
-    
-    # Count occurrences
-    ngram_counts = Counter(ngrams)
-    
-    # Calculate repetition: (total - unique) / total
-    total_ngrams = len(ngrams)
-    unique_ngrams = len(ngram_counts)
-    
-    repetition = (total_ngrams - unique_ngrams) / total_ngrams if total_ngrams > 0 else 0.0
-    
-    return float(repetition)
+    return float(ngram_stats(text, max_order=n).repetition[n])
 
 
 def calculate_token_diversity(text: str) -> float:
@@ -50,34 +117,32 @@ def calculate_token_diversity(text: str) -> float:
     Returns:
         Diversity score (0-1, higher = more diverse)
     """
-    words = text.lower().split()
-    
-    if not words:
-        return 1.0
-    
-    unique_words = len(set(words))
-    total_words = len(words)
-    
-    diversity = unique_words / total_words
-    
-    return float(diversity)
+    return float(ngram_stats(text, max_order=1).diversity)
 
 
-def calculate_repetition_score(text: str) -> float:
+def calculate_repetition_score(
+    text: str,
+    stats: Optional[NgramStats] = None,
+    features: Optional[DocumentFeatures] = None
+) -> float:
     """Calculate overall repetition score.
     
     Combines n-gram repetition and token diversity.
     
     Args:
         text: Input text
+        stats: ``ngram_stats`` of the text, if already computed
+        features: Features of the text, if already computed
         
     Returns:
         Repetition score (0-1, higher = more repetitive/AI-like)
     """
-    # Calculate metrics
-    bigram_rep = calculate_ngram_repetition(text, n=2)
-    trigram_rep = calculate_ngram_repetition(text, n=3)
-    diversity = calculate_token_diversity(text)
+    # Calculate metrics (one pass for every order)
+    if stats is None:
+        stats = ngram_stats(text, features=features)
+    bigram_rep = stats.repetition[2]
+    trigram_rep = stats.repetition[3]
+    diversity = stats.diversity
     
     # Combine metrics
     # Higher repetition and lower diversity = more AI-like
@@ -1,75 +1,442 @@
 """Scoring and aggregation logic."""
-from typing import List, Dict
+import hashlib
+from typing import Iterator, List, Dict, Optional, Tuple
 import numpy as np
 
 from app.core.config import settings
 from app.core.logging import get_logger
+from app.core.metrics import cascade_decisions, span
 from app.services.perplexity import (
+    iter_token_log_probs,
     calculate_perplexity,
+    calibrate_perplexity,
     calculate_sentence_perplexities,
+    _sentence_perplexities,
+    slice_scored_sentences,
+    score_unsliced_sentences,
     normalize_perplexity,
-    calculate_perplexity_variance,
     normalize_variance,
     calculate_perplexity_distribution
 )
 from app.services.burstiness import calculate_burstiness, normalize_burstiness
 from app.services.repetition import calculate_repetition_score, normalize_repetition
 from app.services.preprocessing import extract_stylometric_features
-from app.models.detector_loader import detector_loader
+from app.services.classifier import (
+    calculate_window_probabilities,
+    classifier_windows,
+    pool_window_probabilities,
+    window_probability
+)
+from app.services.document import Document
+from app.services.features import DocumentFeatures
+from app.services.long_document import score_chunks
 from app.services.modality import detect_modality
-import torch
 
 logger = get_logger(__name__)
 
+# Analysis modes of calculate_final_score
+MODES = ("full", "fast")
+
 
-def calculate_final_score(text: str, sentences: List[str]) -> Dict[str, any]:
+def calculate_final_score(
+    text: str,
+    sentences: List[str],
+    mode: str = "full",
+    features: Optional[DocumentFeatures] = None
+) -> Dict[str, any]:
     """Calculate final AI detection score.
     
     Args:
         text: Full text
         sentences: List of sentences
+        mode: "full" runs every stage; "fast" may stop after the detector
+            (see ``iter_final_score``)
+        features: Features of the text (computed if omitted)
         
     Returns:
-        Dictionary with score, label, confidence, and metrics
+        Dictionary with score, label, confidence, metrics and the stages run
     """
-    # Calculate individual metrics
-    perplexity = calculate_perplexity(text)
-    burstiness = calculate_burstiness(sentences)
-    repetition = calculate_repetition_score(text)
+    for _, data in iter_final_score(text, sentences, mode, features):
+        pass
+    return data
+
+
+def iter_final_score(
+    text: str,
+    sentences: List[str],
+    mode: str = "full",
+    features: Optional[DocumentFeatures] = None
+) -> Iterator[Tuple[str, Dict[str, any]]]:
+    """Calculate the final AI detection score in stages, yielding each as it's ready.
     
-    # Calculate sentence-level perplexities and distribution
-    sentence_scores = calculate_sentence_perplexities(sentences)
-    dist_metrics = calculate_perplexity_distribution(sentence_scores)
-    variance = dist_metrics['std']
+    Yields ``("metrics", ...)`` first (the text statistics, no model needed),
+    then ``("sentence", ...)`` for each sentence in document order, as soon as
+    the GPT-2 windows covering it and every earlier sentence are done, then
+    ``("result", ...)``, which is exactly what ``calculate_final_score`` returns.
     
-    # Stylometric markers
-    sty_metrics = extract_stylometric_features(text, sentences)
+    In "fast" mode the detector runs right after the text statistics, and
+    if the two agree on a score clearly outside the Uncertain band (see
+    ``_exits_early``) the GPT-2 stages are skipped: the result has no
+    perplexity metrics and no sentence events. Otherwise it continues as
+    "full" does. ``stages_run`` in the result lists what ran.
+    
+    Args:
+        text: Full text
+        sentences: List of sentences
+        mode: "full" or "fast"
+        features: Features of the text (computed if omitted); every text
+            statistic reads the words and sentence lengths from it
+        
+    Yields:
+        (event, data) pairs; sentence data has the sentence ``index``, its
+        ``text``, ``perplexity`` and local (unblended) ``score``
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown analysis mode {mode!r}, expected one of {MODES}")
+    
+    with span('text_metrics'):
+        if features is None:
+            features = DocumentFeatures.from_sentences(text, sentences)
+        text_metrics = calculate_text_metrics(text, sentences, features)
+    yield 'metrics', {
+        name: round(value, 3) if isinstance(value, float) else value
+        for name, value in text_metrics.items()
+    }
+    stages_run = ['text_metrics']
+    
+    # Each model's tokenizer runs at most once; every stage below uses views
+    document = Document(text, sentences, features.spans)
+    
+    classifier_ai_prob = None
+    if mode == "fast":
+        with span('detector'):
+            windows = calculate_window_probabilities(text, document.detector_tokens)
+            classifier_ai_prob = pool_window_probabilities(windows)
+        stages_run.append('detector')
+        
+        if _exits_early(text_metrics, classifier_ai_prob):
+            cascade_decisions.inc('early_exit')
+            result = _early_exit_result(text_metrics, classifier_ai_prob)
+            result['detector_windows'] = windows
+            result['stages_run'] = stages_run
+            yield 'result', result
+            return
+        cascade_decisions.inc('escalated')
+    
+    # One GPT-2 pass shared by document and sentence perplexity
+    sliced: Dict[int, Optional[Dict[str, any]]] = {}
+    # Sentences before this index have been sent; one the document pass can't
+    # slice holds back the rest until it is scored on its own
+    streamed = 0
+    # Also counts the time spent handling each yielded event (just a queue put when streaming)
+    with span('gpt2_document'):
+        for token_log_probs, scored_tokens in iter_token_log_probs(text, document.gpt2_tokens):
+            sliced.update(slice_scored_sentences(
+                token_log_probs, sentences, scored_tokens, sliced, document.spans
+            ))
+            while streamed in sliced:
+                if sliced[streamed] is not None:
+                    yield 'sentence', _sentence_event(streamed, sliced[streamed])
+                streamed += 1
+    
+    stages_run.append('gpt2_document')
+    
+    with span('gpt2_sentences'):
+        unsliced = score_unsliced_sentences(sentences, sliced)
+    if unsliced:
+        stages_run.append('gpt2_sentences')
+    sliced.update(unsliced)
+    for index in range(streamed, len(sentences)):
+        if sliced[index] is not None:
+            yield 'sentence', _sentence_event(index, sliced[index])
+    
+    perplexity = calculate_perplexity(text, token_log_probs, features)
     
     # CALCULATE CLASSIFIER SCORE (AI Fingerprints)
-    # Using the specialized RoBERTa detector
-    model, tokenizer = detector_loader.load()
-    device = torch.device(settings.device)
+    # Using the specialized RoBERTa detector, in windows over the whole document
+    if classifier_ai_prob is None:
+        with span('detector'):
+            windows = calculate_window_probabilities(text, document.detector_tokens)
+            classifier_ai_prob = pool_window_probabilities(windows)
+        stages_run.append('detector')
+    
+    sentence_scores = [
+        _with_window_probability(sliced[index], document.spans[index], windows)
+        for index in range(len(sentences)) if sliced[index] is not None
+    ]
+    
+    with span('aggregate'):
+        result = _aggregate_scores(
+            text, sentences, perplexity, sentence_scores, classifier_ai_prob,
+            token_log_probs.num_scored, text_metrics, features
+        )
+    result['detector_windows'] = windows
+    result['stages_run'] = stages_run
+    yield 'result', result
+
+
+def _with_window_probability(
+    item: Dict[str, any],
+    char_span: Optional[Tuple[int, int]],
+    windows: List[Dict[str, any]]
+) -> Dict[str, any]:
+    """A sentence result plus the detector probability of the windows around it."""
+    probability = window_probability(windows, *char_span) if char_span is not None else None
+    if probability is None:
+        return item
+    # A copy: standalone results are shared through the sentence memo
+    return dict(item, detector_probability=round(probability, 2))
+
+
+def _exits_early(text_metrics: Dict[str, any], classifier_ai_prob: float) -> bool:
+    """Whether the cascade can stop before GPT-2.
     
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-    inputs = {k: v.to(device) for k, v in inputs.items()}
+    The detector probability is the partial score. It must be outside the
+    Uncertain band (``cascade_uncertain_low``-``cascade_uncertain_high``),
+    and burstiness must lean the same way (uniform sentence lengths for AI,
+    varied ones for human). Unreliable texts (short or technical, where the
+    final score leans on the GPT-2 statistics) always run in full.
+    """
+    if not text_metrics['is_reliable']:
+        return False
+    if classifier_ai_prob >= settings.cascade_uncertain_high:
+        return text_metrics['burstiness_score'] >= 50
+    if classifier_ai_prob <= settings.cascade_uncertain_low:
+        return text_metrics['burstiness_score'] < 50
+    return False
+
+
+def _early_exit_result(text_metrics: Dict[str, any], classifier_ai_prob: float) -> Dict[str, any]:
+    """Result of a cascade that stopped after the detector (no perplexity metrics)."""
+    label, confidence = _label(classifier_ai_prob)
+    
+    logger.info(
+        f"Final score (fast): {classifier_ai_prob:.2f} ({label}) - "
+        f"Modality: {text_metrics['modality']}"
+    )
     
-    with torch.no_grad():
-        outputs = model(**inputs)
-        probs = torch.softmax(outputs.logits, dim=-1)
-        # roberta-base-openai-detector labels: [Fake, Real]
-        # We want the 'Fake' (AI) probability
-        classifier_ai_prob = probs[0][0].item() * 100
+    return {
+        'score': round(classifier_ai_prob, 2),
+        'label': label,
+        'confidence': confidence,
+        'is_reliable': text_metrics['is_reliable'],
+        'modality': text_metrics['modality'],
+        'modality_warning': text_metrics['modality_warning'],
+        'sentence_perplexities': [],
+        'metrics': {
+            'burstiness': round(text_metrics['burstiness'], 3),
+            'burstiness_score': round(text_metrics['burstiness_score'], 2),
+            'repetition': round(text_metrics['repetition'], 3),
+            'repetition_score': round(text_metrics['repetition_score'], 2),
+            'tokens_scored': 0
+        }
+    }
+
+
+def _sentence_event(index: int, item: Dict[str, any]) -> Dict[str, any]:
+    return {
+        'index': index,
+        'text': item['text'],
+        'perplexity': round(item['perplexity'], 2),
+        'score': round(normalize_perplexity(item['perplexity']), 2)
+    }
+
+
+def calculate_text_metrics(
+    text: str,
+    sentences: List[str],
+    features: Optional[DocumentFeatures] = None
+) -> Dict[str, any]:
+    """Calculate the document statistics that need no model.
     
-    logger.debug(f"Classifier AI Probability: {classifier_ai_prob:.2f}%")
+    Args:
+        text: Full text
+        sentences: List of sentences
+        features: Features of the text (computed if omitted)
+        
+    Returns:
+        Dictionary with burstiness, repetition (raw and 0-100), modality,
+        modality warning and reliability
+    """
+    if features is None:
+        features = DocumentFeatures.from_sentences(text, sentences)
+    burstiness = calculate_burstiness(sentences, features)
+    repetition = calculate_repetition_score(text, features=features)
     
     # MODALITY DETECTION
-    modality_info = detect_modality(text)
+    modality_info = detect_modality(text, features)
     is_technical = modality_info['type'] == "TECHNICAL"
     
+    if is_technical:
+        modality_warning = "Technical/Code detected - reliability is reduced for this modality."
+    else:
+        modality_warning = None
+    
+    return {
+        'burstiness': burstiness,
+        'burstiness_score': normalize_burstiness(burstiness),
+        'repetition': repetition,
+        'repetition_score': normalize_repetition(repetition),
+        'modality': modality_info['type'],
+        'modality_warning': modality_warning,
+        # Reliability check
+        'is_reliable': len(text) >= 150 and not is_technical
+    }
+
+
+def calculate_incremental_score(
+    text: str,
+    sentences: List[str],
+    previous: Optional[Dict[str, any]] = None,
+    features: Optional[DocumentFeatures] = None
+) -> Dict[str, any]:
+    """Calculate the AI detection score from standalone sentence perplexities.
+    
+    Every sentence is scored on its own, so results from a previous version of
+    the document (and from the sentence memo) stay valid and only new or edited
+    sentences go through GPT-2. Document perplexity is the token-weighted mean
+    of the sentence losses. Scores can differ slightly from
+    ``calculate_final_score``, which gives each sentence its document context.
+    
+    Args:
+        text: Full text
+        sentences: List of sentences
+        previous: ``state`` returned for an earlier version of the document
+        features: Features of the text (computed if omitted)
+        
+    Returns:
+        Same as ``calculate_final_score``, plus a ``state`` dict to pass as
+        ``previous`` next time
+    """
+    if features is None:
+        features = DocumentFeatures.from_sentences(text, sentences)
+    models = [settings.model_name, settings.classifier_model_name]
+    if not previous or previous.get('models') != models:
+        previous = {}
+    known = {item['text']: item for item in previous.get('sentences', [])}
+    with span('gpt2_sentences'):
+        sentence_scores, sentences_run = _sentence_perplexities(sentences, None, known)
+    
+    # Token-weighted mean loss over the sentences
+    tokens_scored = sum(item['tokens'] for item in sentence_scores)
+    if tokens_scored == 0:
+        raise ValueError("Text is too short to calculate perplexity")
+    mean_nll = sum(np.log(item['perplexity']) * item['tokens'] for item in sentence_scores)
+    perplexity = calibrate_perplexity(float(np.exp(mean_nll / tokens_scored)), features.word_count)
+    
+    # Skip the detector if none of its windows changed
+    windows = classifier_windows(text)
+    input_hash = hashlib.sha1(np.concatenate(
+        [np.asarray(window['input_ids'], dtype=np.int64) for window in windows]
+    ).tobytes()).hexdigest()
+    classifier = previous.get('classifier') or {}
+    stages_run = ['gpt2_sentences'] if sentences_run else []
+    if classifier.get('input_hash') == input_hash and 'windows' in classifier:
+        classifier_ai_prob = classifier['probability']
+        windows = classifier['windows']
+    else:
+        with span('detector'):
+            windows = calculate_window_probabilities(text, windows=windows)
+            classifier_ai_prob = pool_window_probabilities(windows)
+        stages_run.append('detector')
+    
+    with span('aggregate'):
+        result = _aggregate_scores(
+            text, sentences, perplexity, sentence_scores, classifier_ai_prob, tokens_scored,
+            features=features
+        )
+    result['detector_windows'] = windows
+    result['stages_run'] = stages_run + ['text_metrics']
+    result['state'] = {
+        'models': models,
+        'sentences': sentence_scores,
+        'classifier': {'input_hash': input_hash, 'probability': classifier_ai_prob, 'windows': windows}
+    }
+    return result
+
+
+def calculate_long_document_score(
+    text: str,
+    sentences: List[str],
+    features: Optional[DocumentFeatures] = None
+) -> Dict[str, any]:
+    """Calculate the AI detection score of a long document, chunk by chunk.
+    
+    Both models see the whole document in model-sized chunks (see
+    ``score_chunks``), so nothing is truncated and peak memory stays flat.
+    Context doesn't carry across chunk boundaries, so scores can differ
+    slightly from ``calculate_final_score`` on texts both accept.
+    
+    Args:
+        text: Full text
+        sentences: List of sentences
+        features: Features of the text (computed if omitted)
+        
+    Returns:
+        Same as ``calculate_final_score``, with the chunk count in the metrics
+    """
+    if features is None:
+        features = DocumentFeatures.from_sentences(text, sentences)
+    with span('long_document_chunks'):
+        chunked = score_chunks(text, sentences)
+    perplexity = calibrate_perplexity(chunked['perplexity'], features.word_count)
+    
+    with span('aggregate'):
+        result = _aggregate_scores(
+            text, sentences, perplexity, chunked['sentence_perplexities'],
+            chunked['classifier_ai_prob'], chunked['tokens_scored'], features=features
+        )
+    result['metrics']['chunks'] = chunked['chunks']
+    result['stages_run'] = ['long_document_chunks', 'text_metrics']
+    return result
+
+
+def _aggregate_scores(
+    text: str,
+    sentences: List[str],
+    perplexity: float,
+    sentence_scores: List[Dict[str, any]],
+    classifier_ai_prob: float,
+    tokens_scored: int,
+    text_metrics: Optional[Dict[str, any]] = None,
+    features: Optional[DocumentFeatures] = None
+) -> Dict[str, any]:
+    """Combine model outputs and text statistics into the final score.
+    
+    Args:
+        text: Full text
+        sentences: List of sentences
+        perplexity: Calibrated document perplexity
+        sentence_scores: Per-sentence perplexities
+        classifier_ai_prob: Detector AI probability (0-100)
+        tokens_scored: GPT-2 tokens behind ``perplexity``
+        text_metrics: ``calculate_text_metrics`` result (computed if omitted)
+        features: Features of the text (computed if omitted)
+        
+    Returns:
+        Dictionary with score, label, confidence, and metrics
+    """
+    # Calculate individual metrics
+    if features is None:
+        features = DocumentFeatures.from_sentences(text, sentences)
+    if text_metrics is None:
+        text_metrics = calculate_text_metrics(text, sentences, features)
+    burstiness = text_metrics['burstiness']
+    repetition = text_metrics['repetition']
+    
+    # Sentence-level perplexity distribution
+    dist_metrics = calculate_perplexity_distribution(sentence_scores)
+    variance = dist_metrics['std']
+    
+    # Stylometric markers
+    sty_metrics = extract_stylometric_features(text, sentences, features)
+    
+    is_technical = text_metrics['modality'] == "TECHNICAL"
+    
     # Normalize to 0-100 scale
     perplexity_score = normalize_perplexity(perplexity)
-    burstiness_score = normalize_burstiness(burstiness)
-    repetition_score = normalize_repetition(repetition)
+    burstiness_score = text_metrics['burstiness_score']
+    repetition_score = text_metrics['repetition_score']
     variance_score = normalize_variance(variance)
     
     # Aggregated Sentence Features (The Core of Consensus)
@@ -115,27 +482,13 @@ def calculate_final_score(text: str, sentences: List[str]) -> Dict[str, any]:
     if is_technical:
         # For technical text, we trust the statistical patterns more than the prose-trained classifier
         final_score = statistical_base
-        modality_warning = "Technical/Code detected - reliability is reduced for this modality."
     else:
         final_score = (classifier_ai_prob * 0.50) + (statistical_base * 0.50)
-        modality_warning = None
-    
-    # Refined Thresholds
-    if final_score >= 65:
-        label = "AI-generated"
-        confidence = "high" if final_score >= 85 else "medium"
-    elif final_score <= 35:
-        label = "Human-written"
-        confidence = "high" if final_score <= 15 else "medium"
-    else:
-        label = "Uncertain"
-        confidence = "low"
     
-    # Reliability check
-    is_reliable = len(text) >= 150 and not is_technical
+    label, confidence = _label(final_score)
     
     logger.info(
-        f"Final score: {final_score:.2f} ({label}) - Modality: {modality_info['type']} - "
+        f"Final score: {final_score:.2f} ({label}) - Modality: {text_metrics['modality']} - "
         f"AI Ratio={ai_ratio:.1f}%, Mean Prob={mean_prob:.1f}%, PPL={perplexity_score:.1f}"
     )
     
@@ -143,9 +496,10 @@ def calculate_final_score(text: str, sentences: List[str]) -> Dict[str, any]:
         'score': round(final_score, 2),
         'label': label,
         'confidence': confidence,
-        'is_reliable': is_reliable,
-        'modality': modality_info['type'],
-        'modality_warning': modality_warning,
+        'is_reliable': text_metrics['is_reliable'],
+        'modality': text_metrics['modality'],
+        'modality_warning': text_metrics['modality_warning'],
+        'sentence_perplexities': sentence_scores,
         'metrics': {
             'perplexity': round(perplexity, 2),
             'perplexity_score': round(perplexity_score, 2),
@@ -156,22 +510,40 @@ def calculate_final_score(text: str, sentences: List[str]) -> Dict[str, any]:
             'perplexity_variance': round(variance, 4),
             'perplexity_variance_score': round(variance_score, 2),
             'cv_score': round(cv_score, 2),
-            'skew_score': round(skew_score, 2)
+            'skew_score': round(skew_score, 2),
+            'tokens_scored': tokens_scored
         }
     }
 
 
-def calculate_sentence_scores(sentences: List[str], global_risk: float) -> List[Dict[str, any]]:
+def _label(final_score: float) -> Tuple[str, str]:
+    """Label and confidence for a final score."""
+    # Refined Thresholds
+    if final_score >= 65:
+        return "AI-generated", "high" if final_score >= 85 else "medium"
+    if final_score <= 35:
+        return "Human-written", "high" if final_score <= 15 else "medium"
+    return "Uncertain", "low"
+
+
+def calculate_sentence_scores(
+    sentences: List[str],
+    global_risk: float,
+    sentence_perplexities: Optional[List[Dict[str, any]]] = None
+) -> List[Dict[str, any]]:
     """Calculate AI scores for individual sentences, synchronized with global results.
     
     Args:
         sentences: List of sentences
         global_risk: The overall document AI score
+        sentence_perplexities: Perplexities already computed by ``calculate_final_score``
+            (recomputed from ``sentences`` if omitted)
         
     Returns:
         List of dicts with sentence text and AI score
     """
-    sentence_perplexities = calculate_sentence_perplexities(sentences)
+    if sentence_perplexities is None:
+        sentence_perplexities = calculate_sentence_perplexities(sentences)
     
     results = []
     for item in sentence_perplexities:
@@ -180,9 +552,13 @@ def calculate_sentence_scores(sentences: List[str], global_risk: float) -> List[
         local_score = normalize_perplexity(item['perplexity'])
         blended_score = (local_score * 0.7) + (global_risk * 0.3)
         
-        results.append({
+        result = {
             'text': item['text'],
             'score': round(blended_score, 2)
-        })
+        }
+        # Detector windows covering the sentence, when the document was windowed
+        if 'detector_probability' in item:
+            result['detector_probability'] = item['detector_probability']
+        results.append(result)
     
     return results
@@ -0,0 +1,114 @@
+"""Background model preload and warmup, with readiness state."""
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.gpt2_loader import gpt2_loader
+from app.models.detector_loader import detector_loader
+from app.services.perplexity import _run_gpt2_batch
+from app.services.preprocessing import load_sentence_tokenizer
+from app.services.classifier import DETECTOR_MAX_TOKENS, _run_detector_batch
+
+logger = get_logger(__name__)
+
+
+class ModelWarmup:
+    """Loads both models (and nltk) on a background thread, then runs warmup passes.
+    
+    One forward pass per common sequence length (the sentence length buckets
+    plus the GPT-2 window) pays for first-call allocations before users arrive.
+    The service is ready only once loading and warmup have both finished.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+    
+    @property
+    def ready(self) -> bool:
+        """Whether both models are loaded and warmed up."""
+        return self.status == "ready"
+    
+    def start(self) -> None:
+        """Start preloading in the background (does nothing if already started)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run, name="model-warmup", daemon=True)
+            self._thread.start()
+    
+    def run(self) -> None:
+        """Load and warm up both models (blocking)."""
+        try:
+            self.status = "loading"
+            started = time.perf_counter()
+            load_sentence_tokenizer()
+            self.timings['sentence_tokenizer_load_seconds'] = time.perf_counter() - started
+            
+            started = time.perf_counter()
+            gpt2_loader.load()
+            self.timings['gpt2_load_seconds'] = time.perf_counter() - started
+            
+            started = time.perf_counter()
+            detector_loader.load()
+            self.timings['detector_load_seconds'] = time.perf_counter() - started
+            
+            logger.info(
+                f"Models loaded: GPT-2 in {self.timings['gpt2_load_seconds']:.2f}s, "
+                f"detector in {self.timings['detector_load_seconds']:.2f}s"
+            )
+            
+            self.status = "warming"
+            started = time.perf_counter()
+            for length in warmup_lengths():
+                self._warm(length)
+            self.timings['warmup_seconds'] = time.perf_counter() - started
+            
+            logger.info(
+                f"Warmup done in {self.timings['warmup_seconds']:.2f}s "
+                f"({len(warmup_lengths())} sequence lengths)"
+            )
+            self.status = "ready"
+        except Exception as e:
+            logger.error(f"Model preload failed: {e}", exc_info=True)
+            self.error = str(e)
+            self.status = "failed"
+    
+    def _warm(self, length: int) -> None:
+        """One GPT-2 and one detector pass over ``length`` tokens."""
+        _, tokenizer = gpt2_loader.load()
+        started = time.perf_counter()
+        _run_gpt2_batch([_dummy_ids(tokenizer, length)])
+        
+        _, detector_tokenizer = detector_loader.load()
+        _run_detector_batch([_dummy_ids(detector_tokenizer, min(length, DETECTOR_MAX_TOKENS))])
+        
+        logger.debug(f"Warmup at {length} tokens: {time.perf_counter() - started:.3f}s")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Readiness state and load/warmup timings."""
+        stats: Dict[str, Any] = {'status': self.status, 'ready': self.ready}
+        stats.update({name: round(value, 3) for name, value in self.timings.items()})
+        if self.error:
+            stats['error'] = self.error
+        return stats
+
+
+def warmup_lengths() -> List[int]:
+    """Sequence lengths to warm up: the sentence buckets and the GPT-2 window."""
+    return sorted(set(settings.sentence_length_buckets) | {settings.max_token_length})
+
+
+def _dummy_ids(tokenizer, length: int) -> List[int]:
+    """``length`` token ids of ordinary text."""
+    ids = tokenizer("The quick brown fox jumps over the lazy dog. ")['input_ids']
+    return (ids * (length // len(ids) + 1))[:length]
+
+
+# Global instance
+model_warmup = ModelWarmup()
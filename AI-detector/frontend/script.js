@@ -81,7 +81,7 @@ async function analyzeText() {
     updateStatus('Analyzing...', 'warning');
 
     try {
-        const response = await fetch(`${API_URL}/api/analyze`, {
+        const response = await fetch(`${API_URL}/api/analyze/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -94,7 +94,26 @@ async function analyzeText() {
             throw new Error(error.detail || 'Analysis failed');
         }
 
-        const data = await response.json();
+        // Partial results replace the spinner as soon as they arrive
+        let data = null;
+        await readEventStream(response, (event, payload) => {
+            loadingOverlay.style.display = 'none';
+
+            if (event === 'metrics') {
+                displayTextMetrics(payload);
+            } else if (event === 'sentence') {
+                displaySentence(payload);
+            } else if (event === 'result') {
+                data = payload;
+            } else if (event === 'error') {
+                throw new Error(payload.detail || 'Analysis failed');
+            }
+        });
+
+        if (!data) {
+            throw new Error('Analysis was interrupted');
+        }
+
         displayResults(data);
         updateStatus('Analysis complete', 'success');
 
@@ -120,6 +139,65 @@ async function analyzeText() {
     }
 }
 
+// Read a server-sent event stream, calling onEvent(event, data) for each event
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const messages = buffer.split('\n\n');
+        buffer = messages.pop();
+
+        messages.forEach(message => {
+            let event = 'message';
+            let data = '';
+            message.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            if (data) onEvent(event, JSON.parse(data));
+        });
+    }
+}
+
+// Display the model-free metrics while the models are still running
+function displayTextMetrics(metrics) {
+    resultsSection.style.display = 'block';
+    resultsSection.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+
+    scoreValue.textContent = '…';
+    scoreLabel.textContent = 'Scoring sentences…';
+    scoreLabel.style.color = '';
+    scoreExplanation.textContent = '';
+    scoreConfidence.textContent = '';
+    confidenceExplanation.textContent = '';
+    scoreRingFill.style.strokeDashoffset = 2 * Math.PI * 70;
+
+    burstinessValue.textContent = metrics.burstiness.toFixed(3);
+    burstinessBar.style.width = `${metrics.burstiness_score}%`;
+
+    repetitionValue.textContent = metrics.repetition.toFixed(3);
+    repetitionBar.style.width = `${metrics.repetition_score}%`;
+
+    perplexityValue.textContent = '…';
+    perplexityBar.style.width = '0%';
+    varianceValue.textContent = '…';
+    varianceBar.style.width = '0%';
+
+    highlightedText.innerHTML = '';
+}
+
+// Add one sentence as soon as its perplexity is known (refined by the final result)
+function displaySentence(item) {
+    appendSentence(item);
+    scoreLabel.textContent = `Scored ${highlightedText.children.length} sentences…`;
+}
+
 // Display results
 function displayResults(data) {
     // Show results section
@@ -223,36 +301,39 @@ function displayResults(data) {
 function displayHighlightedText(sentenceScores) {
     highlightedText.innerHTML = '';
 
-    sentenceScores.forEach(item => {
-        const span = document.createElement('span');
-        span.className = 'sentence';
-        span.textContent = item.text + ' ';
-
-        // Color based on score
-        const score = item.score;
-        let backgroundColor;
-
-        if (score >= 65) {
-            // High AI probability - red
-            const intensity = Math.min((score - 65) / 35, 1);
-            backgroundColor = `rgba(239, 68, 68, ${0.2 + intensity * 0.5})`;
-        } else if (score <= 35) {
-            // Likely human - green
-            const intensity = Math.min((35 - score) / 35, 1);
-            backgroundColor = `rgba(16, 185, 129, ${0.1 + intensity * 0.3})`;
-        } else {
-            // Mixed - blue
-            backgroundColor = `rgba(102, 126, 234, ${0.1 + (score - 35) / 65})`;
-        }
+    sentenceScores.forEach(appendSentence);
+}
+
+// Append one highlighted sentence
+function appendSentence(item) {
+    const span = document.createElement('span');
+    span.className = 'sentence';
+    span.textContent = item.text + ' ';
+
+    // Color based on score
+    const score = item.score;
+    let backgroundColor;
+
+    if (score >= 65) {
+        // High AI probability - red
+        const intensity = Math.min((score - 65) / 35, 1);
+        backgroundColor = `rgba(239, 68, 68, ${0.2 + intensity * 0.5})`;
+    } else if (score <= 35) {
+        // Likely human - green
+        const intensity = Math.min((35 - score) / 35, 1);
+        backgroundColor = `rgba(16, 185, 129, ${0.1 + intensity * 0.3})`;
+    } else {
+        // Mixed - blue
+        backgroundColor = `rgba(102, 126, 234, ${0.1 + (score - 35) / 65})`;
+    }
 
-        span.style.backgroundColor = backgroundColor;
+    span.style.backgroundColor = backgroundColor;
 
-        // Detailed hover info
-        const riskType = score >= 65 ? 'High' : (score <= 35 ? 'Likely Human' : 'Mixed');
-        span.title = `AI Writing Risk: ${score.toFixed(1)}% (${riskType})\nThis segment matches statistical patterns common in ${riskType === 'High' ? 'AI models' : (riskType === 'Likely Human' ? 'human writing' : 'mixed composition')}.`;
+    // Detailed hover info
+    const riskType = score >= 65 ? 'High' : (score <= 35 ? 'Likely Human' : 'Mixed');
+    span.title = `AI Writing Risk: ${score.toFixed(1)}% (${riskType})\nThis segment matches statistical patterns common in ${riskType === 'High' ? 'AI models' : (riskType === 'Likely Human' ? 'human writing' : 'mixed composition')}.`;
 
-        highlightedText.appendChild(span);
-    });
+    highlightedText.appendChild(span);
 }
 
 // Update status badge
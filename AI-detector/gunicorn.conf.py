@@ -0,0 +1,27 @@
+"""Gunicorn config for the shared-weights deployment mode.
+
+The app and both models are loaded once in the master, then uvicorn workers
+are forked and share the weights copy-on-write, so adding workers adds little
+memory. Run with:
+    
+    gunicorn -c gunicorn.conf.py app.main:app
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+
+
+def when_ready(server):
+    """Runs in the master after the app is imported and before workers are forked."""
+    from app.models.shared import preload_shared_models
+    preload_shared_models()
+
+
+def post_fork(server, worker):
+    """Runs in each worker right after the fork."""
+    from app.models.shared import configure_worker
+    configure_worker(server.cfg.workers)
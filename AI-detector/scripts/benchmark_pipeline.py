@@ -0,0 +1,320 @@
+"""Latency, throughput and memory benchmark of each detection pipeline stage.
+
+Runs every stage over a fixed synthetic corpus at several document sizes,
+offline and on CPU, and reports p50/p95/p99 latency, GPT-2 tokens per second
+and peak RSS. Results are saved as JSON; given a baseline saved by an earlier
+run, the script fails if any stage got slower (or bigger) than the threshold.
+
+Usage:
+    python scripts/benchmark_pipeline.py --output baseline.json
+    python scripts/benchmark_pipeline.py --baseline baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+
+# Models must already be in the local cache; never download mid-benchmark
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+
+from app.core.config import settings
+from app.models.gpt2_loader import gpt2_loader
+from app.models.detector_loader import detector_loader
+from app.services.preprocessing import preprocess_text
+from app.services.document import Document
+from app.services.perplexity import (
+    calculate_perplexity,
+    calculate_sentence_perplexities,
+    sentence_memo
+)
+from app.services.classifier import calculate_classifier_probability
+from app.services.modality import detect_modality
+from app.services.repetition import calculate_repetition_score
+from app.services.scoring import calculate_final_score
+
+# Document sizes in sentences
+SIZES = {"short": 5, "medium": 20, "long": 60}
+
+# Vocabulary of the synthetic corpus (fixed, so every run scores the same text)
+SUBJECTS = [
+    "The committee", "Our team", "The new policy", "A recent study", "The city council",
+    "Most readers", "The author", "This approach", "The final report", "Local farmers"
+]
+VERBS = [
+    "suggests", "reviewed", "changed", "questioned", "described", "improved",
+    "ignored", "supports", "measured", "explained"
+]
+OBJECTS = [
+    "the budget for next year", "several long-standing problems", "the results of the survey",
+    "a number of practical concerns", "the way people travel to work", "the history of the region",
+    "an unexpected drop in prices", "the quality of the water supply", "how the data was collected",
+    "the main argument of the book"
+]
+TAILS = [
+    "", " before the meeting ended", " in more detail than expected", " with some reluctance",
+    " after a long discussion", " for the second time this month", " despite the weather",
+    " without much evidence", " to everyone's surprise", " as the deadline approached"
+]
+
+# Latency changes smaller than this are noise, whatever the ratio
+MIN_DELTA_MS = 1.0
+MIN_DELTA_MB = 5.0
+
+
+def synthetic_document(num_sentences: int, seed: int) -> str:
+    """A deterministic prose document with varied sentence lengths."""
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(num_sentences):
+        sentence = f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(OBJECTS)}{rng.choice(TAILS)}"
+        if rng.random() < 0.3:
+            sentence += f", and {rng.choice(SUBJECTS).lower()} {rng.choice(VERBS)} {rng.choice(OBJECTS)}"
+        sentences.append(sentence + rng.choice([".", ".", ".", "?", "!"]))
+    
+    # A paragraph break every few sentences, as in real submissions
+    paragraphs = [" ".join(sentences[i:i + 4]) for i in range(0, len(sentences), 4)]
+    return "\n\n".join(paragraphs)
+
+
+def reset_peak_rss() -> bool:
+    """Reset this process's peak RSS (Linux only); returns whether it worked."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB since the last reset."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Lifetime peak (kB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def clear_sentence_memo(document):
+    sentence_memo.clear()
+
+
+def tokenize_document(document):
+    """Tokenize the document for both models, as every analysis does once."""
+    tokenized = Document(document["cleaned"], document["sentences"])
+    return tokenized.gpt2_tokens, tokenized.detector_tokens, tokenized.spans
+
+
+# (stage name, setup before each timed call, timed call); each call gets the
+# document as {"text", "cleaned", "sentences"}
+STAGES = [
+    ("preprocess_text", None, lambda doc: preprocess_text(doc["text"])),
+    ("tokenize_document", None, tokenize_document),
+    ("calculate_perplexity", None, lambda doc: calculate_perplexity(doc["cleaned"])),
+    ("calculate_sentence_perplexities", clear_sentence_memo,
+     lambda doc: calculate_sentence_perplexities(doc["sentences"])),
+    ("roberta_detector", None, lambda doc: calculate_classifier_probability(doc["cleaned"])),
+    ("detect_modality", None, lambda doc: detect_modality(doc["cleaned"])),
+    ("calculate_repetition_score", None, lambda doc: calculate_repetition_score(doc["cleaned"])),
+    ("full_pipeline", clear_sentence_memo,
+     lambda doc: calculate_final_score(doc["cleaned"], doc["sentences"])),
+]
+
+
+def benchmark_stage(run, setup, document, repeats: int, warmup: int) -> dict:
+    """Time one stage on one document.
+    
+    Args:
+        run: Stage function taking the document
+        setup: Called (untimed) before every call, or None
+        document: Document dict
+        repeats: Timed calls
+        warmup: Untimed calls first
+    
+    Returns:
+        Latency percentiles (ms), tokens per second and peak RSS (MB)
+    """
+    for _ in range(warmup):
+        if setup:
+            setup(document)
+        run(document)
+    
+    reset_peak_rss()
+    latencies = []
+    for _ in range(repeats):
+        if setup:
+            setup(document)
+        started = time.perf_counter()
+        run(document)
+        latencies.append(time.perf_counter() - started)
+    
+    latencies_ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(latencies_ms.mean()), 3),
+        "tokens_per_s": round(document["tokens"] / (float(np.median(latencies)) or 1e-9), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+
+def run_benchmark(repeats: int, warmup: int, seed: int, stages: list) -> dict:
+    """Benchmark the selected stages at every document size."""
+    _, tokenizer = gpt2_loader.load()
+    detector_loader.load()
+    
+    results = {}
+    for size, num_sentences in SIZES.items():
+        text = synthetic_document(num_sentences, seed)
+        cleaned, sentences = preprocess_text(text)
+        document = {
+            "text": text,
+            "cleaned": cleaned,
+            "sentences": sentences,
+            "tokens": len(tokenizer(cleaned)["input_ids"])
+        }
+        print(f"{size}: {len(sentences)} sentences, {len(cleaned)} characters, "
+              f"{document['tokens']} tokens")
+        
+        for name, setup, run in STAGES:
+            if name not in stages:
+                continue
+            result = benchmark_stage(run, setup, document, repeats, warmup)
+            results.setdefault(name, {})[size] = result
+            print(f"  {name:<34}p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  "
+                  f"p99 {result['p99_ms']:9.2f} ms  {result['tokens_per_s']:10.0f} tok/s  "
+                  f"{result['peak_rss_mb']:7.0f} MB")
+    
+    return results
+
+
+def environment() -> dict:
+    """What the numbers depend on, saved alongside them."""
+    return {
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+        "inference_backend": settings.inference_backend,
+        "model_name": settings.model_name,
+        "classifier_model_name": settings.classifier_model_name
+    }
+
+
+def find_regressions(current: dict, baseline: dict, threshold: float) -> list:
+    """Stage/size pairs whose p50 latency or peak RSS grew by more than ``threshold``.
+    
+    Args:
+        current: Results of this run
+        baseline: Results of the baseline run
+        threshold: Allowed growth as a fraction (0.2 = 20%)
+    
+    Returns:
+        Human-readable regression messages
+    """
+    regressions = []
+    for name, sizes in current["results"].items():
+        for size, result in sizes.items():
+            before = baseline["results"].get(name, {}).get(size)
+            if before is None:
+                continue
+            
+            for metric, floor, unit in (("p50_ms", MIN_DELTA_MS, "ms"), ("peak_rss_mb", MIN_DELTA_MB, "MB")):
+                old, new = before[metric], result[metric]
+                if new > old * (1 + threshold) and new - old > floor:
+                    regressions.append(
+                        f"{name} [{size}] {metric}: {old:.2f} -> {new:.2f} {unit} "
+                        f"(+{(new / old - 1) * 100 if old else float('inf'):.0f}%)"
+                    )
+    return regressions
+
+
+def main():
+    """Run the benchmark, save it and compare against a baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="Where to save the results as JSON")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown / memory growth over the baseline (0.2 = 20%%)")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed runs per stage and size")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed runs first")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic corpus seed")
+    parser.add_argument("--threads", type=int, default=0, help="Torch threads (default: torch's)")
+    parser.add_argument("--stages", nargs="+", choices=[name for name, _, _ in STAGES],
+                        default=[name for name, _, _ in STAGES], help="Stages to run")
+    args = parser.parse_args()
+    
+    settings.device = "cpu"
+    # Time the model passes themselves, not the wait for batch company
+    settings.batching_enabled = False
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    
+    print("=" * 60)
+    print("AI Text Detector - Pipeline Benchmark")
+    print("=" * 60)
+    
+    try:
+        results = run_benchmark(args.repeats, args.warmup, args.seed, args.stages)
+    except OSError as e:
+        print(f"Error: {e}")
+        print("The benchmark runs offline; download the models first "
+              "(e.g. run the server once with network access)")
+        return False
+    
+    report = {
+        "environment": environment(),
+        "config": {"repeats": args.repeats, "warmup": args.warmup, "seed": args.seed,
+                   "sizes": SIZES},
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+    
+    if not args.baseline:
+        return True
+    
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    
+    if baseline.get("environment") != report["environment"]:
+        print("Warning: baseline was recorded in a different environment; comparison may be noisy")
+    if baseline.get("config") != report["config"]:
+        print("Warning: baseline used a different corpus or repeat count")
+    
+    regressions = find_regressions(report, baseline, args.threshold)
+    print("\n" + "=" * 60)
+    if regressions:
+        print(f"REGRESSIONS (threshold {args.threshold:.0%}):")
+        for message in regressions:
+            print(f"  {message}")
+    else:
+        print(f"No regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    
+    return not regressions
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
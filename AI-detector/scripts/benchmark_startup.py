@@ -0,0 +1,137 @@
+"""Cold-start benchmark: import time of the app and time to first byte.
+
+Each run starts a fresh interpreter, so nothing is cached in-process:
+
+- import: ``import app.main`` alone, and which heavy libraries it pulled in
+- first byte: from launching uvicorn to the first response of ``/health``
+  and of the frontend (``/``), and optionally until ``/ready`` says the
+  models are loaded and warmed up
+
+Usage:
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --runs 5 --ready --output startup.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that should not load until the first analysis (or the background preload)
+HEAVY_MODULES = ["torch", "transformers", "nltk", "scipy", "numpy"]
+
+IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import() -> dict:
+    """Import ``app.main`` in a fresh interpreter."""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, deadline: float, ok_statuses=(200,)) -> float:
+    """Poll ``url`` until it answers with one of ``ok_statuses``; returns the time it did."""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status in ok_statuses:
+                    return time.perf_counter()
+        except urllib.error.HTTPError as e:
+            if e.code in ok_statuses:
+                return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"No answer from {url}")
+
+
+def measure_first_byte(wait_ready: bool, timeout: float) -> dict:
+    """Start uvicorn and time the first responses."""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = started + timeout
+        result = {"health_seconds": wait_for(f"{base}/health", deadline) - started}
+        result["frontend_seconds"] = wait_for(f"{base}/", deadline) - started
+        if wait_ready:
+            result["ready_seconds"] = wait_for(f"{base}/ready", deadline) - started
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    """Run the startup benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts to measure")
+    parser.add_argument("--ready", action="store_true",
+                        help="Also time until /ready (models loaded and warmed up)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait per start")
+    parser.add_argument("--output", help="Save the results as JSON")
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("AI Text Detector - Startup Benchmark")
+    print("=" * 60)
+    
+    imports = [measure_import() for _ in range(args.runs)]
+    starts = []
+    for _ in range(args.runs):
+        try:
+            starts.append(measure_first_byte(args.ready, args.timeout))
+        except TimeoutError as e:
+            print(f"Error: {e}")
+            return False
+    
+    summary = {"import_seconds": statistics.median(run["seconds"] for run in imports)}
+    for name in starts[0]:
+        summary[name] = statistics.median(run[name] for run in starts)
+    
+    print(f"\nMedian of {args.runs} cold starts:")
+    print(f"  import app.main:      {summary['import_seconds']:.3f} s")
+    print(f"  first byte /health:   {summary['health_seconds']:.3f} s")
+    print(f"  first byte /:         {summary['frontend_seconds']:.3f} s")
+    if args.ready:
+        print(f"  /ready:               {summary['ready_seconds']:.3f} s")
+    loaded = imports[0]["loaded"]
+    print(f"  heavy modules at import: {', '.join(loaded) if loaded else 'none'}")
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"summary": summary, "imports": imports, "starts": starts}, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+    
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,69 @@
+"""Bulk-score a corpus offline on all cores, resumably.
+
+Reads a directory of .txt/.md files, a JSONL file or a CSV file and writes
+part files of results plus a checkpoint to the output directory. Rerun the
+same command after an interruption to continue where it stopped.
+
+Usage:
+    python scripts/bulk_score.py submissions.jsonl results/
+    python scripts/bulk_score.py essays/ results/ --workers 8 --format parquet
+"""
+import argparse
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.logging import setup_logging
+from app.services.bulk import FORMATS, run_bulk
+
+
+def main():
+    """Parse arguments and run the bulk scorer."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="Directory, .jsonl or .csv corpus")
+    parser.add_argument("output", help="Output directory (created if missing)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Worker processes (default: one per core; 1 = no pool)")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="Torch threads per worker (default: cores / workers)")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl",
+                        help="Part file format (parquet needs pyarrow)")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Documents per part file and checkpoint")
+    parser.add_argument("--text-field", default="text", help="Text field of JSONL/CSV rows")
+    parser.add_argument("--id-field", default="id", help="Id field of JSONL/CSV rows")
+    parser.add_argument("--sentences", action="store_true",
+                        help="Include sentence-level scores")
+    parser.add_argument("--features-dir",
+                        help="Save preprocessed documents here and reuse them when re-scoring")
+    args = parser.parse_args()
+    
+    setup_logging("INFO")
+    
+    try:
+        state = run_bulk(
+            args.input,
+            args.output,
+            workers=args.workers,
+            threads=args.threads,
+            output_format=args.format,
+            chunk_size=args.chunk_size,
+            text_field=args.text_field,
+            id_field=args.id_field,
+            include_sentences=args.sentences,
+            features_dir=args.features_dir
+        )
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+        return False
+    
+    print(f"Done: {state['position']} documents in {state['parts']} parts, "
+          f"{state['errors']} errors")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,89 @@
+"""Parity check: compare scores of an inference backend against fp32 torch.
+
+Usage:
+    python scripts/check_backend_parity.py quantized
+    python scripts/check_backend_parity.py onnx --tolerance 1.0
+"""
+import argparse
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.models.gpt2_loader import gpt2_loader
+from app.models.detector_loader import detector_loader
+from app.services.perplexity import sentence_memo
+from app.services.preprocessing import preprocess_text
+from app.services.scoring import calculate_final_score
+from benchmark_examples import AI_EXAMPLES, HUMAN_EXAMPLES
+
+
+def rss_mb() -> float:
+    """Resident memory of this process in MB (0 where /proc isn't available)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def run_backend(backend, texts):
+    """Score every text with a backend; returns (scores, seconds per text, model MB)."""
+    settings.inference_backend = backend
+    gpt2_loader.unload()
+    detector_loader.unload()
+    sentence_memo.clear()
+    
+    before = rss_mb()
+    gpt2_loader.load()
+    detector_loader.load()
+    model_mb = rss_mb() - before
+    
+    scores = []
+    started = time.perf_counter()
+    for text in texts:
+        cleaned, sentences = preprocess_text(text)
+        scores.append(calculate_final_score(cleaned, sentences)['score'])
+    elapsed = (time.perf_counter() - started) / len(texts)
+    
+    return scores, elapsed, model_mb
+
+
+def main():
+    """Run the parity check."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("backend", choices=["quantized", "onnx"])
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="Largest allowed score difference (0-100 scale)")
+    args = parser.parse_args()
+    
+    texts = AI_EXAMPLES + HUMAN_EXAMPLES
+    
+    # Candidate first, so its memory isn't hidden behind the fp32 models
+    candidate, candidate_time, candidate_mb = run_backend(args.backend, texts)
+    reference, reference_time, reference_mb = run_backend("torch", texts)
+    
+    print("=" * 60)
+    print(f"Backend parity: {args.backend} vs torch (fp32)")
+    print("=" * 60)
+    for i, (ref, cand) in enumerate(zip(reference, candidate), 1):
+        print(f"  Text {i}: {ref:6.2f} -> {cand:6.2f} (diff {abs(ref - cand):.2f})")
+    
+    worst = max(abs(ref - cand) for ref, cand in zip(reference, candidate))
+    print(f"\nLargest score difference: {worst:.2f} (tolerance {args.tolerance:.2f})")
+    print(f"Latency per text: {reference_time * 1000:.0f} ms -> {candidate_time * 1000:.0f} ms")
+    if candidate_mb:
+        print(f"Model memory: ~{reference_mb:.0f} MB -> ~{candidate_mb:.0f} MB")
+    
+    return worst <= args.tolerance
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
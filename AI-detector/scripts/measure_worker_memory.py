@@ -0,0 +1,80 @@
+"""Measure per-worker memory of a running server (Linux only).
+
+Reports RSS, PSS (shared pages split between the processes using them) and
+USS (pages only this process uses) for the master and each worker. USS is
+what one more worker costs; with shared weights it should be far below RSS.
+
+Usage:
+    python scripts/measure_worker_memory.py <master pid>
+"""
+import argparse
+import os
+import sys
+
+
+def smaps_rollup(pid: int) -> dict:
+    """Memory totals of a process in kB, from /proc/<pid>/smaps_rollup."""
+    totals = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                totals[parts[0][:-1]] = int(parts[1])
+    return totals
+
+
+def children(pid: int) -> list:
+    """Direct child processes of ``pid``."""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The parent pid is the second field after the ")" closing the name
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def main():
+    """Print memory for the master and its workers."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pid", type=int, help="PID of the gunicorn (or uvicorn) master")
+    args = parser.parse_args()
+    
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("This script needs Linux /proc/<pid>/smaps_rollup")
+        return False
+    
+    workers = children(args.pid)
+    print("=" * 60)
+    print(f"{'process':<16}{'RSS MB':>12}{'PSS MB':>12}{'USS MB':>12}")
+    print("=" * 60)
+    
+    total_pss = 0
+    worker_uss = []
+    for label, pid in [("master", args.pid)] + [(f"worker {p}", p) for p in workers]:
+        mem = smaps_rollup(pid)
+        uss = mem.get("Private_Clean", 0) + mem.get("Private_Dirty", 0)
+        total_pss += mem.get("Pss", 0)
+        if pid != args.pid:
+            worker_uss.append(uss)
+        print(f"{label:<16}{mem.get('Rss', 0) / 1024:>12.1f}"
+              f"{mem.get('Pss', 0) / 1024:>12.1f}{uss / 1024:>12.1f}")
+    
+    print("=" * 60)
+    print(f"Workers: {len(workers)}")
+    if worker_uss:
+        print(f"Mean unique memory per worker: {sum(worker_uss) / len(worker_uss) / 1024:.1f} MB")
+    print(f"Total memory (sum of PSS): {total_pss / 1024:.1f} MB")
+    
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
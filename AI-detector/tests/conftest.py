@@ -0,0 +1,93 @@
+"""Shared test fixtures."""
+import re
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.api import analyze, batch
+from app.core.config import settings
+from app.main import app
+from app.schemas.analyze import AnalyzeResponse
+from app.services.preprocessing import clean_text, load_sentence_tokenizer
+
+METRICS = {
+    'perplexity': 1.0, 'perplexity_score': 1.0, 'burstiness': 1.0,
+    'burstiness_score': 1.0, 'repetition': 1.0, 'repetition_score': 1.0,
+    'perplexity_variance': 1.0, 'perplexity_variance_score': 1.0,
+    'cv_score': 1.0, 'skew_score': 1.0
+}
+
+
+def fake_sentences(text):
+    """Sentences of the cleaned text, split at end punctuation (no Punkt needed)."""
+    return re.findall(r'[^ ][^.!?]*[.!?]', clean_text(text))
+
+
+def build_response(text, mode="full", **fields):
+    """Stand-in for run_analysis: scores a text by its length, its sentences by position.
+    
+    Texts containing "nonsense" are rejected like texts without sentences.
+    Keyword arguments override fields of the response.
+    """
+    if "nonsense" in text:
+        raise HTTPException(status_code=400, detail="No valid sentences found in text")
+    cleaned = clean_text(text)
+    response = dict(
+        score=min(len(text), 100),
+        label="Uncertain",
+        confidence="low",
+        metrics=METRICS,
+        is_reliable=True,
+        modality="PROSE",
+        sentence_scores=[
+            {'text': sentence, 'score': float(index)}
+            for index, sentence in enumerate(fake_sentences(text))
+        ],
+        stages_run=['detector', 'text_metrics'],
+        detector_windows=[
+            {'start': 0, 'end': min(len(cleaned), 40), 'tokens': 10, 'probability': 42.0}
+        ]
+    )
+    response.update(fields)
+    return AnalyzeResponse(**response)
+
+
+def fake_final_score(text, sentences, mode="full", features=None):
+    """Stand-in for iter_final_score: the events of a stream ending in ``build_response``'s result."""
+    response = build_response(text, mode)
+    yield 'metrics', {'burstiness': 0.5, 'modality': "PROSE"}
+    for index, sentence in enumerate(sentences):
+        yield 'sentence', {'index': index, 'text': sentence, 'perplexity': 20.0, 'score': 50.0}
+    yield 'result', dict(
+        response.model_dump(exclude={'sentence_scores'}),
+        sentence_perplexities=[{'text': s, 'perplexity': 20.0} for s in sentences]
+    )
+
+
+@pytest.fixture
+def fake_analysis():
+    """The fake analysis the ``client`` fixture answers with."""
+    return build_response
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Test client whose analyses are faked and never cached."""
+    monkeypatch.setattr(analyze, 'run_analysis', build_response)
+    monkeypatch.setattr(analyze, 'iter_final_score', fake_final_score)
+    monkeypatch.setattr(batch, 'run_analysis', build_response)
+    monkeypatch.setattr(settings, 'result_cache_size', 0)
+    monkeypatch.setattr(settings, 'batch_concurrency', 2)
+    return TestClient(app)
+
+
+@pytest.fixture
+def punkt():
+    """Skip the test unless the Punkt sentence model is installed (see the README)."""
+    try:
+        load_sentence_tokenizer()
+    except LookupError:
+        pytest.skip(
+            f"Punkt sentence model not installed; run: "
+            f"python -m nltk.downloader -d {settings.nltk_data_dir} punkt_tab"
+        )
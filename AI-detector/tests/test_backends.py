@@ -0,0 +1,70 @@
+"""Parity tests for the quantized and ONNX inference backends."""
+import copy
+
+import pytest
+import torch
+from transformers import GPT2Config, GPT2LMHeadModel, RobertaConfig, RobertaForSequenceClassification
+from app.core.config import settings
+from app.models.backends import OnnxModel, export_onnx, load_model, quantize_model
+
+
+def tiny_models():
+    """Small randomly initialised models, so no weights need downloading."""
+    torch.manual_seed(0)
+    gpt2 = GPT2LMHeadModel(GPT2Config(n_layer=2, n_head=2, n_embd=64, vocab_size=200))
+    roberta = RobertaForSequenceClassification(RobertaConfig(
+        num_hidden_layers=2, num_attention_heads=2, hidden_size=64,
+        intermediate_size=128, vocab_size=200
+    ))
+    return [gpt2.eval(), roberta.eval()]
+
+
+def padded_batch():
+    """Token ids with right padding, like the batched inference paths use."""
+    input_ids = torch.randint(3, 200, (3, 12))
+    attention_mask = torch.ones_like(input_ids)
+    attention_mask[1, 8:] = 0
+    attention_mask[2, 4:] = 0
+    return input_ids, attention_mask
+
+
+def real_logits(logits, attention_mask):
+    """Logits at non-padded positions (all of them for classifiers)."""
+    return logits[attention_mask.bool()] if logits.dim() == 3 else logits
+
+
+@pytest.mark.parametrize("model", tiny_models(), ids=["gpt2", "roberta"])
+def test_quantized_matches_fp32(model):
+    """Test that INT8 quantization keeps logits close to fp32."""
+    input_ids, attention_mask = padded_batch()
+    with torch.no_grad():
+        reference = model(input_ids=input_ids, attention_mask=attention_mask).logits
+        quantized = quantize_model(copy.deepcopy(model))
+        logits = quantized(input_ids=input_ids, attention_mask=attention_mask).logits
+    
+    assert torch.allclose(logits, reference, atol=0.05)
+
+
+@pytest.mark.parametrize("model", tiny_models(), ids=["gpt2", "roberta"])
+def test_onnx_matches_fp32(model, tmp_path):
+    """Test that the exported ONNX graph matches fp32 on padded batches."""
+    pytest.importorskip("onnxruntime")
+    input_ids, attention_mask = padded_batch()
+    path = str(tmp_path / "model.onnx")
+    
+    with torch.no_grad():
+        reference = model(input_ids=input_ids, attention_mask=attention_mask).logits
+        export_onnx(copy.deepcopy(model), path)
+    logits = OnnxModel(path)(input_ids, attention_mask=attention_mask).logits
+    
+    assert torch.allclose(
+        real_logits(logits, attention_mask), real_logits(reference, attention_mask), atol=1e-4
+    )
+
+
+def test_unknown_backend_rejected(monkeypatch):
+    """Test that a misspelled backend fails loudly instead of falling back."""
+    monkeypatch.setattr(settings, 'inference_backend', 'int4')
+    
+    with pytest.raises(ValueError):
+        load_model(GPT2LMHeadModel, settings.model_name)
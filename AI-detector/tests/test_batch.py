@@ -0,0 +1,105 @@
+"""Tests for the NDJSON batch analysis endpoint."""
+import asyncio
+import json
+import threading
+
+from app.api import batch
+from app.core.config import settings
+from app.core.executor import InferenceExecutor
+
+
+def read_lines(response):
+    return {line['id']: line for line in map(json.loads, response.text.splitlines())}
+
+
+async def collect(lines):
+    return [line async for line in lines]
+
+
+def test_json_array_batch(client):
+    """Test that every document of an array comes back tagged with its id."""
+    documents = [{'id': f"doc-{i}", 'text': "A test sentence. " * (i + 1)} for i in range(5)]
+    
+    response = client.post("/api/analyze/batch", json=documents)
+    
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith("application/x-ndjson")
+    lines = read_lines(response)
+    assert set(lines) == {f"doc-{i}" for i in range(5)}
+    assert lines['doc-2']['result']['score'] == len("A test sentence. " * 3)
+
+
+def test_ndjson_batch_with_errors(client):
+    """Test NDJSON input, with bad documents reported on their own line."""
+    body = "\n".join([
+        json.dumps({'id': 1, 'text': "This is a fine document."}),
+        "{not json",
+        json.dumps({'id': 2, 'text': "short"}),
+        json.dumps({'id': 3, 'text': "nonsense nonsense nonsense"})
+    ])
+    
+    response = client.post(
+        "/api/analyze/batch", content=body, headers={'Content-Type': "application/x-ndjson"}
+    )
+    
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    by_id = {line['id']: line for line in lines}
+    assert 'result' in by_id[1]
+    assert 'error' in by_id[2]
+    assert by_id[3]['error'] == "No valid sentences found in text"
+    assert any(line['id'] is None and line['error'].startswith("Line 2") for line in lines)
+
+
+def test_batch_size_limit(client, monkeypatch):
+    """Test that documents past the limit are refused with one error line."""
+    monkeypatch.setattr(settings, 'batch_max_documents', 2)
+    documents = [{'id': i, 'text': "A test sentence here."} for i in range(4)]
+    
+    lines = client.post("/api/analyze/batch", json=documents).text.splitlines()
+    
+    assert len(lines) == 3
+
+
+def test_body_must_be_a_list(client):
+    """Test that a JSON body that isn't a list of documents is rejected."""
+    response = client.post("/api/analyze/batch", json={'text': "Not a batch."})
+    
+    assert response.status_code == 400
+
+
+def test_batch_leaves_workers_for_interactive_requests(client, fake_analysis, monkeypatch):
+    """Test that by default a batch holds half the workers, so other requests get in."""
+    monkeypatch.setattr(settings, 'batch_concurrency', 0)
+    monkeypatch.setattr(settings, 'inference_workers', 2)
+    monkeypatch.setattr(settings, 'inference_queue_size', 0)
+    executor = InferenceExecutor()
+    monkeypatch.setattr(batch, 'inference_executor', executor)
+    
+    release = threading.Event()
+    
+    def slow_analysis(text, mode="full"):
+        release.wait(timeout=5)
+        return fake_analysis(text, mode)
+    
+    monkeypatch.setattr(batch, 'run_analysis', slow_analysis)
+    documents = [batch.BatchDocument(id=i, text="A test sentence here.") for i in range(4)]
+    
+    async def scenario():
+        run = batch._BatchRun(batch._iter_list(documents))
+        lines = asyncio.ensure_future(collect(run.stream()))
+        await asyncio.sleep(0.05)
+        
+        assert executor.stats()['pending'] == 1
+        interactive = await executor.run(lambda: "interactive")
+        
+        release.set()
+        return interactive, await lines
+    
+    try:
+        interactive, lines = asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+    
+    assert interactive == "interactive"
+    assert sorted(json.loads(line)['id'] for line in lines) == [0, 1, 2, 3]
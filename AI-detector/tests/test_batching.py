@@ -0,0 +1,92 @@
+"""Tests for the micro-batching scheduler."""
+import threading
+
+import pytest
+from app.core.config import settings
+from app.services import batching
+from app.services.batching import MicroBatcher
+
+
+@pytest.fixture(autouse=True)
+def batching_settings(monkeypatch):
+    monkeypatch.setattr(settings, 'batching_enabled', True)
+    monkeypatch.setattr(settings, 'batch_max_wait_ms', 50.0)
+    monkeypatch.setattr(settings, 'batch_max_tokens', 100)
+
+
+def test_results_return_in_order():
+    """Test that each caller gets its own results back, in order."""
+    batcher = MicroBatcher("test", lambda items: [sum(item) for item in items])
+    
+    assert batcher.submit_many([[1, 2], [3], [4, 5, 6]]) == [3, 3, 15]
+    assert batcher.submit([7, 8]) == 15
+
+
+def test_concurrent_submissions_share_batches():
+    """Test that items from concurrent callers run in the same batch."""
+    batch_sizes = []
+    
+    def run_batch(items):
+        batch_sizes.append(len(items))
+        return [len(item) for item in items]
+    
+    batcher = MicroBatcher("test", run_batch)
+    results = {}
+    
+    def caller(n):
+        results[n] = batcher.submit([0] * n)
+    
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(1, 9)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    assert results == {n: n for n in range(1, 9)}
+    assert max(batch_sizes) > 1
+    assert batcher.stats()['items'] == 8
+
+
+def test_padded_size_stays_within_budget():
+    """Test that chunks never exceed the padded token budget."""
+    seen = []
+    
+    def run_batch(items):
+        seen.append(max(len(item) for item in items) * len(items))
+        return [None] * len(items)
+    
+    batcher = MicroBatcher("test", run_batch)
+    batcher.submit_many([[0] * 60, [0] * 10, [0] * 10, [0] * 30])
+    
+    assert all(size <= 100 for size in seen)
+
+
+def test_errors_reach_callers():
+    """Test that a failing batch raises in every caller."""
+    def run_batch(items):
+        raise RuntimeError("boom")
+    
+    batcher = MicroBatcher("test", run_batch)
+    
+    with pytest.raises(RuntimeError):
+        batcher.submit([1])
+
+
+def test_short_results_fail_callers_and_scheduler_survives(monkeypatch):
+    """Test that missing results and scheduler errors fail callers instead of hanging them."""
+    monkeypatch.setattr(settings, 'inference_timeout', 5.0)
+    batcher = MicroBatcher("test", lambda items: [len(item) for item in items][:1])
+    
+    with pytest.raises(RuntimeError, match="1 results for 2 items"):
+        batcher.submit_many([[1], [2]])
+    
+    def broken_chunks(batch, max_tokens):
+        raise ValueError("bad chunking")
+    
+    padded_chunks = batching._padded_chunks
+    monkeypatch.setattr(batching, '_padded_chunks', broken_chunks)
+    with pytest.raises(ValueError):
+        batcher.submit([1, 2])
+    
+    monkeypatch.setattr(batching, '_padded_chunks', padded_chunks)
+    assert batcher.submit([1, 2]) == 2
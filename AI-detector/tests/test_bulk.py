@@ -0,0 +1,166 @@
+"""Tests for offline bulk scoring."""
+import json
+import os
+
+import pytest
+import torch
+from app.core.config import settings
+from app.services import bulk
+from app.services.bulk import iter_corpus, run_bulk
+
+
+def fake_score(document, include_sentences=False, features_dir=None):
+    """Stand-in for score_document: scores a text by its length."""
+    doc_id, text = document
+    return {'id': doc_id, 'score': float(len(text))}
+
+
+@pytest.fixture
+def no_models(monkeypatch):
+    monkeypatch.setattr(bulk, 'init_worker', lambda threads: None)
+    monkeypatch.setattr(bulk, 'score_document', fake_score)
+
+
+def write_jsonl(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({'id': f"doc-{i}", 'text': "x" * (i + 10)}) + "\n")
+
+
+def read_parts(output_dir):
+    records = []
+    for name in sorted(os.listdir(output_dir)):
+        if name.startswith("part-"):
+            with open(os.path.join(output_dir, name)) as f:
+                records.extend(json.loads(line) for line in f)
+    return records
+
+
+def test_iter_corpus_formats(tmp_path):
+    """Test reading directory, JSONL and CSV corpora."""
+    (tmp_path / "docs" / "b").mkdir(parents=True)
+    (tmp_path / "docs" / "a.txt").write_text("First document.")
+    (tmp_path / "docs" / "b" / "c.md").write_text("Second document.")
+    (tmp_path / "docs" / "skip.bin").write_text("Not a text file.")
+    (tmp_path / "corpus.jsonl").write_text('{"id": 7, "body": "Seven."}\n\n{"body": "No id."}\n')
+    (tmp_path / "corpus.csv").write_text('id,text\nx1,"Hello, world."\n,Row two.\n')
+    
+    assert list(iter_corpus(str(tmp_path / "docs"))) == [
+        ("a.txt", "First document."), (os.path.join("b", "c.md"), "Second document.")
+    ]
+    assert list(iter_corpus(str(tmp_path / "corpus.jsonl"), text_field="body")) == [
+        ("7", "Seven."), ("3", "No id.")
+    ]
+    assert list(iter_corpus(str(tmp_path / "corpus.csv"))) == [
+        ("x1", "Hello, world."), ("2", "Row two.")
+    ]
+
+
+def test_killed_run_resumes_from_checkpoint(tmp_path, no_models, monkeypatch):
+    """Test that a rerun after a crash scores only what wasn't checkpointed."""
+    corpus = str(tmp_path / "corpus.jsonl")
+    output = str(tmp_path / "out")
+    write_jsonl(corpus, 7)
+    
+    def crash_on_doc_5(document, include_sentences=False, features_dir=None):
+        if document[0] == "doc-5":
+            raise KeyboardInterrupt
+        return fake_score(document)
+    
+    monkeypatch.setattr(bulk, 'score_document', crash_on_doc_5)
+    with pytest.raises(KeyboardInterrupt):
+        run_bulk(corpus, output, workers=1, chunk_size=2)
+    # doc-4 was scored but its chunk was never written
+    assert [r['id'] for r in read_parts(output)] == ["doc-0", "doc-1", "doc-2", "doc-3"]
+    
+    seen = []
+    monkeypatch.setattr(bulk, 'score_document', lambda d, include_sentences=False, features_dir=None: seen.append(d[0]) or fake_score(d))
+    state = run_bulk(corpus, output, workers=1, chunk_size=2)
+    
+    assert seen == ["doc-4", "doc-5", "doc-6"]
+    assert [r['id'] for r in read_parts(output)] == [f"doc-{i}" for i in range(7)]
+    assert state['position'] == 7 and state['parts'] == 4
+    assert not any(name.endswith(".tmp") for name in os.listdir(output))
+
+
+def test_changed_settings_refuse_to_resume(tmp_path, no_models, monkeypatch):
+    """Test that results scored under other settings are never mixed."""
+    corpus = str(tmp_path / "corpus.jsonl")
+    output = str(tmp_path / "out")
+    write_jsonl(corpus, 3)
+    run_bulk(corpus, output, workers=1)
+    
+    monkeypatch.setattr(settings, 'perplexity_weight', 0.5)
+    
+    with pytest.raises(ValueError):
+        run_bulk(corpus, output, workers=1)
+
+
+def test_parquet_output(tmp_path, no_models):
+    """Test parquet part files (optional pyarrow dependency)."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    corpus = str(tmp_path / "corpus.jsonl")
+    output = str(tmp_path / "out")
+    write_jsonl(corpus, 3)
+    
+    run_bulk(corpus, output, workers=1, output_format="parquet")
+    
+    table = pq.read_table(os.path.join(output, "part-00000.parquet"))
+    assert table.column('id').to_pylist() == ["doc-0", "doc-1", "doc-2"]
+
+
+def test_saved_features_skip_preprocessing(tmp_path, monkeypatch, punkt):
+    """Test that a second run loads the features saved by the first."""
+    calls = []
+    preprocess = bulk.preprocess
+    monkeypatch.setattr(bulk, 'preprocess', lambda text: calls.append(text) or preprocess(text))
+    text = "One two three four. Five six seven eight."
+    
+    first = bulk.load_features(text, str(tmp_path))
+    second = bulk.load_features(text, str(tmp_path))
+    
+    assert calls == [text]
+    assert second.sentences == first.sentences == ["One two three four.", "Five six seven eight."]
+
+
+def test_worker_setup_failure_stops_the_run(tmp_path, monkeypatch):
+    """Test that a worker that can't load the models fails the run instead of hanging."""
+    corpus = str(tmp_path / "corpus.jsonl")
+    write_jsonl(corpus, 3)
+    
+    def broken_loader():
+        raise OSError("model files not found")
+    
+    monkeypatch.setattr(bulk.gpt2_loader, 'load', broken_loader)
+    monkeypatch.setattr(bulk, '_worker_error', None)
+    # init_worker changes process-wide state; restore it afterwards
+    monkeypatch.setattr(settings, 'batching_enabled', settings.batching_enabled)
+    monkeypatch.setattr(settings, 'torch_threads', settings.torch_threads)
+    monkeypatch.setattr(torch, 'set_num_threads', lambda threads: None)
+    
+    with pytest.raises(RuntimeError, match="model files not found"):
+        run_bulk(corpus, str(tmp_path / "out"), workers=1)
+
+
+def test_concurrent_atomic_writes_keep_their_own_files(tmp_path, monkeypatch):
+    """Test that a second writer of the same path neither clobbers nor fails the first."""
+    path = str(tmp_path / "features.bin")
+    
+    def first(f):
+        f.write(b"first")
+        # Another process fills the same entry while this one is writing
+        bulk._write_atomic(path, lambda g: g.write(b"second"))
+    
+    bulk._write_atomic(path, first)
+    
+    with open(path, "rb") as f:
+        assert f.read() == b"first"
+    assert os.listdir(tmp_path) == ["features.bin"]
+    
+    def lost_race(src, dst):
+        os.remove(src)
+        raise FileNotFoundError(src)
+    
+    monkeypatch.setattr(bulk.os, 'replace', lost_race)
+    bulk._write_atomic(path, lambda f: f.write(b"third"))
+    assert os.listdir(tmp_path) == ["features.bin"]
@@ -0,0 +1,125 @@
+"""Tests for the analysis result cache."""
+import asyncio
+import json
+import threading
+
+import pytest
+from app.core.config import settings
+from app.core.cache import ResultCache, cache_key
+
+
+@pytest.fixture(autouse=True)
+def cache_settings(monkeypatch):
+    monkeypatch.setattr(settings, 'result_cache_size', 2)
+    monkeypatch.setattr(settings, 'result_cache_ttl', 60.0)
+    monkeypatch.setattr(settings, 'result_cache_path', "")
+
+
+def make_cache():
+    return ResultCache(loads=json.loads, dumps=json.dumps)
+
+
+def test_hit_and_miss_counters():
+    """Test that lookups are counted as hits or misses."""
+    cache = make_cache()
+    
+    assert cache.get("a") is None
+    cache.put("a", {"score": 1})
+    assert cache.get("a") == {"score": 1}
+    
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted first."""
+    cache = make_cache()
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_expired_entries_miss(monkeypatch):
+    """Test that entries past their TTL are not returned."""
+    monkeypatch.setattr(settings, 'result_cache_ttl', 0.0)
+    cache = make_cache()
+    cache.put("a", 1)
+    
+    assert cache.get("a") is None
+
+
+def test_disk_layer_shared_between_instances(monkeypatch, tmp_path):
+    """Test that a second cache (another worker) hits entries from the SQLite file."""
+    monkeypatch.setattr(settings, 'result_cache_path', str(tmp_path / "cache.sqlite"))
+    writer = make_cache()
+    reader = make_cache()
+    
+    writer.put("a", {"score": 42})
+    
+    assert reader.get("a") == {"score": 42}
+    assert reader.stats()['disk_hits'] == 1
+    assert reader.get("a") == {"score": 42}
+    assert reader.stats()['memory_hits'] == 1
+
+
+def test_async_lookup_reads_disk_off_the_event_loop(monkeypatch, tmp_path):
+    """Test that ``aget`` hits memory in place and reads SQLite on another thread."""
+    monkeypatch.setattr(settings, 'result_cache_path', str(tmp_path / "cache.sqlite"))
+    writer = make_cache()
+    reader = make_cache()
+    writer.put("a", {"score": 42})
+    
+    disk_threads = []
+    disk_get = reader._disk_get
+    
+    def recording_disk_get(key, now):
+        disk_threads.append(threading.get_ident())
+        return disk_get(key, now)
+    
+    monkeypatch.setattr(reader, '_disk_get', recording_disk_get)
+    
+    async def lookups():
+        return threading.get_ident(), await reader.aget("a"), await reader.aget("a")
+    
+    loop_thread, first, second = asyncio.run(lookups())
+    
+    assert first == second == {"score": 42}
+    assert len(disk_threads) == 1 and disk_threads[0] != loop_thread
+    assert reader.stats()['disk_hits'] == 1 and reader.stats()['memory_hits'] == 1
+
+
+def test_disk_connection_is_shared_by_threads(monkeypatch, tmp_path):
+    """Test that one connection, opened once, serves every thread of the process."""
+    monkeypatch.setattr(settings, 'result_cache_path', str(tmp_path / "cache.sqlite"))
+    cache = make_cache()
+    cache.put("a", 1)
+    conn = cache._connection()
+    
+    worker = threading.Thread(target=cache.put, args=("b", 2))
+    worker.start()
+    worker.join()
+    
+    assert cache._connection() is conn
+    assert make_cache().get("b") == 2
+
+
+def test_key_depends_on_text_and_config(monkeypatch):
+    """Test that the key changes with the text and with scoring settings."""
+    key = cache_key("Some text.")
+    
+    assert cache_key("Some text.") == key
+    assert cache_key("Other text.") != key
+    
+    monkeypatch.setattr(settings, 'ai_threshold', settings.ai_threshold + 1)
+    assert cache_key("Some text.") != key
+    
+    # Quantized and ONNX models score slightly differently from fp32
+    monkeypatch.undo()
+    monkeypatch.setattr(settings, 'inference_backend', "quantized")
+    assert cache_key("Some text.") != key
@@ -0,0 +1,56 @@
+"""Tests for windowed detector classification."""
+import pytest
+from app.services import classifier
+from app.services.classifier import (
+    calculate_classifier_probability,
+    calculate_window_probabilities,
+    plan_detector_windows,
+    pool_window_probabilities,
+    window_probability
+)
+
+
+def test_windows_cover_every_token():
+    """Test that overlapping windows are full length and reach the last token."""
+    assert plan_detector_windows(100, 510, 256) == [(0, 100)]
+    assert plan_detector_windows(1200, 510, 256) == [(0, 510), (256, 766), (512, 1022), (690, 1200)]
+    # A zero stride keeps the first window, as truncation did
+    assert plan_detector_windows(1200, 510, 0) == [(0, 510)]
+
+
+def test_pooling_rules():
+    """Test mean, max and length-weighted pooling of window probabilities."""
+    windows = [
+        {'probability': 90.0, 'new_tokens': 300},
+        {'probability': 30.0, 'new_tokens': 100}
+    ]
+    
+    assert pool_window_probabilities(windows, "mean") == pytest.approx(60.0)
+    assert pool_window_probabilities(windows, "max") == pytest.approx(90.0)
+    assert pool_window_probabilities(windows, "length_weighted") == pytest.approx(75.0)
+    with pytest.raises(ValueError):
+        pool_window_probabilities(windows, "median")
+
+
+def test_long_text_is_classified_in_one_batched_submission(monkeypatch):
+    """Test that every window of a long text goes to the detector in one submission."""
+    monkeypatch.setattr(classifier.settings, 'detector_stride', 8)
+    monkeypatch.setattr(classifier, 'DETECTOR_MAX_TOKENS', 16)
+    submissions = []
+    original = classifier.detector_batcher.submit_many
+    
+    def recording_submit_many(items):
+        submissions.append(len(items))
+        return original(items)
+    
+    monkeypatch.setattr(classifier.detector_batcher, 'submit_many', recording_submit_many)
+    text = ("The quick brown fox jumps over the lazy dog. " * 6).strip()
+    
+    windows = calculate_window_probabilities(text)
+    
+    assert submissions == [len(windows)] and len(windows) > 1
+    assert windows[0]['start'] == 0 and windows[-1]['end'] == len(text)
+    assert all(0 <= window['probability'] <= 100 for window in windows)
+    assert calculate_classifier_probability(text) == pytest.approx(pool_window_probabilities(windows))
+    # A sentence in the middle gets the windows that overlap it
+    assert window_probability(windows, 45, 90) is not None
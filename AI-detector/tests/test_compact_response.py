@@ -0,0 +1,72 @@
+"""Tests for compact analysis responses and their compression."""
+from app.core import encoding
+from app.core.config import settings
+from app.core.encoding import negotiate_encoding
+from app.schemas.analyze import CompactAnalyzeResponse
+from app.services.preprocessing import clean_text
+
+TEXT = "The first  sentence is here.\n\nThe second\tone follows it. A third “one” ends it. " * 20
+
+
+def test_verbose_is_the_default(client, fake_analysis):
+    """Test that requests without a format get the usual schema."""
+    response = client.post("/api/analyze", json={'text': TEXT})
+    
+    assert response.status_code == 200
+    assert response.json() == fake_analysis(TEXT).model_dump(mode='json')
+
+
+def test_compact_spans_point_into_the_request_text(client, fake_analysis):
+    """Test that compact sentences are spans of the text as sent, with the same scores."""
+    verbose = fake_analysis(TEXT)
+    
+    response = client.post(
+        "/api/analyze", json={'text': TEXT, 'format': "compact"},
+        headers={'Accept-Encoding': "gzip"}
+    )
+    
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == "gzip"
+    body = CompactAnalyzeResponse.model_validate(response.json())
+    assert body.score == verbose.score and body.stages_run == verbose.stages_run
+    assert len(body.sentence_spans) == len(verbose.sentence_scores)
+    for (start, end, score), sentence in zip(body.sentence_spans, verbose.sentence_scores):
+        assert clean_text(TEXT[start:end]) == sentence.text
+        assert score == sentence.score
+    assert body.sentence_spans[1][:2] == (30, 56)
+    assert body.detector_windows == [(0, 42, 42.0)]
+    assert 'modality_warning' not in response.json() and 'analysis_id' not in response.json()
+
+
+def test_compact_response_compression_is_negotiated(client, monkeypatch):
+    """Test identity, refused and small responses, and that gzip bodies decode."""
+    request = {'text': TEXT, 'format': "compact"}
+    
+    plain = client.post("/api/analyze", json=request, headers={'Accept-Encoding': "identity"})
+    refused = client.post("/api/analyze", json=request, headers={'Accept-Encoding': "gzip;q=0"})
+    compressed = client.post("/api/analyze", json=request, headers={'Accept-Encoding': "gzip"})
+    
+    assert 'content-encoding' not in plain.headers
+    assert 'content-encoding' not in refused.headers
+    assert "Accept-Encoding" in plain.headers['vary']
+    assert compressed.json() == plain.json()
+    assert int(compressed.headers['content-length']) < len(plain.content)
+    
+    monkeypatch.setattr(settings, 'compression_min_bytes', 10 ** 6)
+    small = client.post("/api/analyze", json=request, headers={'Accept-Encoding': "gzip"})
+    assert 'content-encoding' not in small.headers
+
+
+def test_negotiate_encoding(monkeypatch):
+    """Test q-values, wildcards and the brotli preference."""
+    monkeypatch.setattr(encoding, 'brotli', None)
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("gzip, deflate, br") == "gzip"
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding("*, gzip;q=0") is None
+    
+    monkeypatch.setattr(encoding, 'brotli', object())
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert negotiate_encoding("GZIP") == "gzip"
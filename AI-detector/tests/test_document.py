@@ -0,0 +1,57 @@
+"""Tests for the tokenize-once document representation."""
+import numpy as np
+from app.core.config import settings
+from app.models.gpt2_loader import gpt2_loader
+from app.services.classifier import classifier_input_ids
+from app.services.document import Document, tokenize
+from app.services.perplexity import compute_token_log_probs
+from app.services.scoring import calculate_final_score
+
+
+def test_document_tokenizes_each_model_once(monkeypatch):
+    """Test that a full analysis runs each tokenizer over the document only once."""
+    from app.services import document as document_module
+    
+    calls = []
+    
+    def counting_tokenize(tokenizer, text):
+        calls.append(text)
+        return tokenize(tokenizer, text)
+    
+    monkeypatch.setattr(document_module, 'tokenize', counting_tokenize)
+    monkeypatch.setattr(settings, 'max_token_length', 16)
+    monkeypatch.setattr(settings, 'perplexity_stride', 8)
+    sentences = [f"The quick brown fox jumps over the lazy dog {i}." for i in range(6)]
+    
+    calculate_final_score(" ".join(sentences), sentences)
+    
+    # Once for GPT-2 and once for the detector, however many windows
+    assert len(calls) == 2
+
+
+def test_document_views_match_standalone_tokenization():
+    """Test that log-probs and detector ids from document tokens match tokenizing afresh."""
+    sentences = ["The weather is nice today.", "It is sunny and warm outside."]
+    document = Document(" ".join(sentences), sentences)
+    
+    shared = compute_token_log_probs(document.text, document.gpt2_tokens)
+    single = compute_token_log_probs(document.text)
+    assert np.array_equal(shared.offsets, single.offsets)
+    assert np.allclose(shared.log_probs, single.log_probs, equal_nan=True)
+    # The log-probs point into the document's offsets rather than a copy
+    assert np.shares_memory(shared.offsets, document.gpt2_tokens.offsets)
+    
+    assert classifier_input_ids(document.text, document.detector_tokens) == classifier_input_ids(document.text)
+    assert document.spans[1] == (len(sentences[0]) + 1, len(document.text))
+
+
+def test_tokens_slices_are_views():
+    """Test that slicing tokens keeps ids and offsets aligned without copying."""
+    _, tokenizer = gpt2_loader.load()
+    tokens = tokenize(tokenizer, "The quick brown fox jumps over the lazy dog.")
+    
+    head = tokens[:3]
+    
+    assert len(head) == 3
+    assert np.shares_memory(head.ids, tokens.ids)
+    assert head.offsets.tolist() == tokens.offsets[:3].tolist()
@@ -0,0 +1,55 @@
+"""Tests for the bounded inference executor."""
+import asyncio
+import threading
+
+import pytest
+from app.core.config import settings
+from app.core.executor import InferenceExecutor, InferenceQueueFull
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    """Executor with one worker and no queue."""
+    monkeypatch.setattr(settings, 'inference_workers', 1)
+    monkeypatch.setattr(settings, 'inference_queue_size', 0)
+    executor = InferenceExecutor()
+    yield executor
+    executor.shutdown()
+
+
+def test_run_returns_result(executor):
+    """Test that jobs run on the pool and return their value."""
+    result = asyncio.run(executor.run(lambda x: x * 2, 21))
+    
+    assert result == 42
+    assert executor.stats()['pending'] == 0
+
+
+def test_full_queue_rejects(executor):
+    """Test that requests beyond capacity are rejected, not queued."""
+    release = threading.Event()
+    
+    async def scenario():
+        blocked = asyncio.ensure_future(executor.run(release.wait, timeout=5))
+        await asyncio.sleep(0.05)
+        
+        with pytest.raises(InferenceQueueFull):
+            await executor.run(lambda: None)
+        
+        release.set()
+        return await blocked
+    
+    assert asyncio.run(scenario()) is True
+
+
+def test_timeout(executor):
+    """Test that slow jobs time out but keep their slot until they finish."""
+    release = threading.Event()
+    
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run(release.wait, timeout=0.05)
+        assert executor.stats()['pending'] == 1
+        release.set()
+    
+    asyncio.run(scenario())
@@ -0,0 +1,46 @@
+"""Tests for per-document features."""
+import numpy as np
+import pytest
+from app.services.burstiness import calculate_burstiness
+from app.services.features import DocumentFeatures
+from app.services.modality import detect_modality
+from app.services.preprocessing import extract_stylometric_features, preprocess
+from app.services.repetition import calculate_repetition_score
+
+pytestmark = pytest.mark.usefixtures('punkt')
+
+TEXT = (
+    "The cat sat on the mat.  The cat sat on the mat again!\n"
+    "Then, without any warning at all, it left the room and was never seen again. "
+    "Is that the end of the story? Nobody knows for sure."
+)
+
+
+def test_metrics_match_with_and_without_features():
+    """Test that every metric reads the same numbers from the features as from the strings."""
+    preprocessed = preprocess(TEXT)
+    text, sentences = preprocessed.cleaned, preprocessed.sentences
+    features = preprocessed.features
+    
+    assert features.sentence_lengths.tolist() == [len(s.split()) for s in sentences]
+    assert features.spans == DocumentFeatures.from_sentences(text, sentences).spans
+    assert calculate_burstiness(sentences, features) == calculate_burstiness(sentences)
+    assert calculate_repetition_score(text, features=features) == calculate_repetition_score(text)
+    assert detect_modality(text, features) == detect_modality(text)
+    assert extract_stylometric_features(text, sentences, features) == \
+        extract_stylometric_features(text, sentences)
+
+
+def test_features_round_trip():
+    """Test that saved features load back unchanged."""
+    features = preprocess(TEXT).features
+    
+    loaded = DocumentFeatures.from_bytes(features.to_bytes())
+    
+    assert loaded.text == features.text
+    assert loaded.vocabulary == features.vocabulary
+    assert loaded.sentences == features.sentences
+    for name in ('word_ids', 'sentence_bounds', 'sentence_lengths'):
+        assert np.array_equal(getattr(loaded, name), getattr(features, name))
+        assert getattr(loaded, name).dtype == getattr(features, name).dtype
+    assert (loaded.line_count, loaded.indented_lines) == (features.line_count, features.indented_lines)
@@ -0,0 +1,82 @@
+"""Tests for long-document chunked analysis."""
+from app.core.config import settings
+from app.services import long_document, perplexity
+from app.services.classifier import DETECTOR_MAX_TOKENS
+from app.services.long_document import iter_chunks, score_chunks
+from app.services.scoring import calculate_long_document_score
+
+
+def make_document(num_sentences):
+    sentences = [
+        f"Sentence {i} describes {'a quiet harbour' if i % 2 else 'the busy market'} at dawn."
+        for i in range(num_sentences)
+    ]
+    return " ".join(sentences), sentences
+
+
+def test_chunks_cover_every_sentence_in_order():
+    """Test that chunks respect the size limit and keep all sentences."""
+    text, sentences = make_document(50)
+    
+    chunks = list(iter_chunks(text, sentences, max_chars=200))
+    
+    assert len(chunks) > 1
+    assert [s for _, chunk_sentences in chunks for s in chunk_sentences] == sentences
+    for chunk_text, chunk_sentences in chunks:
+        assert len(chunk_text) <= 200
+        assert chunk_text.startswith(chunk_sentences[0])
+        assert chunk_text.endswith(chunk_sentences[-1])
+
+
+def test_oversized_sentence_is_its_own_chunk():
+    """Test that a sentence longer than the limit isn't split or dropped."""
+    sentences = ["Short one here.", "This sentence is much longer than the limit allows.", "Short again."]
+    
+    chunks = list(iter_chunks(" ".join(sentences), sentences, max_chars=20))
+    
+    assert [chunk_sentences for _, chunk_sentences in chunks] == [[s] for s in sentences]
+
+
+def test_long_document_pools_chunks(monkeypatch):
+    """Test that a long document is scored whole, in bounded model passes."""
+    monkeypatch.setattr(settings, 'long_document_chunk_chars', 300)
+    monkeypatch.setattr(settings, 'long_document_chunk_batch', 2)
+    text, sentences = make_document(40)
+    
+    longest = []
+    token_nll = perplexity._token_nll
+    monkeypatch.setattr(
+        perplexity, '_token_nll',
+        lambda sequences: longest.append(max(map(len, sequences))) or token_nll(sequences)
+    )
+    
+    chunked = score_chunks(text, sentences)
+    result = calculate_long_document_score(text, sentences)
+    
+    assert chunked['chunks'] == len(list(iter_chunks(text, sentences, 300)))
+    assert len(chunked['sentence_perplexities']) == len(sentences)
+    # Every chunk's tokens except its first are pooled
+    assert chunked['tokens_scored'] > len(text.split())
+    assert max(longest) < 300
+    assert 0 <= result['score'] <= 100
+    assert result['metrics']['chunks'] == chunked['chunks']
+
+
+def test_oversized_sentence_reaches_the_detector_whole(monkeypatch):
+    """Test that a sentence longer than the detector's input is classified in windows."""
+    monkeypatch.setattr(settings, 'long_document_chunk_chars', 300)
+    text = " ".join(["the quick brown fox jumps over the lazy dog"] * 150)
+    
+    sequences = []
+    submit_many = long_document.detector_batcher.submit_many
+    monkeypatch.setattr(
+        long_document.detector_batcher, 'submit_many',
+        lambda items: sequences.extend(items) or submit_many(items)
+    )
+    
+    chunked = score_chunks(text, [text])
+    
+    assert chunked['chunks'] == 1
+    assert len(sequences) > 1
+    assert all(len(sequence) <= DETECTOR_MAX_TOKENS for sequence in sequences)
+    assert 0 <= chunked['classifier_ai_prob'] <= 100
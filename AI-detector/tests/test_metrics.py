@@ -0,0 +1,53 @@
+"""Tests for Prometheus metrics and stage timing spans."""
+from fastapi.testclient import TestClient
+from app.core.metrics import MetricsRegistry, span, stage_seconds
+from app.main import app
+
+
+def test_counter_and_histogram_exposition():
+    """Test the text format of labelled counters and cumulative histogram buckets."""
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs run", ["kind"])
+    histogram = registry.histogram("job_seconds", "Job duration", buckets=(0.1, 1.0))
+    
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5.0)
+    
+    lines = registry.render().splitlines()
+    assert "# TYPE jobs_total counter" in lines
+    assert 'jobs_total{kind="a"} 3' in lines
+    assert 'job_seconds_bucket{le="0.1"} 1' in lines
+    assert 'job_seconds_bucket{le="1"} 2' in lines
+    assert 'job_seconds_bucket{le="+Inf"} 3' in lines
+    assert "job_seconds_sum 5.55" in lines
+    assert "job_seconds_count 3" in lines
+
+
+def test_span_records_stage_duration():
+    """Test that a span adds one observation to its stage's series."""
+    def count(stage):
+        lines = [line for line in stage_seconds.render()
+                 if line.startswith(f'detector_stage_seconds_count{{stage="{stage}"}}')]
+        return int(lines[0].split()[-1]) if lines else 0
+    
+    before = count("test_stage")
+    with span("test_stage"):
+        pass
+    assert count("test_stage") == before + 1
+
+
+def test_metrics_endpoint_counts_requests_by_route():
+    """Test that /metrics serves the text format, labelled by route template."""
+    client = TestClient(app)
+    client.get("/health")
+    
+    response = client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'detector_http_requests_total{route="/health",method="GET",status="200"}' in response.text
+    assert "detector_executor_pending" in response.text
+    assert "detector_result_cache_misses_total" in response.text
@@ -0,0 +1,35 @@
+"""Tests for modality detection."""
+import re
+from app.services.modality import CODE_PATTERNS, count_code_patterns, detect_modality
+
+
+def searched_patterns(text):
+    """Reference count: each code pattern searched for on its own."""
+    return sum(
+        1 for pattern, _ in CODE_PATTERNS if re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+    )
+
+
+def test_detect_modality():
+    """Test that code is TECHNICAL and ordinary prose is PROSE."""
+    code = "import os\n\ndef main(args):\n    values = [1, 2, 3]\n    return values\n"
+    prose = "The committee met on Tuesday and agreed to publish the report next month."
+    
+    assert detect_modality(code)["type"] == "TECHNICAL"
+    assert detect_modality(prose) == {
+        "type": "PROSE", "confidence": 1.0, "reason": "Natural language patterns detected"
+    }
+
+
+def test_scanner_counts_like_separate_searches():
+    """Test markers at the same position, case folding and long whitespace runs."""
+    texts = [
+        "let x = [1] --verbose",
+        "var y = {a: 1}; if (y) { run() }",
+        "ımport them from elsewhere, then claſs A: ok",
+        "plain words" + " " * 50000 + "x = [2]",
+        "nothing technical here at all",
+    ]
+    
+    for text in texts:
+        assert count_code_patterns(text) == searched_patterns(text)
@@ -1,9 +1,17 @@
 """Tests for perplexity calculation."""
+import numpy as np
 import pytest
+from app.core.config import settings
+from app.services import perplexity
 from app.services.perplexity import (
+    sentence_memo,
+    compute_token_log_probs,
+    compute_token_log_probs_batch,
     calculate_perplexity,
     calculate_sentence_perplexities,
-    normalize_perplexity
+    slice_sentence_perplexities,
+    normalize_perplexity,
+    calculate_perplexity_distribution
 )
 
 
@@ -41,6 +49,126 @@ def test_calculate_sentence_perplexities():
         assert result['perplexity'] > 0
 
 
+def test_batched_sentence_perplexities_match_unbatched():
+    """Test that padding and bucketing don't change sentence perplexities."""
+    sentences = [
+        "Short one here.",
+        "This sentence is quite a bit longer than the one before it.",
+        "Hi.",
+        "A medium sized sentence for the batch."
+    ]
+    
+    sentence_memo.clear()
+    batched = calculate_sentence_perplexities(sentences, batch_size=8)
+    sentence_memo.clear()
+    unbatched = calculate_sentence_perplexities(sentences, batch_size=1)
+    
+    assert [r['text'] for r in batched] == [r['text'] for r in unbatched]
+    for a, b in zip(batched, unbatched):
+        assert a['perplexity'] == pytest.approx(b['perplexity'], rel=1e-4)
+
+
+def test_sentence_perplexities_do_not_depend_on_buckets(monkeypatch):
+    """Test that sentences longer than the largest bucket are scored whole, not truncated."""
+    sentences = [
+        "Short one here.",
+        "This sentence is quite a bit longer than the one before it, and than every bucket."
+    ]
+    
+    sentence_memo.clear()
+    default = calculate_sentence_perplexities(sentences)
+    
+    monkeypatch.setattr(settings, 'sentence_length_buckets', [4])
+    sentence_memo.clear()
+    small = calculate_sentence_perplexities(sentences)
+    
+    assert [r['tokens'] for r in small] == [r['tokens'] for r in default]
+    assert small[1]['tokens'] > 4
+    for a, b in zip(small, default):
+        assert a['perplexity'] == pytest.approx(b['perplexity'], rel=1e-4)
+
+
+def test_sentence_memo_skips_scored_sentences(monkeypatch):
+    """Test that duplicates and previously scored sentences don't run GPT-2 again."""
+    sentence_memo.clear()
+    scored = []
+    token_nll = perplexity._token_nll
+    monkeypatch.setattr(
+        perplexity, '_token_nll', lambda sequences: scored.extend(sequences) or token_nll(sequences)
+    )
+    
+    first = calculate_sentence_perplexities([
+        "This is a test sentence.",
+        "Another sentence for testing.",
+        "This is a test sentence."
+    ])
+    assert len(scored) == 2
+    assert first[0] == first[2]
+    
+    scored.clear()
+    second = calculate_sentence_perplexities([
+        "This is a test sentence.",
+        "The quick brown fox jumps over the lazy dog."
+    ])
+    assert len(scored) == 1
+    assert second[0]['perplexity'] == first[0]['perplexity']
+
+
+def test_sentence_memo_key_depends_on_backend(monkeypatch):
+    """Test that sentences scored by another inference backend aren't reused."""
+    key = sentence_memo.key("This is a test sentence.")
+    
+    monkeypatch.setattr(settings, 'inference_backend', "onnx")
+    assert sentence_memo.key("This is a test sentence.") != key
+
+
+def test_slice_sentence_perplexities():
+    """Test sentence perplexities sliced from a single document pass."""
+    sentences = [
+        "This is a test sentence.",
+        "Another sentence for testing.",
+        "The quick brown fox jumps over the lazy dog."
+    ]
+    text = " ".join(sentences)
+    
+    token_log_probs = compute_token_log_probs(text)
+    results = slice_sentence_perplexities(token_log_probs, sentences)
+    
+    assert [r['text'] for r in results] == sentences
+    for result in results:
+        assert result['perplexity'] > 0
+    
+    # The shared pass gives the same document perplexity as a fresh one
+    assert calculate_perplexity(text, token_log_probs) == pytest.approx(calculate_perplexity(text))
+
+
+def test_strided_perplexity_scores_every_token(monkeypatch):
+    """Test that documents longer than one window are scored to the end."""
+    monkeypatch.setattr(settings, 'max_token_length', 16)
+    monkeypatch.setattr(settings, 'perplexity_stride', 8)
+    text = "The quick brown fox jumps over the lazy dog. " * 10
+    
+    token_log_probs = compute_token_log_probs(text)
+    
+    # Every token except the very first one gets a log-probability
+    assert len(token_log_probs.log_probs) > 16
+    assert token_log_probs.num_scored == len(token_log_probs.log_probs) - 1
+
+
+def test_batched_token_log_probs_match_single():
+    """Test that scoring texts together gives the same log-probs as one by one."""
+    texts = [
+        "The quick brown fox jumps over the lazy dog.",
+        "A much longer text that needs more tokens than the first one does, by far.",
+        "Hi"
+    ]
+    
+    for batched, text in zip(compute_token_log_probs_batch(texts), texts):
+        single = compute_token_log_probs(text)
+        assert np.array_equal(batched.offsets, single.offsets)
+        assert np.allclose(batched.log_probs, single.log_probs, equal_nan=True, atol=1e-5)
+
+
 def test_normalize_perplexity():
     """Test perplexity normalization."""
     # Low perplexity should give high AI score
@@ -56,6 +184,20 @@ def test_normalize_perplexity():
     assert 40 <= mid_ppl <= 60
 
 
+def test_perplexity_distribution_skew():
+    """Test the skewness of sentence perplexities (biased estimator, 0 without spread)."""
+    ppls = [10.0, 12.0, 11.0, 40.0]
+    deviations = np.array(ppls) - np.mean(ppls)
+    expected = np.mean(deviations ** 3) / np.mean(deviations ** 2) ** 1.5
+    
+    distribution = calculate_perplexity_distribution([{'perplexity': p} for p in ppls])
+    assert distribution['skew'] == pytest.approx(expected)
+    assert distribution['skew'] > 0
+    
+    flat = calculate_perplexity_distribution([{'perplexity': 20.0}] * 3)
+    assert flat['skew'] == 0.0
+
+
 def test_empty_text():
     """Test handling of empty text."""
     with pytest.raises(Exception):
@@ -0,0 +1,32 @@
+"""Tests for text preprocessing."""
+import pytest
+from app.services.preprocessing import clean_text, preprocess, preprocess_text
+
+
+def test_clean_text_normalizes_quotes_and_whitespace():
+    """Test that typographic quotes become plain ones and whitespace collapses."""
+    text = "  “Hello,” she said.\r\n\tIt’s  fine. "
+    
+    assert clean_text(text) == "\"Hello,\" she said. It's fine."
+
+
+@pytest.mark.usefixtures('punkt')
+def test_original_span_maps_back_to_input():
+    """Test that sentence spans of the cleaned text point at the same words in the input."""
+    text = "First  sentence here.\n\nThe second\tone is\r\nlonger. Ok."
+    preprocessed = preprocess(text)
+    
+    assert preprocessed.sentences == ["First sentence here.", "The second one is longer."]
+    for (start, end), sentence in zip(preprocessed.spans, preprocessed.sentences):
+        original_start, original_end = preprocessed.original_span(start, end)
+        assert " ".join(text[original_start:original_end].split()) == sentence
+    assert preprocessed.original_span(*preprocessed.spans[1]) == (23, 49)
+
+
+@pytest.mark.usefixtures('punkt')
+def test_preprocess_text_returns_cleaned_text_and_sentences():
+    """Test the tuple form used by the scoring pipeline."""
+    cleaned, sentences = preprocess_text("One two three.   Four five six seven.")
+    
+    assert cleaned == "One two three. Four five six seven."
+    assert sentences == ["One two three.", "Four five six seven."]
@@ -0,0 +1,43 @@
+"""Tests for repetition metrics."""
+import random
+from collections import Counter
+import pytest
+from app.services.repetition import (
+    calculate_ngram_repetition,
+    calculate_repetition_score,
+    calculate_token_diversity,
+    ngram_stats
+)
+
+
+def counted_repetition(text, n):
+    """Reference n-gram repetition from a Counter of word tuples."""
+    words = text.lower().split()
+    ngrams = [tuple(words[i:i + n]) for i in range(len(words) - n + 1)]
+    return (len(ngrams) - len(Counter(ngrams))) / len(ngrams) if ngrams else 0.0
+
+
+def test_hashed_ngrams_match_counting():
+    """Test that every n-gram order matches counting word tuples."""
+    rng = random.Random(0)
+    vocabulary = "the a of and to it The A is was".split()
+    
+    for _ in range(200):
+        text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 40)))
+        stats = ngram_stats(text)
+        
+        for n in range(1, 6):
+            assert stats.repetition[n] == pytest.approx(counted_repetition(text, n))
+        assert stats.total_words == len(text.split())
+        assert stats.unique_words == len(set(text.lower().split()))
+
+
+def test_repetition_score():
+    """Test that repeated phrasing scores higher than varied phrasing."""
+    repetitive = "the cat sat on the mat. " * 10
+    varied = "A quick brown fox jumps over one lazy dog while seven birds sing nearby today."
+    
+    assert calculate_ngram_repetition(repetitive, n=3) > calculate_ngram_repetition(varied, n=3)
+    assert calculate_token_diversity(varied) == 1.0
+    assert calculate_repetition_score(repetitive) > calculate_repetition_score(varied)
+    assert calculate_repetition_score("") == 0.0
@@ -1,6 +1,12 @@
 """Tests for scoring logic."""
 import pytest
-from app.services.scoring import calculate_final_score, calculate_sentence_scores
+from app.services.scoring import (
+    calculate_final_score,
+    calculate_incremental_score,
+    calculate_sentence_scores,
+    iter_final_score
+)
+from app.core.config import settings
 
 
 def test_calculate_final_score():
@@ -62,3 +68,148 @@ def test_metrics_structure():
     assert 0 <= metrics['perplexity_score'] <= 100
     assert 0 <= metrics['burstiness_score'] <= 100
     assert 0 <= metrics['repetition_score'] <= 100
+
+
+def test_incremental_score_reuses_previous_state():
+    """Test incremental scoring of an edited text from the previous state."""
+    sentences = [
+        "The weather is nice today.",
+        "It is sunny and warm outside.",
+        "The temperature is very pleasant."
+    ]
+    first = calculate_incremental_score(" ".join(sentences), sentences)
+    
+    edited = sentences[:2] + ["The temperature has dropped since this morning."]
+    second = calculate_incremental_score(" ".join(edited), edited, previous=first['state'])
+    
+    assert 0 <= second['score'] <= 100
+    assert [s['text'] for s in second['state']['sentences']] == edited
+    # Unchanged sentences keep their earlier perplexities
+    assert second['state']['sentences'][:2] == first['state']['sentences'][:2]
+
+
+def test_incremental_score_reports_only_stages_that_ran(monkeypatch):
+    """Test that an unchanged text re-run from memo and state lists no model stages."""
+    from app.services import perplexity
+    
+    sentences = [
+        "The weather is nice today.",
+        "It is sunny and warm outside.",
+        "The temperature is very pleasant."
+    ]
+    text = " ".join(sentences)
+    perplexity.sentence_memo.clear()
+    first = calculate_incremental_score(text, sentences)
+    assert first['stages_run'] == ['gpt2_sentences', 'detector', 'text_metrics']
+    
+    def no_gpt2(sequences):
+        raise AssertionError("GPT-2 should not run")
+    
+    monkeypatch.setattr(perplexity, '_token_nll', no_gpt2)
+    
+    # Every sentence comes from the memo, even without the previous state
+    from_memo = calculate_incremental_score(text, sentences)
+    again = calculate_incremental_score(text, sentences, previous=first['state'])
+    
+    assert from_memo['stages_run'] == ['detector', 'text_metrics']
+    assert again['stages_run'] == ['text_metrics']
+    assert again['score'] == first['score']
+
+
+def test_iter_final_score_streams_sentences_in_order(monkeypatch):
+    """Test that sentences stream window by window before the final result."""
+    monkeypatch.setattr(settings, 'max_token_length', 32)
+    monkeypatch.setattr(settings, 'perplexity_stride', 16)
+    sentences = [f"This is sentence number {i} of the test." for i in range(8)]
+    text = " ".join(sentences)
+    
+    events = list(iter_final_score(text, sentences))
+    
+    assert events[0][0] == 'metrics'
+    assert events[-1][0] == 'result'
+    streamed = [data for event, data in events if event == 'sentence']
+    assert [item['index'] for item in streamed] == list(range(8))
+    assert [item['text'] for item in streamed] == sentences
+    # The final result matches the non-streaming path
+    assert events[-1][1] == calculate_final_score(text, sentences)
+
+
+def test_iter_final_score_keeps_fallback_sentences_in_order():
+    """Test that a sentence scored on its own still streams in document order."""
+    sentences = [f"This is sentence number {i} of the test." for i in range(5)]
+    text = " ".join(sentences)
+    # Not found in the text, so the document pass can't slice it
+    sentences[2] = "A sentence the document pass never sees."
+    
+    events = list(iter_final_score(text, sentences))
+    
+    streamed = [data for event, data in events if event == 'sentence']
+    assert [item['index'] for item in streamed] == list(range(5))
+    assert 'gpt2_sentences' in events[-1][1]['stages_run']
+
+
+def _fast_mode_text(monkeypatch, probability, burstiness_score):
+    """Fix the detector probability and burstiness seen by the fast-mode cascade."""
+    from app.services import scoring
+    
+    text_metrics = scoring.calculate_text_metrics
+    
+    def fixed_text_metrics(text, sentences, features=None):
+        return dict(
+            text_metrics(text, sentences, features), is_reliable=True, burstiness_score=burstiness_score
+        )
+    
+    monkeypatch.setattr(scoring, 'calculate_text_metrics', fixed_text_metrics)
+    monkeypatch.setattr(
+        scoring, 'calculate_window_probabilities',
+        lambda text, *args, **kwargs: [
+            {'start': 0, 'end': len(text), 'tokens': 10, 'new_tokens': 10, 'probability': probability}
+        ]
+    )
+    
+    sentences = [
+        "The weather is nice today.",
+        "It is sunny and warm outside.",
+        "The temperature is very pleasant."
+    ]
+    return " ".join(sentences), sentences
+
+
+def test_fast_mode_exits_before_gpt2(monkeypatch):
+    """Test that a decisive detector score that burstiness agrees with skips GPT-2."""
+    from app.services import scoring
+    
+    text, sentences = _fast_mode_text(monkeypatch, 92.0, 80.0)
+    
+    def no_gpt2(*args, **kwargs):
+        raise AssertionError("GPT-2 should not run")
+    
+    monkeypatch.setattr(scoring, 'iter_token_log_probs', no_gpt2)
+    
+    result = calculate_final_score(text, sentences, mode="fast")
+    
+    assert result['stages_run'] == ['text_metrics', 'detector']
+    assert result['score'] == 92.0
+    assert result['label'] == 'AI-generated'
+    assert result['sentence_perplexities'] == []
+    assert 'perplexity' not in result['metrics']
+
+
+def test_fast_mode_escalates_on_disagreement(monkeypatch):
+    """Test that fast mode runs GPT-2 when burstiness contradicts the detector."""
+    text, sentences = _fast_mode_text(monkeypatch, 92.0, 20.0)
+    
+    fast = calculate_final_score(text, sentences, mode="fast")
+    full = calculate_final_score(text, sentences)
+    
+    assert fast['stages_run'][:3] == ['text_metrics', 'detector', 'gpt2_document']
+    assert full['stages_run'][0] == 'text_metrics' and full['stages_run'][-1] == 'detector'
+    # Escalated analyses score exactly like full ones
+    assert fast['score'] == full['score']
+    assert fast['metrics'] == full['metrics']
+
+
+def test_unknown_mode_is_rejected():
+    """Test that an unknown analysis mode raises."""
+    with pytest.raises(ValueError):
+        calculate_final_score("Some text here.", ["Some text here."], mode="fastest")
@@ -0,0 +1,20 @@
+"""Tests that the server starts without importing the ML libraries."""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_app_import_is_free_of_ml_libraries():
+    """Test that importing app.main loads none of torch, transformers, nltk or scipy."""
+    probe = (
+        "import json, sys; import app.main; "
+        "print(json.dumps([m for m in ('torch', 'transformers', 'nltk', 'scipy') if m in sys.modules]))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    
+    assert json.loads(output.strip().splitlines()[-1]) == []
@@ -0,0 +1,54 @@
+"""Tests for the server-sent-events analysis endpoint."""
+import json
+import threading
+
+import pytest
+from app.api import analyze
+
+pytestmark = pytest.mark.usefixtures('punkt')
+
+
+def read_events(response):
+    events = []
+    for message in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines())
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_stream_events_in_order(client, fake_analysis):
+    """Test metrics first, then each sentence, then the full response."""
+    text = "The first sentence is here. The second one follows it. A third ends it."
+    
+    response = client.post("/api/analyze/stream", json={'text': text})
+    
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith("text/event-stream")
+    events = read_events(response)
+    assert [event for event, _ in events] == ['metrics', 'sentence', 'sentence', 'sentence', 'result']
+    assert [data['index'] for event, data in events if event == 'sentence'] == [0, 1, 2]
+    result = events[-1][1]
+    assert result['score'] == fake_analysis(text).score
+    assert len(result['sentence_scores']) == 3
+
+
+def test_stream_rejects_text_without_sentences(client):
+    """Test that unusable text is rejected before the stream starts."""
+    response = client.post("/api/analyze/stream", json={'text': "!!!!!!!!!!!!"})
+    
+    assert response.status_code == 400
+
+
+def test_stream_preprocesses_on_the_executor(client, monkeypatch):
+    """Test that sentence splitting runs on an inference worker, not the event loop."""
+    threads = []
+    preprocess = analyze._preprocess_or_400
+    monkeypatch.setattr(
+        analyze, '_preprocess_or_400',
+        lambda text: threads.append(threading.current_thread().name) or preprocess(text)
+    )
+    
+    response = client.post("/api/analyze/stream", json={'text': "One two three. Four five six."})
+    
+    assert response.status_code == 200
+    assert threads and threads[0].startswith("inference")
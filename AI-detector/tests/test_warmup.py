@@ -0,0 +1,83 @@
+"""Tests for model preload, warmup and single-flight loading."""
+import threading
+import time
+
+import pytest
+from transformers import GPT2TokenizerFast
+from app.models import backends
+from app.models.gpt2_loader import gpt2_loader
+from app.services import warmup
+from app.services.warmup import ModelWarmup, warmup_lengths
+
+
+class FakeTokenizer:
+    def __call__(self, text):
+        return {'input_ids': list(range(len(text.split())))}
+
+
+def test_concurrent_loads_are_single_flight(monkeypatch):
+    """Test that concurrent first requests load the model only once."""
+    loads = []
+    
+    def slow_load(model_cls, model_name):
+        loads.append(model_name)
+        time.sleep(0.05)
+        return object()
+    
+    # The loader imports these when it first loads
+    monkeypatch.setattr(backends, 'load_model', slow_load)
+    monkeypatch.setattr(GPT2TokenizerFast, 'from_pretrained', lambda name: FakeTokenizer())
+    gpt2_loader.unload()
+    
+    threads = [threading.Thread(target=gpt2_loader.load) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    gpt2_loader.unload()
+    
+    assert len(loads) == 1
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """Loaders and forward passes replaced by recorders."""
+    passes = {'gpt2': [], 'detector': []}
+    monkeypatch.setattr(warmup, 'load_sentence_tokenizer', lambda: None)
+    monkeypatch.setattr(warmup.gpt2_loader, 'load', lambda: (None, FakeTokenizer()))
+    monkeypatch.setattr(warmup.detector_loader, 'load', lambda: (None, FakeTokenizer()))
+    monkeypatch.setattr(
+        warmup, '_run_gpt2_batch', lambda batch: passes['gpt2'].append(len(batch[0]))
+    )
+    monkeypatch.setattr(
+        warmup, '_run_detector_batch', lambda batch: passes['detector'].append(len(batch[0]))
+    )
+    return passes
+
+
+def test_warmup_runs_each_length_then_reports_ready(fake_models):
+    """Test that every warmup length gets a pass before the service is ready."""
+    model_warmup = ModelWarmup()
+    assert not model_warmup.ready
+    
+    model_warmup.run()
+    
+    assert model_warmup.ready
+    assert fake_models['gpt2'] == warmup_lengths()
+    assert max(fake_models['detector']) <= warmup.DETECTOR_MAX_TOKENS
+    stats = model_warmup.stats()
+    assert 'gpt2_load_seconds' in stats
+    assert 'warmup_seconds' in stats
+
+
+def test_failed_preload_is_not_ready(monkeypatch, fake_models):
+    """Test that a load failure is reported instead of marking the service ready."""
+    def fail():
+        raise OSError("no weights")
+    
+    monkeypatch.setattr(warmup.gpt2_loader, 'load', fail)
+    model_warmup = ModelWarmup()
+    model_warmup.run()
+    
+    assert not model_warmup.ready
+    assert model_warmup.stats()['status'] == "failed"